@@ -9,6 +9,7 @@ from .lifetime_report import LifetimeReport
 from .normaliser import VariantMapping
 from .results import Results
 from .sequence import SequenceReport
+from .source_manifest import SourceManifest
 from .splitter import Splitter
 from .statistics_report import StatisticsReport
 from .stripper import Stripper
@@ -39,8 +39,9 @@ def align_results(args, parser):
         results = open(args.results, 'r', encoding='utf-8', newline='')
     tokenizer = utils.get_tokenizer(args)
     corpus = tacl.Corpus(args.corpus, tokenizer)
-    report = tacl.SequenceReport(corpus, tokenizer, results)
-    report.generate(args.output, args.minimum)
+    report = tacl.SequenceReport(corpus, tokenizer, results,
+                                 args.maximum_context)
+    report.generate(args.output, args.minimum, args.jobs)
 
 
 def excise(args, parser):
@@ -111,6 +112,10 @@ def generate_align_subparser(subparsers):
         formatter_class=ParagraphFormatter, help=constants.ALIGN_HELP)
     parser.set_defaults(func=align_results)
     utils.add_common_arguments(parser)
+    utils.add_jobs_argument(parser)
+    parser.add_argument('--max-context', dest='maximum_context',
+                        help=constants.ALIGN_MAXIMUM_CONTEXT_HELP,
+                        metavar='LENGTH', type=int)
     parser.add_argument('-m', '--minimum', default=20,
                         help=constants.ALIGN_MINIMUM_SIZE_HELP, type=int)
     utils.add_corpus_arguments(parser)
@@ -202,6 +207,7 @@ def generate_highlight_subparser(subparsers):
         help=constants.HIGHLIGHT_HELP)
     parser.set_defaults(func=highlight_text)
     utils.add_common_arguments(parser)
+    utils.add_jobs_argument(parser)
     parser.add_argument('-m', '--minus-ngrams', metavar='NGRAMS',
                         help=constants.HIGHLIGHT_MINUS_NGRAMS_HELP)
     group = parser.add_mutually_exclusive_group(required=True)
@@ -307,12 +313,17 @@ def generate_normalise_subparser(subparsers):
     parser.set_defaults(func=normalise_corpus)
     utils.add_tokenizer_argument(parser)
     utils.add_common_arguments(parser)
+    utils.add_jobs_argument(parser)
     parser.add_argument('corpus', help=constants.NORMALISE_CORPUS_HELP,
                         metavar='CORPUS')
     parser.add_argument('mapping', help=constants.NORMALISE_MAPPING_HELP,
                         metavar='MAPPING')
     parser.add_argument('output', help=constants.NORMALISE_OUTPUT_HELP,
                         metavar='OUTPUT')
+    parser.add_argument('--cache', help=constants.NORMALISE_CACHE_HELP,
+                        metavar='DIRECTORY')
+    parser.add_argument('--resume', action='store_true',
+                        help=constants.NORMALISE_RESUME_HELP)
 
 
 def generate_prepare_subparser(subparsers):
@@ -324,6 +335,11 @@ def generate_prepare_subparser(subparsers):
         help=constants.PREPARE_HELP)
     parser.set_defaults(func=prepare_xml)
     utils.add_common_arguments(parser)
+    utils.add_jobs_argument(parser)
+    parser.add_argument('--incremental', action='store_true',
+                        help=constants.PREPARE_INCREMENTAL_HELP)
+    parser.add_argument('--streaming', action='store_true',
+                        help=constants.PREPARE_STREAMING_HELP)
     parser.add_argument('-s', '--source', dest='source',
                         choices=constants.TEI_SOURCE_CHOICES,
                         default=constants.TEI_SOURCE_CBETA_GITHUB,
@@ -378,6 +394,8 @@ def generate_results_subparser(subparsers):
                         help=constants.RESULTS_EXTEND_HELP, metavar='CORPUS')
     parser.add_argument('--excise', help=constants.RESULTS_EXCISE_HELP,
                         metavar='NGRAM', type=str)
+    parser.add_argument('--explain', action='store_true',
+                        help=constants.RESULTS_EXPLAIN_HELP)
     parser.add_argument('-l', '--label', dest='label',
                         help=constants.RESULTS_LABEL_HELP, metavar='LABEL')
     parser.add_argument('--min-count', dest='min_count',
@@ -472,7 +490,7 @@ def generate_statistics(args, parser):
     corpus = utils.get_corpus(args)
     tokenizer = utils.get_tokenizer(args)
     report = tacl.StatisticsReport(corpus, tokenizer, args.results)
-    report.generate_statistics()
+    report.generate_statistics(args.jobs)
     report.csv(sys.stdout)
 
 
@@ -484,6 +502,7 @@ def generate_statistics_subparser(subparsers):
         formatter_class=ParagraphFormatter, help=constants.STATISTICS_HELP)
     parser.set_defaults(func=generate_statistics)
     utils.add_common_arguments(parser)
+    utils.add_jobs_argument(parser)
     utils.add_corpus_arguments(parser)
     parser.add_argument('results', help=constants.STATISTICS_RESULTS_HELP,
                         metavar='RESULTS')
@@ -498,6 +517,11 @@ def generate_strip_subparser(subparsers):
         help=constants.STRIP_HELP)
     parser.set_defaults(func=strip_files)
     utils.add_common_arguments(parser)
+    utils.add_jobs_argument(parser)
+    parser.add_argument('--incremental', action='store_true',
+                        help=constants.STRIP_INCREMENTAL_HELP)
+    parser.add_argument('--streaming', action='store_true',
+                        help=constants.STRIP_STREAMING_HELP)
     parser.add_argument('input', help=constants.STRIP_INPUT_HELP,
                         metavar='INPUT')
     parser.add_argument('output', help=constants.STRIP_OUTPUT_HELP,
@@ -553,10 +577,11 @@ def highlight_text(args, parser):
         if args.minus_ngrams:
             minus_ngrams = utils.get_ngrams(args.minus_ngrams)
         report.generate(args.output, args.base_name, ngrams, args.label,
-                        minus_ngrams)
+                        minus_ngrams, args.jobs)
     else:
         report = tacl.ResultsHighlightReport(corpus, tokenizer)
-        report.generate(args.output, args.base_name, args.results)
+        report.generate(args.output, args.base_name, args.results,
+                        args.jobs)
 
 
 def join_works(args, parser):
@@ -613,11 +638,11 @@ def normalise_corpus(args, parser):
     corpus = utils.get_corpus(args)
     tokenizer = utils.get_tokenizer(args)
     output_dir = os.path.abspath(args.output)
-    if os.path.exists(output_dir):
+    if os.path.exists(output_dir) and not args.resume:
         parser.exit(status=3, message='Output directory already exists, '
                     'aborting.\n')
-    mapping = normaliser.VariantMapping(args.mapping, tokenizer)
-    corpus.normalise(mapping, output_dir)
+    mapping = normaliser.VariantMapping(args.mapping, tokenizer, args.cache)
+    corpus.normalise(mapping, output_dir, args.jobs, args.resume)
 
 
 def prepare_xml(args, parser):
@@ -632,7 +657,7 @@ def prepare_xml(args, parser):
     else:
         raise Exception('Unsupported TEI source option provided')
     corpus = corpus_class(args.input, args.output)
-    corpus.tidy()
+    corpus.tidy(args.jobs, args.incremental, args.streaming)
 
 
 def query_data_store(args, parser):
@@ -658,7 +683,7 @@ def results(args, parser):
     else:
         results_fh = open(args.results, 'r', encoding='utf-8', newline='')
     tokenizer = utils.get_tokenizer(args)
-    results = tacl.Results(results_fh, tokenizer)
+    results = tacl.Results(results_fh, tokenizer, lazy=True)
     if args.extend:
         corpus = tacl.Corpus(args.extend, tokenizer)
         results.extend(corpus)
@@ -719,7 +744,10 @@ def results(args, parser):
         results.group_by_witness()
     if args.collapse_witnesses:
         results.collapse_witnesses()
-    results.csv(sys.stdout)
+    if args.explain:
+        results.explain(sys.stdout)
+    else:
+        results.csv(sys.stdout)
 
 
 def search_texts(args, parser):
@@ -745,7 +773,7 @@ def strip_files(args, parser):
     """Processes prepared XML files for use with the tacl ngrams
     command."""
     stripper = tacl.Stripper(args.input, args.output)
-    stripper.strip_files()
+    stripper.strip_files(args.jobs, args.incremental, args.streaming)
 
 
 def supplied_diff(args, parser):
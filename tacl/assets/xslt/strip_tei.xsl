@@ -18,6 +18,12 @@
 
   <!-- For the edited/master text, pass BASE_WITNESS_ID. -->
   <xsl:param name="witness_id" />
+  <!-- To output the text of all witnesses in one pass, pass a true
+       value. The content of each tei:lem and tei:rdg is then output
+       regardless of witness_id, between markers that record the
+       witnesses it belongs to (see the WITNESS_MARKER constants),
+       for the witness texts to be separated out afterwards. -->
+  <xsl:param name="mark_witnesses" />
   <xsl:variable name="witness_ref" select="concat(' #', $witness_id, ' ')" />
 
   <xsl:template match="cb:div|tei:lg|tei:list|tei:p">
@@ -57,9 +63,20 @@
     <!-- Although sometimes witnesses are defined on the tei:lem,
          sometimes they are not, and all that matters is that the
          current witness is not associated with a tei:rdg. -->
-    <xsl:if test="not(../tei:rdg[contains(concat(' ', @wit, ' '), $witness_ref)])">
-      <xsl:apply-templates />
-    </xsl:if>
+    <xsl:choose>
+      <xsl:when test="$mark_witnesses">
+        <xsl:text>&#xFDD0;</xsl:text>
+        <xsl:for-each select="../tei:rdg">
+          <xsl:value-of select="concat(' ', @wit, ' ')" />
+        </xsl:for-each>
+        <xsl:text>&#xFDD2;</xsl:text>
+        <xsl:apply-templates />
+        <xsl:text>&#xFDD3;</xsl:text>
+      </xsl:when>
+      <xsl:when test="not(../tei:rdg[contains(concat(' ', @wit, ' '), $witness_ref)])">
+        <xsl:apply-templates />
+      </xsl:when>
+    </xsl:choose>
   </xsl:template>
 
   <xsl:template match="cb:mulu" />
@@ -72,9 +89,18 @@
 
   <xsl:template match="tei:rdg">
     <xsl:variable name="wit" select="concat(' ', @wit, ' ')" />
-    <xsl:if test="contains($wit, $witness_ref)">
-      <xsl:apply-templates />
-    </xsl:if>
+    <xsl:choose>
+      <xsl:when test="$mark_witnesses">
+        <xsl:text>&#xFDD1;</xsl:text>
+        <xsl:value-of select="$wit" />
+        <xsl:text>&#xFDD2;</xsl:text>
+        <xsl:apply-templates />
+        <xsl:text>&#xFDD3;</xsl:text>
+      </xsl:when>
+      <xsl:when test="contains($wit, $witness_ref)">
+        <xsl:apply-templates />
+      </xsl:when>
+    </xsl:choose>
   </xsl:template>
 
   <xsl:template match="cb:sg">
@@ -47,6 +47,13 @@ def add_db_arguments(parser, db_option=False):
                             metavar='DATABASE')
 
 
+def add_jobs_argument(parser):
+    """Adds an argument for the number of processes to use to
+    `parser`."""
+    parser.add_argument('-j', '--jobs', default=1, help=constants.JOBS_HELP,
+                        metavar='JOBS', type=int)
+
+
 def add_query_arguments(parser):
     """Adds common arguments for query sub-commonads to `parser`."""
     parser.add_argument('catalogue', help=constants.CATALOGUE_CATALOGUE_HELP,
@@ -51,6 +51,28 @@ EXTEND_GAP_PENALTY = -0.1
 # as is, rather than further expanded.
 SCORE_THRESHOLD = 0.75
 
+# Number of rows of supplied results to add to the temporary results
+# table at a time.
+TEMPORARY_RESULTS_BATCH_SIZE = 100000
+
+# Name of the file, in the output directory of an incremental prepare
+# or strip, recording the source files each output was generated from.
+SOURCE_MANIFEST_FILENAME = '.tacl-manifest.json'
+# Name of the file to which changes to the source manifest are
+# appended as they are made, until the manifest is next saved.
+SOURCE_MANIFEST_JOURNAL_FILENAME = '.tacl-manifest.journal'
+
+# Markers in the output of strip_tei.xsl with mark_witnesses set. The
+# content of each tei:lem and tei:rdg is preceded by the lem or rdg
+# start marker, the space-padded @wit values of the tei:rdg elements
+# in question, and the witnesses end marker, and is followed by the
+# content end marker. These are Unicode noncharacters, which do not
+# occur in the texts.
+WITNESS_MARKER_LEM_START = '\ufdd0'
+WITNESS_MARKER_RDG_START = '\ufdd1'
+WITNESS_MARKER_WITNESSES_END = '\ufdd2'
+WITNESS_MARKER_CONTENT_END = '\ufdd3'
+
 # CSV field names.
 COUNT_FIELDNAME = 'count'
 COUNT_TOKENS_FIELDNAME = 'matching tokens'
@@ -84,10 +106,11 @@ STATISTICS_FIELDNAMES = (WORK_FIELDNAME, SIGLUM_FIELDNAME,
 
 # Those fieldnames whose data in Pandas should be treated as a string
 # even if they are numeric.
-STRING_FIELDNAMES = (
-    LABEL_FIELDNAME, NGRAM_FIELDNAME, SIGLA_FIELDNAME, SIGLUM_FIELDNAME,
-    WORK_FIELDNAME
-)
+STRING_FIELDNAMES = (NGRAM_FIELDNAME, SIGLA_FIELDNAME)
+# Those fieldnames whose data in Pandas should be treated as a string
+# even if they are numeric, and stored as a categorical since the
+# same values are heavily repeated.
+CATEGORICAL_FIELDNAMES = (LABEL_FIELDNAME, SIGLUM_FIELDNAME, WORK_FIELDNAME)
 
 # Command-line documentation strings.
 ENCODING_EPILOG = '''\
@@ -101,9 +124,15 @@ ALIGN_DESCRIPTION = '''\
     functionality is only appropriate for intersect results.'''
 ALIGN_EPILOG = ENCODING_EPILOG + '''\
     \n\nThis function requires the Biopython suite of software to be
-    installed. It is extremely slow and resource hungry when the
-    overlap between two witnesses is very great.'''
+    installed. It is slow and resource hungry when the overlap
+    between two witnesses is very great; lowering the maximum
+    context length limits the size of each alignment, at the cost
+    of breaking long shared passages into several sequences.'''
 ALIGN_HELP = 'Show aligned sets of matches between two witnesses side by side.'
+ALIGN_MAXIMUM_CONTEXT_HELP = '''\
+    Maximum number of characters of context on either side of an
+    n-gram to include in a sequence. By default the context is not
+    limited.'''
 ALIGN_MINIMUM_SIZE_HELP = 'Minimum size of n-gram to base sequences around.'
 ALIGN_OUTPUT_HELP = 'Directory to output alignment files to.'
 
@@ -248,6 +277,8 @@ INTERSECT_EPILOG = '''\
 ''' + ENCODING_EPILOG
 INTERSECT_HELP = 'List n-grams common to all sub-corpora.'
 
+JOBS_HELP = 'Number of processes to use.'
+
 JOIN_WORKS_CORPUS_HELP = 'Path to corpus of prepared TEI XML texts.'
 JOIN_WORKS_DESCRIPTION = '''\
     Join multiple TEI XML works split from the same original work into
@@ -335,6 +366,9 @@ NGRAMS_HELP = 'Generate n-grams from a corpus.'
 NGRAMS_MAXIMUM_HELP = 'Maximum size of n-gram to generate (integer).'
 NGRAMS_MINIMUM_HELP = 'Minimum size of n-gram to generate (integer).'
 
+NORMALISE_CACHE_HELP = '''\
+    Directory to store the compiled mapping in, for reuse by later
+    runs with the same mapping and tokenizer.'''
 NORMALISE_CORPUS_HELP = 'Directory containing corpus to be normalised.'
 NORMALISE_DESCRIPTION = '''\
     Create a copy of a corpus normalised according to a supplied mapping.'''
@@ -357,8 +391,9 @@ NORMALISE_EPILOG = '''\
     The mapping file follows a simple format of comma-separated
     values, with each line having at least two values. The first is
     the normalised form, and all subsequent values on the line being
-    the unnormalised forms. During processing, longer unnormalised
-    forms are converted first.
+    the unnormalised forms. During processing, the text is read from
+    start to end, and where more than one unnormalised form starts at
+    the same point, the longest is converted.
 
     The normalised form is mostly used internally, and so may be
     arbitrary. It may never consist of more than a single token,
@@ -366,13 +401,20 @@ NORMALISE_EPILOG = '''\
 NORMALISE_HELP = 'Create a normalised copy of a corpus.'
 NORMALISE_MAPPING_HELP = 'Path to mapping file.'
 NORMALISE_OUTPUT_HELP = 'Directory to output normalised corpus to.'
+NORMALISE_RESUME_HELP = '''\
+    Add to an existing output directory, normalising only those
+    witnesses that do not already have a normalised copy there.'''
 
 PREPARE_DESCRIPTION = '''\
     Convert CBETA TEI XML files (which may have multiple files per
     work) into XML suitable for processing via the tacl strip
     command.'''
 PREPARE_EPILOG = '''\
-    Existing files are not overwritten by this command.
+    Existing files are not overwritten by this command, except with
+    --incremental, when the output of works whose source files have
+    changed or been removed since the last incremental run into the
+    same output directory is removed before those works are prepared
+    again.
 
     The TEI source options are:
 
@@ -382,9 +424,16 @@ PREPARE_EPILOG = '''\
 PREPARE_HELP = '''\
     Convert CBETA TEI XML files into an XML form suitable for
     stripping.'''
+PREPARE_INCREMENTAL_HELP = '''\
+    Prepare only those works whose source files have changed since the
+    last incremental run.'''
 PREPARE_INPUT_HELP = 'Directory containing XML files to prepare.'
 PREPARE_OUTPUT_HELP = 'Directory to output prepared files to.'
 PREPARE_SOURCE_HELP = 'Source of TEI files.'
+PREPARE_STREAMING_HELP = '''\
+    Assemble and write each work holding only one of its source files
+    in memory at a time, for works too large to hold in memory
+    whole.'''
 
 QUERY_DESCRIPTION = '''\
     Run a query specified in a file using supplied parameters,
@@ -433,6 +482,9 @@ RESULTS_DESCRIPTION = '''\
 RESULTS_EXCISE_HELP = '''\
     Remove all results whose n-gram contains the supplied n-gram
     within it.'''
+RESULTS_EXPLAIN_HELP = '''\
+    Output the plan of operations that would be performed on the
+    results, rather than the results themselves.'''
 RESULTS_EXTEND_HELP = '''\
     Extend the results to list the highest size grams that also count
     as matches, going beyond the maximum size recorded in the
@@ -455,6 +507,15 @@ RESULTS_EPILOG = '''\
     at least two labels in the results in order to give correct
     results.
 
+    The operations are not performed one by one as listed above, but
+    are first assembled into a plan. The simple filters --remove,
+    --ngrams, --min/max-size and --excise are moved ahead of other
+    operations wherever doing so does not change the outcome (so,
+    for example, they are never moved ahead of --extend), and
+    consecutive filters are applied together in a single step. Use
+    --explain to see the plan that would be used, instead of
+    outputting the results.
+
     The denormalisation options together produce a set of results with
     all denormalised forms that occur in each witness presented, along
     with an extra column, "{}", giving the normalised form each was
@@ -671,8 +732,14 @@ STRIP_EPILOG = '''\
     This command operates on files in an augmented TEI XML format that
     is quite close to that used in the CBETA GitHub files.'''
 STRIP_HELP = 'Generate files for use with TACL from a corpus of TEI XML.'
+STRIP_INCREMENTAL_HELP = '''\
+    Strip only those files that have changed since the last
+    incremental run.'''
 STRIP_INPUT_HELP = 'Directory containing files to strip.'
 STRIP_OUTPUT_HELP = 'Directory to output stripped files to.'
+STRIP_STREAMING_HELP = '''\
+    Strip each file holding only one of its parts in memory at a time,
+    for files too large to hold in memory whole.'''
 
 SUPPLIED_DIFF_DESCRIPTION = '''\
     List n-grams unique to each set of results (as defined by the
@@ -886,7 +953,15 @@ SELECT_SEARCH_ALL_SQL = (
 SELECT_TEXT_TOKEN_COUNT_SQL = (
     'SELECT Text.token_count FROM Text WHERE Text.work = ?')
 SELECT_TEXT_SQL = 'SELECT id, checksum FROM Text WHERE work = ? AND siglum = ?'
+SELECT_TEXT_FINGERPRINT_SQL = (
+    'SELECT Text.work, Text.siglum, Text.checksum, TextHasNGram.size '
+    'FROM Text LEFT JOIN TextHasNGram ON Text.id = TextHasNGram.text '
+    'ORDER BY Text.work, Text.siglum, TextHasNGram.size')
 SELECT_TEXTS_SQL = 'SELECT id, work, siglum FROM Text'
+SELECT_WITNESS_NGRAMS_SQL = (
+    'SELECT Text.work, Text.siglum, TextNGram.ngram '
+    'FROM Text, TextNGram '
+    'WHERE Text.label IN ({}) AND Text.id = TextNGram.text')
 SELECT_WORK_TEXTS_SQL = 'SELECT id, work, siglum FROM Text WHERE work = ?'
 UPDATE_LABEL_SQL = 'UPDATE Text SET label = ? WHERE work = ?'
 UPDATE_LABELS_SQL = 'UPDATE Text SET label = ?'
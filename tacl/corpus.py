@@ -1,12 +1,20 @@
 """Module containing the Corpus class."""
 
+from concurrent.futures import ProcessPoolExecutor
 import glob
+import itertools
 import logging
 import os
 
 from .text import WitnessText
 
 
+# The corpus and variant mapping used by each worker process, set by
+# `_initialise_worker`.
+_worker_corpus = None
+_worker_mapping = None
+
+
 class Corpus:
 
     """A Corpus represents a collection of `WitnessText`s.
@@ -103,24 +111,101 @@ class Corpus:
                 glob.glob(os.path.join(self._path, pattern))
                 if os.path.isdir(filepath)]
 
-    def normalise(self, mapping, output_dir):
+    def normalise(self, mapping, output_dir, jobs=1, resume=False):
         """Creates a normalised copy of this corpus in `output_dir`.
 
-        `output_dir` must not already exist.
+        `output_dir` must not already exist, unless `resume` is True,
+        in which case only those witnesses that do not already have a
+        normalised copy in `output_dir` are normalised. Since each
+        normalised witness is written to a temporary file and then
+        renamed into place, an existing copy is always complete.
+
+        If `jobs` is greater than 1, the witnesses are divided among
+        that many processes, each of which is given `mapping` once.
 
         :param mapping: mapping between variant and normalised forms
         :type mapping: `tacl.VariantMapping`
         :param output_dir: directory to output normalised corpus to
         :type output_dir: `str`
+        :param jobs: number of processes to use
+        :type jobs: `int`
+        :param resume: whether to add to an existing normalised copy
+        :type resume: `bool`
 
         """
-        os.makedirs(output_dir)
+        os.makedirs(output_dir, exist_ok=resume)
+        witnesses = []
         for work in self.get_works():
-            work_dir = os.path.join(output_dir, work)
-            os.mkdir(work_dir)
-            for witness in self.get_witnesses(work):
-                witness_path = os.path.join(output_dir, witness.get_filename())
-                content = witness.get_token_content()
-                normalised_content = mapping.normalise(content)
-                with open(witness_path, 'w', encoding='utf-8') as fh:
-                    fh.write(normalised_content)
+            os.makedirs(os.path.join(output_dir, work), exist_ok=resume)
+            for siglum in self.get_sigla(work):
+                filename = WitnessText.assemble_filename(work, siglum)
+                if resume and os.path.exists(
+                        os.path.join(output_dir, filename)):
+                    self._logger.debug(
+                        'Skipping already normalised {}'.format(filename))
+                    continue
+                witnesses.append((work, siglum))
+        if jobs > 1 and len(witnesses) > 1:
+            with ProcessPoolExecutor(
+                    max_workers=jobs, initializer=_initialise_worker,
+                    initargs=(self, mapping)) as executor:
+                # Consume the results so that any exception raised in
+                # a worker is raised here.
+                list(executor.map(
+                    _normalise_witness, itertools.repeat(output_dir),
+                    *zip(*witnesses)))
+        else:
+            for work, siglum in witnesses:
+                self._normalise_witness(mapping, output_dir, work, siglum)
+
+    def _normalise_witness(self, mapping, output_dir, work, siglum):
+        """Writes the normalised copy of the witness `siglum` to `work`
+        to `output_dir`.
+
+        :param mapping: mapping between variant and normalised forms
+        :type mapping: `tacl.VariantMapping`
+        :param output_dir: directory to output normalised corpus to
+        :type output_dir: `str`
+        :param work: name of work
+        :type work: `str`
+        :param siglum: siglum of witness
+        :type siglum: `str`
+
+        """
+        witness = self.get_witness(work, siglum)
+        witness_path = os.path.join(output_dir, witness.get_filename())
+        temp_path = witness_path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as fh:
+            fh.write(mapping.normalise_tokens(witness.get_tokens()))
+        os.replace(temp_path, witness_path)
+
+
+def _initialise_worker(corpus, mapping):
+    """Sets the corpus and variant mapping to be used in this worker
+    process.
+
+    :param corpus: corpus to normalise
+    :type corpus: `tacl.Corpus`
+    :param mapping: mapping between variant and normalised forms
+    :type mapping: `tacl.VariantMapping`
+
+    """
+    global _worker_corpus, _worker_mapping
+    _worker_corpus = corpus
+    _worker_mapping = mapping
+
+
+def _normalise_witness(output_dir, work, siglum):
+    """Writes the normalised copy of the witness `siglum` to `work` to
+    `output_dir`, using the worker process's corpus and mapping.
+
+    :param output_dir: directory to output normalised corpus to
+    :type output_dir: `str`
+    :param work: name of work
+    :type work: `str`
+    :param siglum: siglum of witness
+    :type siglum: `str`
+
+    """
+    _worker_corpus._normalise_witness(_worker_mapping, output_dir, work,
+                                      siglum)
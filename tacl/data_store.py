@@ -1,6 +1,9 @@
 """Module containing the DataStore class."""
 
 import csv
+import hashlib
+import itertools
+import json
 import logging
 import os.path
 import sqlite3
@@ -12,6 +15,7 @@ import pandas as pd
 from . import constants
 from .exceptions import (MalformedDataStoreError, MalformedQueryError,
                          MalformedResultsError)
+from .results import Results
 from .text import WitnessText
 
 
@@ -116,12 +120,7 @@ class DataStore:
                                [(ngram,) for ngram in ngrams])
 
     def _add_temporary_results_sets(self, results_filenames, labels):
-        if len(labels) < 2:
-            raise MalformedQueryError(
-                constants.INSUFFICIENT_LABELS_QUERY_ERROR)
-        if len(results_filenames) != len(labels):
-            raise MalformedQueryError(
-                constants.SUPPLIED_ARGS_LENGTH_MISMATCH_ERROR)
+        self._check_supplied_arguments(results_filenames, labels)
         self._create_temporary_results_table()
         for results_filename, label in zip(results_filenames, labels):
             with open(results_filename, encoding='utf-8', newline='') as fh:
@@ -132,6 +131,9 @@ class DataStore:
     def _add_temporary_results(self, results, label):
         """Adds `results` to a temporary table with `label`.
 
+        The rows are read and added in batches, so that only one batch
+        is held in memory at a time.
+
         :param results: results file
         :type results: `File`
         :param label: label to be associated with results
@@ -140,16 +142,27 @@ class DataStore:
         """
         NGRAM, SIZE, NAME, SIGLUM, COUNT, LABEL = constants.QUERY_FIELDNAMES
         reader = csv.DictReader(results)
-        try:
-            data = [(row[NGRAM], row[SIZE], row[NAME], row[SIGLUM], row[COUNT],
-                     label) for row in reader]
-        except KeyError:
-            missing_cols = [col for col in constants.QUERY_FIELDNAMES if col
-                            not in reader.fieldnames]
+        if reader.fieldnames is None:
+            return
+        missing_cols = [col for col in constants.QUERY_FIELDNAMES[:-1]
+                        if col not in reader.fieldnames]
+        if missing_cols:
             raise MalformedResultsError(
                 constants.MISSING_REQUIRED_COLUMNS_ERROR.format(
                     ', '.join(missing_cols)))
-        self._conn.executemany(constants.INSERT_TEMPORARY_RESULTS_SQL, data)
+        data = ((row[NGRAM], row[SIZE], row[NAME], row[SIGLUM], row[COUNT],
+                 label) for row in reader)
+        row_count = 0
+        while True:
+            batch = list(itertools.islice(
+                data, constants.TEMPORARY_RESULTS_BATCH_SIZE))
+            if not batch:
+                break
+            self._conn.executemany(constants.INSERT_TEMPORARY_RESULTS_SQL,
+                                   batch)
+            row_count += len(batch)
+            self._logger.info('Added {} rows of results labelled {}'.format(
+                row_count, label))
 
     def _add_temporary_results_index(self):
         self._logger.info('Adding index to temporary results table')
@@ -278,6 +291,24 @@ class DataStore:
             row[constants.COUNT_FIELDNAME] = 0
         return row
 
+    @staticmethod
+    def _check_supplied_arguments(results_sets, labels):
+        """Raises an exception if `results_sets` and `labels` are not
+        suitable arguments for a supplied query.
+
+        :param results_sets: results to be queried
+        :type results_sets: `list`
+        :param labels: labels to be applied to the results sets
+        :type labels: `list`
+
+        """
+        if len(labels) < 2:
+            raise MalformedQueryError(
+                constants.INSUFFICIENT_LABELS_QUERY_ERROR)
+        if len(results_sets) != len(labels):
+            raise MalformedQueryError(
+                constants.SUPPLIED_ARGS_LENGTH_MISMATCH_ERROR)
+
     def counts(self, catalogue, output_fh):
         """Returns `output_fh` populated with CSV results giving
         n-gram counts of the witnesses of the works in `catalogue`.
@@ -473,8 +504,13 @@ class DataStore:
         these sets, except in the case where there are only two
         labels.
 
-        :param results_filenames: list of results filenames to be diffed
-        :type results_filenames: `list` of `str`
+        If any of the results sets is supplied already loaded, as
+        `Results` or a `pandas.DataFrame`, the diff is performed in
+        memory rather than in the database.
+
+        :param results_filenames: list of results to be diffed
+        :type results_filenames: `list` of `str`, `Results` or
+                                 `pandas.DataFrame`
         :param labels: labels to be applied to the results_sets
         :type labels: `list`
         :param tokenizer: tokenizer for the n-grams
@@ -484,6 +520,11 @@ class DataStore:
         :rtype: file-like object
 
         """
+        if self._has_loaded_results(results_filenames):
+            matches = self._get_supplied_matches(results_filenames, labels)
+            self._logger.info('Running supplied diff in memory')
+            matches = matches[self._get_label_counts(matches) == 1]
+            return self._reduce_diff_results(matches, tokenizer, output_fh)
         self._add_temporary_results_sets(results_filenames, labels)
         query = constants.SELECT_DIFF_SUPPLIED_SQL
         self._logger.info('Running supplied diff query')
@@ -501,6 +542,22 @@ class DataStore:
     def _get_checksum(self, text_id):
         """Returns the checksum for the text with `text_id`."""
 
+    def get_fingerprint(self):
+        """Returns a fingerprint of the n-gram data in this data store.
+
+        The fingerprint is derived from the checksum of each witness
+        and the sizes of n-grams held for it, and so changes whenever
+        n-grams are added or updated, but not when labels are set by
+        a query.
+
+        :rtype: `str`
+
+        """
+        checksum = hashlib.md5()
+        for row in self._conn.execute(constants.SELECT_TEXT_FINGERPRINT_SQL):
+            checksum.update(json.dumps(list(row)).encode('utf-8'))
+        return checksum.hexdigest()
+
     @staticmethod
     def _get_intersection_subquery(labels):
         # Create nested subselects.
@@ -514,6 +571,19 @@ class DataStore:
                            subquery)
         return subquery
 
+    @staticmethod
+    def _get_label_counts(matches):
+        """Returns the number of distinct labels that the n-gram of each
+        row of `matches` has in `matches`.
+
+        :param matches: results rows
+        :type matches: `pandas.DataFrame`
+        :rtype: `pandas.Series`
+
+        """
+        return matches.groupby(constants.NGRAM_FIELDNAME, sort=False)[
+            constants.LABEL_FIELDNAME].transform('nunique')
+
     @staticmethod
     def _get_placeholders(items):
         """Returns a string of placeholders, one for each item in
@@ -526,6 +596,43 @@ class DataStore:
         """
         return ('?,' * len(items)).strip(',')
 
+    def _get_supplied_matches(self, results_sets, labels):
+        """Returns the rows of each of `results_sets`, labelled with the
+        corresponding label in `labels`.
+
+        :param results_sets: results to be queried
+        :type results_sets: `list` of `str`, `Results` or
+                            `pandas.DataFrame`
+        :param labels: labels to be applied to the results sets
+        :type labels: `list`
+        :rtype: `pandas.DataFrame`
+
+        """
+        self._check_supplied_arguments(results_sets, labels)
+        NGRAM, SIZE, NAME, SIGLUM, COUNT, LABEL = constants.QUERY_FIELDNAMES
+        frames = []
+        for results, label in zip(results_sets, labels):
+            if isinstance(results, Results):
+                results = results.get_raw_data()
+            elif not isinstance(results, pd.DataFrame):
+                results = pd.read_csv(results, encoding='utf-8',
+                                      na_filter=False)
+            missing_cols = [col for col in constants.QUERY_FIELDNAMES[:-1]
+                            if col not in results.columns]
+            if missing_cols:
+                raise MalformedResultsError(
+                    constants.MISSING_REQUIRED_COLUMNS_ERROR.format(
+                        ', '.join(missing_cols)))
+            frame = pd.DataFrame({
+                NGRAM: results[NGRAM].astype(str),
+                SIZE: results[SIZE].astype(int),
+                NAME: results[NAME].astype(str),
+                SIGLUM: results[SIGLUM].astype(str),
+                COUNT: results[COUNT].astype(int)})
+            frame[LABEL] = label
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True)
+
     def _get_text_id(self, witness):
         """Returns the database ID of the Text record for `witness`.
 
@@ -576,6 +683,39 @@ class DataStore:
             rows = self._conn.execute(query, [work]).fetchall()
         return {row['id']: [row['work'], row['siglum']] for row in rows}
 
+    def get_witness_ngrams(self, catalogue):
+        """Returns a cursor over rows giving the work, siglum and n-gram
+        of every n-gram of every witness of the labelled works in
+        `catalogue`.
+
+        This is a single scan of the n-grams of those works, in no
+        particular order.
+
+        :param catalogue: catalogue matching filenames to labels
+        :type catalogue: `Catalogue`
+        :rtype: `sqlite3.Cursor`
+
+        """
+        labels = list(self._set_labels(catalogue))
+        label_placeholders = self._get_placeholders(labels)
+        query = constants.SELECT_WITNESS_NGRAMS_SQL.format(label_placeholders)
+        self._logger.info('Running witness n-grams query')
+        self._logger.debug('Query: {}\nLabels: {}'.format(query, labels))
+        return self._conn.execute(query, labels)
+
+    @staticmethod
+    def _has_loaded_results(results_sets):
+        """Returns True if any of `results_sets` is already loaded
+        rather than a path to a results file.
+
+        :param results_sets: results to be queried
+        :type results_sets: `list`
+        :rtype: `bool`
+
+        """
+        return any(isinstance(results, (Results, pd.DataFrame))
+                   for results in results_sets)
+
     def _has_ngrams(self, text_id, size):
 
         """Returns True if a text has existing records for n-grams of
@@ -639,8 +779,13 @@ class DataStore:
         that are common to witnesses in every set of works in
         `results_sets`, using the labels in `labels`.
 
-        :param results_filenames: list of results to be diffed
-        :type results_filenames: `list` of `str`
+        If any of the results sets is supplied already loaded, as
+        `Results` or a `pandas.DataFrame`, the intersection is
+        performed in memory rather than in the database.
+
+        :param results_filenames: list of results to be intersected
+        :type results_filenames: `list` of `str`, `Results` or
+                                 `pandas.DataFrame`
         :param labels: labels to be applied to the results_sets
         :type labels: `list`
         :param output_fh: object to output results to
@@ -648,6 +793,12 @@ class DataStore:
         :rtype: file-like object
 
         """
+        if self._has_loaded_results(results_filenames):
+            matches = self._get_supplied_matches(results_filenames, labels)
+            self._logger.info('Running supplied intersect in memory')
+            matches = matches[self._get_label_counts(matches) == len(labels)]
+            matches.to_csv(output_fh, encoding='utf-8', index=False)
+            return output_fh
         self._add_temporary_results_sets(results_filenames, labels)
         query = constants.SELECT_INTERSECT_SUPPLIED_SQL
         parameters = [len(labels)]
@@ -675,9 +826,9 @@ class DataStore:
         headers = [column[0] for column in cursor.description]
         return self._csv(cursor, headers, output_fh)
 
-    def _reduce_diff_results(self, matches_path, tokenizer, output_fh):
+    def _reduce_diff_results(self, matches, tokenizer, output_fh):
         """Returns `output_fh` populated with a reduced set of data from
-        `matches_fh`.
+        `matches`.
 
         Diff results typically contain a lot of filler results that
         serve only to hide real differences. If one text has a single
@@ -686,8 +837,9 @@ class DataStore:
         not helpful. This method removes these filler results by
         'reducing down' the results.
 
-        :param matches_path: filepath or buffer of CSV results to be reduced
-        :type matches_path: `str` or file-like object
+        :param matches: filepath or buffer of CSV results, or results
+                        data, to be reduced
+        :type matches: `str`, file-like object or `pandas.DataFrame`
         :param tokenizer: tokenizer for the n-grams
         :type tokenizer: `Tokenizer`
         :param output_fh: object to write results to
@@ -702,10 +854,11 @@ class DataStore:
         results = []
         previous_witness = (None, None)
         previous_data = {}
+        if not isinstance(matches, pd.DataFrame):
+            matches = pd.read_csv(matches, encoding='utf-8', na_filter=False)
         # Operate over individual witnesses and sizes, so that there
         # is no possible results pollution between them.
-        grouped = pd.read_csv(matches_path, encoding='utf-8',
-                              na_filter=False).groupby(
+        grouped = matches.groupby(
             [constants.WORK_FIELDNAME, constants.SIGLUM_FIELDNAME,
              constants.SIZE_FIELDNAME])
         cols = [constants.NGRAM_FIELDNAME, constants.COUNT_FIELDNAME]
@@ -28,3 +28,22 @@ def requires_columns(required_cols):
             return f(*args, **kwargs)
         return decorated_function
     return dec
+
+
+def deferrable(f):
+    """Decorator that records a call to the decorated method in the plan
+    of the `Results` object bearing it, rather than executing it, when
+    that object is lazy.
+
+    This decorator must be applied outside of `requires_columns`, so
+    that the required columns are checked when the plan is executed.
+
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        plan = args[0]._plan
+        if plan is not None:
+            plan.append((f.__name__, args[1:], kwargs))
+            return
+        return f(*args, **kwargs)
+    return decorated_function
@@ -1,20 +1,28 @@
 """Module containing the Highlighter class."""
 
+from concurrent.futures import ProcessPoolExecutor
+import itertools
 import logging
 import re
 
-from lxml import etree
+import numpy as np
 import pandas as pd
 
 from . import constants
 from .colour import generate_colours
 from .report import Report
-from .text import WitnessText
+from .text import Text, WitnessText
+
+
+# The HighlightReport and its compiled template used by each worker
+# process, set by `_initialise_worker`.
+_worker_report = None
+_worker_template = None
 
 
 class HighlightReport(Report):
 
-    _base_token_markup = r'<span>\1</span>'
+    _base_token_attributes = ''
 
     def __init__(self, corpus, tokenizer):
         self._logger = logging.getLogger(__name__)
@@ -35,26 +43,113 @@ class HighlightReport(Report):
         content = re.sub(r'&#160; ', '&#160;&#160;', content)
         return content
 
-    def _generate_base(self, work, siglum):
+    def _get_base_text(self, work, siglum):
+        """Returns the text of the witness `siglum` to `work`, without
+        those characters that should be escaped for XML input (but
+        which cause problems when escaped, since they become tokens).
+
+        :param work: name of work
+        :type work: `str`
+        :param siglum: siglum of witness
+        :type siglum: `str`
+        :rtype: `str`
+
+        """
         witness = self._corpus.get_witness(work, siglum)
-        content = witness.content.strip()
-        return self._prepare_text(content)
+        return re.sub(r'[<>&]', '', witness.content.strip())
 
-    def _get_regexp_pattern(self, ngram):
-        inter_token_pattern = r'</span>\W*<span[^>]*>'
-        pattern = inter_token_pattern.join(
-            [re.escape(token) for token in self._tokenizer.tokenize(ngram)])
-        return r'(<span[^>]*>{}</span>)'.format(pattern)
+    def _get_ngram_coverage(self, text, ngrams):
+        """Returns a boolean array marking those tokens in `text` that
+        are part of an occurrence of any of `ngrams`.
+
+        :param text: text to find the n-grams in
+        :type text: `tacl.Text`
+        :param ngrams: n-grams to mark the occurrences of
+        :type ngrams: `list` of `str`
+        :rtype: `numpy.ndarray`
+
+        """
+        indices, starts, ends = self._get_ngram_occurrences(text, ngrams)
+        return Text.get_coverage(len(text.tokens), starts, ends)
+
+    def _get_ngram_occurrences(self, text, ngrams):
+        """Returns the index in `ngrams`, start token position and end
+        token position of each occurrence in `text` of those n-grams.
+
+        If `ngrams` contains n-grams with the same tokens, only the
+        first is reported. Occurrences of an n-gram that overlap an
+        earlier included occurrence of the same n-gram are excluded,
+        as they would be by a regular expression substitution.
+
+        :param text: text to find the n-grams in
+        :type text: `tacl.Text`
+        :param ngrams: n-grams to locate
+        :type ngrams: `list` of `str`
+        :rtype: `tuple` of `numpy.ndarray`
+
+        """
+        indices, starts, ends = text.get_ngram_positions(ngrams)
+        order = np.lexsort((starts, indices))
+        indices, starts, ends = indices[order], starts[order], ends[order]
+        overlapping = (indices[1:] == indices[:-1]) & (starts[1:] < ends[:-1])
+        if overlapping.any():
+            keep = np.ones(len(indices), dtype=bool)
+            last_index, last_end = -1, 0
+            for position, (index, start, end) in enumerate(zip(
+                    indices.tolist(), starts.tolist(), ends.tolist())):
+                if index == last_index and start < last_end:
+                    keep[position] = False
+                else:
+                    last_index, last_end = index, end
+            indices, starts, ends = indices[keep], starts[keep], ends[keep]
+        return indices, starts, ends
 
     def generate(self, output_dir, work, *args):
         raise NotImplementedError
 
-    def _prepare_text(self, text):
-        """Returns `text` with each consituent token wrapped in HTML markup
-        for later match annotation.
+    def _generate_witnesses(self, output_dir, work, witness_args, jobs):
+        """Generates the HTML report for each witness to `work`.
+
+        Each item in `witness_args` is the tuple of arguments, after
+        the template, output directory and work, to pass to
+        `_generate_witness` for one witness. If `jobs` is greater than
+        1, the witnesses are divided among that many processes, each
+        of which compiles the template once.
+
+        :param output_dir: directory to write reports to
+        :type output_dir: `str`
+        :param work: name of work to highlight
+        :type work: `str`
+        :param witness_args: arguments for each witness
+        :type witness_args: `list` of `tuple`
+        :param jobs: number of processes to use
+        :type jobs: `int`
+
+        """
+        if jobs > 1 and len(witness_args) > 1:
+            with ProcessPoolExecutor(
+                    max_workers=jobs, initializer=_initialise_worker,
+                    initargs=(self,)) as executor:
+                # Consume the results so that any exception raised
+                # in a worker is raised here.
+                list(executor.map(
+                    _generate_witness, itertools.repeat(output_dir),
+                    itertools.repeat(work), witness_args))
+        else:
+            template = self._get_template()
+            for args in witness_args:
+                self._generate_witness(template, output_dir, work, *args)
+
+    def _prepare_text(self, text, token_attributes=None):
+        """Returns `text` with each consituent token wrapped in HTML markup.
+
+        The attributes of the markup of each token are taken from
+        `token_attributes`, if supplied.
 
         :param text: text to be marked up
         :type text: `str`
+        :param token_attributes: attributes for each token in `text`
+        :type token_attributes: `list` of `str`
         :rtype: `str`
 
         """
@@ -62,8 +157,17 @@ class HighlightReport(Report):
         # which cause problems when escaped, since they become
         # tokens).
         text = re.sub(r'[<>&]', '', text)
-        pattern = r'({})'.format(self._tokenizer.pattern)
-        return re.sub(pattern, self._base_token_markup, text)
+        if token_attributes is None:
+            token_attributes = itertools.repeat(self._base_token_attributes)
+        html = []
+        position = 0
+        for match, attributes in zip(
+                re.finditer(self._tokenizer.pattern, text), token_attributes):
+            html.append(text[position:match.start()])
+            html.append('<span{}>{}</span>'.format(attributes, match.group()))
+            position = match.end()
+        html.append(text[position:])
+        return ''.join(html)
 
     def _write(self, work, siglum, text, report_dir, report_name,
                template, copy_assets=False, **kwargs):
@@ -77,21 +181,10 @@ class HighlightReport(Report):
 
 class NgramHighlightReport (HighlightReport):
 
-    _base_token_markup = r'<span>\1</span>'
-    _ngrams_count = 1
     _report_name = 'ngram_highlight'
 
-    def _annotate_tokens(self, match_obj):
-        match = match_obj.group(0)
-        root = etree.fromstring('<div>{}</div>'.format(match))
-        for span in root.xpath('//span'):
-            if self._add_highlight:
-                span.set('class', 'highlight{}'.format(self._ngrams_count))
-            elif span.get('class'):
-                del span.attrib['class']
-        return etree.tostring(root, encoding='unicode')[5:-6]
-
-    def generate(self, output_dir, work, ngrams, labels, minus_ngrams):
+    def generate(self, output_dir, work, ngrams, labels, minus_ngrams,
+                 jobs=1):
         """Generates HTML reports for each witness to `work`, showing its text
         with the n-grams in `ngrams` highlighted.
 
@@ -108,59 +201,98 @@ class NgramHighlightReport (HighlightReport):
         :type labels: `list` of `str`
         :param minus_ngrams: n-grams to remove highlighting from
         :type minus_ngrams: `list` of `str`
+        :param jobs: number of processes to use
+        :type jobs: `int`
         :rtype: `str`
 
         """
-        template = self._get_template()
         colours = generate_colours(len(ngrams))
-        for siglum in self._corpus.get_sigla(work):
-            ngram_data = zip(labels, ngrams)
-            content = self._generate_base(work, siglum)
-            for ngrams_group in ngrams:
-                content = self._highlight(content, ngrams_group, True)
-            content = self._highlight(content, minus_ngrams, False)
-            self._ngrams_count = 1
-            content = self._format_content(content)
-            report_name = '{}-{}.html'.format(work, siglum)
-            self._write(work, siglum, content, output_dir, report_name,
-                        template, ngram_data=ngram_data,
-                        minus_ngrams=minus_ngrams, colours=colours)
-
-    def _highlight(self, content, ngrams, highlight):
-        """Returns `content` with its n-grams from `ngrams` highlighted (if
-        `add_class` is True) or unhighlighted.
-
-        :param content: text to be modified
+        witness_args = [(siglum, ngrams, labels, minus_ngrams, colours)
+                        for siglum in self._corpus.get_sigla(work)]
+        self._generate_witnesses(output_dir, work, witness_args, jobs)
+
+    def _generate_witness(self, template, output_dir, work, siglum, ngrams,
+                          labels, minus_ngrams, colours):
+        """Generates the HTML report for the witness `siglum` to `work`.
+
+        :param template: template to render the report with
+        :type template: `jinja2.Template`
+        :param output_dir: directory to write report to
+        :type output_dir: `str`
+        :param work: name of work to highlight
+        :type work: `str`
+        :param siglum: siglum of witness to highlight
+        :type siglum: `str`
+        :param ngrams: groups of n-grams to highlight
+        :type ngrams: `list` of `list` of `str`
+        :param labels: labels for the groups of n-grams
+        :type labels: `list` of `str`
+        :param minus_ngrams: n-grams to remove highlighting from
+        :type minus_ngrams: `list` of `str`
+        :param colours: colours for the groups of n-grams
+        :type colours: `list` of `str`
+
+        """
+        ngram_data = zip(labels, ngrams)
+        content = self._highlight(self._get_base_text(work, siglum), ngrams,
+                                  minus_ngrams)
+        content = self._format_content(content)
+        report_name = '{}-{}.html'.format(work, siglum)
+        self._write(work, siglum, content, output_dir, report_name, template,
+                    ngram_data=ngram_data, minus_ngrams=minus_ngrams,
+                    colours=colours)
+
+    def _get_token_highlights(self, text, ngrams, minus_ngrams):
+        """Returns the number of the group of n-grams in `ngrams` to
+        highlight each token in `text` as, or 0 for no highlighting.
+
+        A token covered by n-grams in more than one group is
+        highlighted as the last of those groups. A token covered by
+        any n-gram in `minus_ngrams` is not highlighted.
+
+        :param text: text to highlight
+        :type text: `tacl.Text`
+        :param ngrams: groups of n-grams to highlight
+        :type ngrams: `list` of `list` of `str`
+        :param minus_ngrams: n-grams to remove highlighting from
+        :type minus_ngrams: `list` of `str`
+        :rtype: `numpy.ndarray`
+
+        """
+        highlights = np.zeros(len(text.tokens), dtype=np.int64)
+        for group_number, ngrams_group in enumerate(ngrams, start=1):
+            highlights[self._get_ngram_coverage(text, ngrams_group)] = \
+                group_number
+        highlights[self._get_ngram_coverage(text, minus_ngrams)] = 0
+        return highlights
+
+    def _highlight(self, content, ngrams, minus_ngrams):
+        """Returns `content` with each consituent token wrapped in HTML
+        markup, highlighting the n-grams in each group of `ngrams`
+        other than where they are covered by `minus_ngrams`.
+
+        :param content: text to be marked up
         :type content: `str`
-        :param ngrams: n-grams to modify
-        :type ngrams: `list` of `str`
-        :param highlight: whether to highlight or unhighlight `ngrams`
-        :type highlight: `bool`
+        :param ngrams: groups of n-grams to highlight
+        :type ngrams: `list` of `list` of `str`
+        :param minus_ngrams: n-grams to remove highlighting from
+        :type minus_ngrams: `list` of `str`
         :rtype: `str`
 
         """
-        self._add_highlight = highlight
-        for ngram in ngrams:
-            pattern = self._get_regexp_pattern(ngram)
-            content = re.sub(pattern, self._annotate_tokens, content)
-        self._ngrams_count += 1
-        return content
+        highlights = self._get_token_highlights(
+            Text(content, self._tokenizer), ngrams, minus_ngrams)
+        return self._prepare_text(content, [
+            ' class="highlight{}"'.format(group_number) if group_number
+            else self._base_token_attributes
+            for group_number in highlights.tolist()])
 
 
 class ResultsHighlightReport (HighlightReport):
 
-    _base_token_markup = r'<span data-count="0" data-texts=" ">\1</span>'
+    _base_token_attributes = ' data-count="0" data-texts=" "'
     _report_name = 'results_highlight'
-
-    def _annotate_tokens(self, match_obj):
-        match = match_obj.group(0)
-        root = etree.fromstring('<div>{}</div>'.format(match))
-        for span in root.xpath('//span'):
-            texts = span.get('data-texts')
-            if ' {} '.format(self._match_source) not in texts:
-                new_value = '{}{} '.format(texts, self._match_source)
-                span.set('data-texts', new_value)
-        return etree.tostring(root, encoding='unicode')[5:-6]
+    _token_attributes = ' data-count="0" data-texts=" {}"'
 
     @staticmethod
     def _generate_text_list(matches):
@@ -172,7 +304,7 @@ class ResultsHighlightReport (HighlightReport):
         text_list.sort()
         return text_list
 
-    def generate(self, output_dir, work, matches_filename):
+    def generate(self, output_dir, work, matches_filename, jobs=1):
         """Generates HTML reports showing the text of each witness to `work`
         with its matches in `matches` highlighted.
 
@@ -182,27 +314,147 @@ class ResultsHighlightReport (HighlightReport):
         :type text_name: `str`
         :param matches_filename: file containing matches to highlight
         :type matches_filename: `str`
+        :param jobs: number of processes to use
+        :type jobs: `int`
         :rtype: `str`
 
         """
-        template = self._get_template()
         matches = pd.read_csv(matches_filename)
-        for siglum in self._corpus.get_sigla(work):
-            subm = matches[(matches[constants.WORK_FIELDNAME] != work) |
-                           (matches[constants.SIGLUM_FIELDNAME] != siglum)]
-            content = self._generate_base(work, siglum)
-            content = self._highlight(content, subm)
-            content = self._format_content(content)
-            text_list = self._generate_text_list(subm)
-            report_name = '{}-{}.html'.format(work, siglum)
-            self._write(work, siglum, content, output_dir, report_name,
-                        template, True, text_list=text_list)
+        sigla = self._corpus.get_sigla(work)
+        # Each witness is highlighted with the matches from every
+        # witness other than itself. Marking the rows of the
+        # witnesses to `work` with their siglum (and all other rows
+        # with null) allows each witness's matches to be selected
+        # with a single comparison.
+        witness_sigla = matches[constants.SIGLUM_FIELDNAME].where(
+            matches[constants.WORK_FIELDNAME] == work)
+        witness_args = [(siglum, matches[witness_sigla != siglum])
+                        for siglum in sigla]
+        if witness_args:
+            self._copy_static_assets(output_dir)
+        self._generate_witnesses(output_dir, work, witness_args, jobs)
+
+    def _generate_witness(self, template, output_dir, work, siglum, matches):
+        """Generates the HTML report for the witness `siglum` to `work`.
+
+        :param template: template to render the report with
+        :type template: `jinja2.Template`
+        :param output_dir: directory to write report to
+        :type output_dir: `str`
+        :param work: name of work to highlight
+        :type work: `str`
+        :param siglum: siglum of witness to highlight
+        :type siglum: `str`
+        :param matches: matches to highlight
+        :type matches: `pandas.DataFrame`
+
+        """
+        content = self._highlight(self._get_base_text(work, siglum), matches)
+        content = self._format_content(content)
+        text_list = self._generate_text_list(matches)
+        report_name = '{}-{}.html'.format(work, siglum)
+        self._write(work, siglum, content, output_dir, report_name, template,
+                    text_list=text_list)
+
+    def _get_token_sources(self, text, matches):
+        """Returns, for each token in `text`, the list of witnesses in
+        `matches` having an n-gram that covers that token.
+
+        Each list is in the order in which its witnesses first cover
+        the token in `matches`. As when highlighting each n-gram in
+        turn, occurrences of an n-gram that overlap an earlier
+        occurrence of the same n-gram are not counted.
+
+        :param text: text to find the n-grams in
+        :type text: `tacl.Text`
+        :param matches: matches to highlight
+        :type matches: `pandas.DataFrame`
+        :rtype: `list` of `list` of `str`
+
+        """
+        token_sources = [[] for token in text.tokens]
+        if matches.empty:
+            return token_sources
+        # N-grams that differ only in the text between their tokens
+        # are treated as the same n-gram.
+        ngram_codes, ngrams = pd.factorize(
+            matches[constants.NGRAM_FIELDNAME].astype(str))
+        ngram_codes, ngrams = pd.factorize(np.array([
+            self._tokenizer.joiner.join(self._tokenizer.tokenize(ngram))
+            for ngram in ngrams], dtype=object)[ngram_codes])
+        source_codes, sources = pd.factorize(pd.Series([
+            WitnessText.assemble_filename(work, siglum) for work, siglum in
+            zip(matches[constants.WORK_FIELDNAME],
+                matches[constants.SIGLUM_FIELDNAME])]))
+        indices, starts, ends = self._get_ngram_occurrences(
+            text, list(ngrams))
+        occurrences = pd.DataFrame({'ngram': indices, 'start': starts,
+                                    'end': ends})
+        rows = pd.DataFrame({'ngram': ngram_codes, 'source': source_codes,
+                             'row': np.arange(len(ngram_codes))})
+        # Only the first row to give a source for each occurrence
+        # matters for the order of that source.
+        covers = occurrences.merge(rows, on='ngram').sort_values(
+            by='row', kind='stable').drop_duplicates(
+                subset=['start', 'end', 'source'])
+        lengths = (covers['end'] - covers['start']).to_numpy()
+        offsets = np.arange(lengths.sum()) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths)
+        tokens = pd.DataFrame({
+            'token': np.repeat(covers['start'].to_numpy(), lengths) + offsets,
+            'row': np.repeat(covers['row'].to_numpy(), lengths),
+            'source': np.repeat(covers['source'].to_numpy(), lengths)})
+        tokens = tokens.sort_values(by=['token', 'row'], kind='stable')
+        tokens = tokens.drop_duplicates(subset=['token', 'source'])
+        for token, source in zip(tokens['token'].tolist(),
+                                 tokens['source'].tolist()):
+            token_sources[token].append(sources[source])
+        return token_sources
 
     def _highlight(self, content, matches):
-        for row_index, row in matches.iterrows():
-            ngram = row[constants.NGRAM_FIELDNAME]
-            self._match_source = WitnessText.assemble_filename(
-                row[constants.WORK_FIELDNAME], row[constants.SIGLUM_FIELDNAME])
-            pattern = self._get_regexp_pattern(ngram)
-            content = re.sub(pattern, self._annotate_tokens, content)
-        return content
+        """Returns `content` with each consituent token wrapped in HTML
+        markup listing the witnesses in `matches` that have an n-gram
+        covering that token.
+
+        :param content: text to be marked up
+        :type content: `str`
+        :param matches: matches to highlight
+        :type matches: `pandas.DataFrame`
+        :rtype: `str`
+
+        """
+        token_sources = self._get_token_sources(
+            Text(content, self._tokenizer), matches)
+        return self._prepare_text(content, [
+            self._token_attributes.format(
+                ''.join(source + ' ' for source in sources))
+            for sources in token_sources])
+
+
+def _generate_witness(output_dir, work, args):
+    """Generates the HTML report for one witness to `work`, using the
+    worker process's report and template.
+
+    :param output_dir: directory to write report to
+    :type output_dir: `str`
+    :param work: name of work to highlight
+    :type work: `str`
+    :param args: remaining arguments to `_generate_witness`
+    :type args: `tuple`
+
+    """
+    _worker_report._generate_witness(_worker_template, output_dir, work,
+                                     *args)
+
+
+def _initialise_worker(report):
+    """Sets the report to be used in this worker process, and compiles
+    its template.
+
+    :param report: report to generate witness reports with
+    :type report: `HighlightReport`
+
+    """
+    global _worker_report, _worker_template
+    _worker_report = report
+    _worker_template = report._get_template()
@@ -1,16 +1,16 @@
+import array
+from concurrent.futures import as_completed, ProcessPoolExecutor
 import csv
-import io
 import json
 import logging
 import os
 
+import numpy as np
 import pandas as pd
 
-from . import constants
 from .colour import generate_colours
 from .report import Report
-from .results import Results
-from .statistics_report import StatisticsReport
+from .text import WitnessText
 
 
 # Data headers.
@@ -25,6 +25,14 @@ SIGLUM = 'siglum'
 UNIQUE = 'unique'  # Text unique to yes.
 WORK = 'work'
 
+MANIFEST_FILENAME = 'manifest.json'
+
+# The corpus, "maybe" works and n-gram membership data used by each
+# worker process, set by `_initialise_worker`.
+_worker_corpus = None
+_worker_maybe_works = None
+_worker_membership = None
+
 
 class JitCReport(Report):
 
@@ -35,31 +43,29 @@ class JitCReport(Report):
     the same catalogue file) that are similar to those in the first,
     but not in the way(s) that are the subject of the investigation.
 
-    Given the two corpora, Maybe and No, the script performs the
-    following actions:
-
-    1. For each work Y in Maybe:
-
-      1. Run an intersection between Y and No.
-      2. For each work M in Maybe (excluding Y):
+    Given the two corpora, Maybe and No, the script derives, for each
+    work Y in Maybe and each witness of each other work M in Maybe,
+    the percentage of the witness's tokens that are:
 
-        1. Run an intersect between Y and M.
-        2. Run a supplied diff between results from [1.2.1] and
-           results from [1.1].
-        3. Get number of tokens in M.
+    * shared: part of an n-gram that is in Y but not in No, and that
+      is not filler (as when reducing diff results);
+    * common: otherwise part of an n-gram that is in Y; and
+    * unique: in no n-gram that is in Y.
 
-      3. Rank and list works in Maybe in descending order of the
-         ratio, from [1.2.2], of matching tokens (n-gram size x count)
-         to total tokens [1.2.3].
+    Works in Maybe are then ranked for each Y by the shared
+    percentage, and all of the statistics presented in an HTML
+    report.
 
-    2. Concatenate all results from [1.2.2] and present them in an
-       HTML report.
+    Rather than run an intersection and a diff for each pair of
+    works, the n-grams of all of the works are read from the data
+    store in a single pass, recording which works have each n-gram,
+    and every pairwise statistic is derived from that.
 
-    Note that in the above, when a work is treated as Y, its witnesses
-    are not treated separately. The statistics derived from queries
-    including it are those that treat all of its witnesses together;
-    eg, if two n-grams in a witness of M are found only in two
-    different witnesses of Y, they will both be counted as shared.
+    Note that when a work is treated as Y, its witnesses are not
+    treated separately. The statistics derived from it are those that
+    treat all of its witnesses together; eg, if two n-grams in a
+    witness of M are found only in two different witnesses of Y, they
+    will both be counted as shared.
 
     """
 
@@ -163,22 +169,7 @@ class JitCReport(Report):
         csv_path = os.path.join(output_dir, 'related_{}.csv'.format(work))
         chart_data.to_csv(csv_path)
 
-    def _drop_no_label_results(self, results, fh):
-        """Writes `results` to `fh` minus those results associated with the
-        'no' label.
-
-        :param results: results to be manipulated
-        :type results: file-like object
-        :param fh: output destination
-        :type fh: file-like object
-
-        """
-        results.seek(0)
-        results = Results(results, self._tokenizer)
-        results.remove_label(self._no_label)
-        results.csv(fh)
-
-    def generate(self, output_dir, catalogue, maybe_label):
+    def generate(self, output_dir, catalogue, maybe_label, jobs=1):
         maybe_works = [work for work, label in catalogue.items()
                        if label == maybe_label]
         maybe_works.sort()
@@ -187,7 +178,8 @@ class JitCReport(Report):
         no_works.sort()
         self._maybe_label = maybe_label
         self._no_label = catalogue[no_works[0]]
-        data = self._process_works(maybe_works, no_works, output_dir)
+        data = self._process_works(maybe_works, no_works, output_dir,
+                                   jobs)
         grouped = data.groupby(level=[BASE_WORK, RELATED_WORK],
                                axis=0, group_keys=False)
         max_data = grouped.apply(lambda x: x.loc[x[SHARED].idxmax()])
@@ -213,25 +205,83 @@ class JitCReport(Report):
                    'tables': tables, 'works': works}
         self._write(context, output_dir, 'report.html', report_assets_dir)
 
-    def _generate_statistics(self, out_path, results_path):
-        """Writes a statistics report for the results at `results_path` to
-        `out_path`.
+    def _get_inputs_fingerprint(self, maybe_works, no_works):
+        """Returns a fingerprint of the inputs to the statistics of
+        `maybe_works` and `no_works`.
 
-        Reuses an existing statistics report if one exists at
-        `out_path`.
+        :param maybe_works: names of "maybe" works
+        :type maybe_works: `list` of `str`
+        :param no_works: names of "no" works
+        :type no_works: `list` of `str`
+        :rtype: `dict`
 
-        :param out_path: path to output statistics report to
-        :type out_path: `str`
-        :param results_path: path of results to generate statistics for
-        :type results_path: `str`
+        """
+        witnesses = {}
+        for work in maybe_works:
+            for siglum in sorted(self._corpus.get_sigla(work)):
+                filename = WitnessText.assemble_filename(work, siglum)
+                stat = os.stat(os.path.join(self._corpus.path, filename))
+                witnesses[filename] = [stat.st_size, stat.st_mtime_ns]
+        return {
+            'corpus': self._corpus.path,
+            'data_store': self._store.get_fingerprint(),
+            'maybe_label': self._maybe_label,
+            'maybe_works': maybe_works,
+            'no_label': self._no_label,
+            'no_works': no_works,
+            'tokenizer': [self._tokenizer.pattern, self._tokenizer.joiner],
+            'witnesses': witnesses,
+        }
+
+    def _get_ngram_membership(self, maybe_works, no_works):
+        """Returns the n-grams of the witnesses to `maybe_works`, the
+        works in `maybe_works` that have each of those n-grams,
+        whether each is also in any of `no_works`, and the n-grams of
+        each witness to `maybe_works`.
+
+        The works having each n-gram are given as a bitset, one row of
+        bytes per n-gram, in which bit i (counting from the least
+        significant bit of the first byte) is set if the work at index
+        i in `maybe_works` has the n-gram. The n-grams of each witness
+        are given as indices into the list of n-grams.
+
+        Each n-gram of each witness in the data store is read once.
+
+        :param maybe_works: names of "maybe" works
+        :type maybe_works: `list` of `str`
+        :param no_works: names of "no" works
+        :type no_works: `list` of `str`
+        :rtype: `tuple` of `list`, `numpy.ndarray`, `numpy.ndarray`,
+                `dict`
 
         """
-        if not os.path.exists(out_path):
-            report = StatisticsReport(self._corpus, self._tokenizer,
-                                      results_path)
-            report.generate_statistics()
-            with open(out_path, mode='w', encoding='utf-8', newline='') as fh:
-                report.csv(fh)
+        self._logger.info('Collecting the n-grams of the "maybe" works')
+        ngram_ids = {}
+        witness_ngrams = {}
+        catalogue = {work: self._maybe_label for work in maybe_works}
+        for work, siglum, ngram in self._store.get_witness_ngrams(catalogue):
+            witness = (work, siglum)
+            if witness not in witness_ngrams:
+                witness_ngrams[witness] = array.array('q')
+            witness_ngrams[witness].append(
+                ngram_ids.setdefault(ngram, len(ngram_ids)))
+        ngram_works = np.zeros((len(ngram_ids), (len(maybe_works) + 7) // 8),
+                               dtype=np.uint8)
+        work_indices = {work: index for index, work in enumerate(maybe_works)}
+        for (work, siglum), ids in witness_ngrams.items():
+            index = work_indices[work]
+            ngram_works[np.frombuffer(ids, dtype=np.int64), index // 8] |= \
+                1 << (index % 8)
+        self._logger.info('Collecting the n-grams of the "no" works')
+        no_ids = array.array('q')
+        catalogue = {work: self._no_label for work in no_works}
+        for work, siglum, ngram in self._store.get_witness_ngrams(catalogue):
+            ngram_id = ngram_ids.get(ngram)
+            if ngram_id is not None:
+                no_ids.append(ngram_id)
+        no_ngrams = np.zeros(len(ngram_ids), dtype=bool)
+        no_ngrams[np.frombuffer(no_ids, dtype=np.int64)] = True
+        return list(ngram_ids), ngram_works, no_ngrams, witness_ngrams
 
     def _get_reversed_data(self, data):
         reverse_data = data.unstack(BASE_WORK)[SHARED]
@@ -244,140 +294,229 @@ class JitCReport(Report):
                 SHARED_RELATED_WORK].loc[work].tolist()
         return reverse_data.swaplevel(WORK, BASE_WORK, axis=1)
 
-    def _process_diff(self, yes_work, maybe_work, work_dir, ym_results_path,
-                      yn_results_path, stats):
-        """Returns statistics on the difference between the intersection of
-        `yes_work` and `maybe_work` and the intersection of `yes_work`
-        and "no" works.
-
-        :param yes_work: name of work for which stats are collected
-        :type yes_work: `str`
-        :param maybe_work: name of work being compared with `yes_work`
-        :type maybe_work: `str`
-        :param work_dir: directory where generated files are saved
-        :type work_dir: `str`
-        :param ym_results_path: path to results intersecting
-                                `yes_work` with `maybe_work`
-        :type yn_results_path: `str`
-        :param yn_results_path: path to results intersecting
-                                `yes_work` with "no" works
-        :type yn_results_path: `str`
-        :param stats: data structure to hold the statistical data
-        :type stats: `dict`
-        :rtype: `dict`
+    @staticmethod
+    def _get_witness_coverage(witness, ngrams, ngram_works, no_ngrams):
+        """Returns the percentage of the tokens of `witness` that are
+        in common with, and that are shared with, each "maybe" work.
+
+        `ngrams` are the n-grams of `witness`, `ngram_works` the
+        bitset of the "maybe" works that have each of them, and
+        `no_ngrams` whether each of them is in any "no" work.
+
+        A token is in common with a work if it is part of an n-gram
+        that the work has. It is shared with the work if it is part of
+        such an n-gram that is in no "no" work and is not filler, in
+        the same sense as the reduction of diff results: an n-gram is
+        filler if either of its two (n-1)-grams is filler, or if only
+        one of them is shared.
+
+        :param witness: witness to get the coverage of
+        :type witness: `tacl.WitnessText`
+        :param ngrams: n-grams of `witness`
+        :type ngrams: `list` of `str`
+        :param ngram_works: bitset of the works having each n-gram
+        :type ngram_works: `numpy.ndarray`
+        :param no_ngrams: whether each n-gram is in a "no" work
+        :type no_ngrams: `numpy.ndarray`
+        :rtype: `tuple` of `numpy.ndarray`
 
         """
-        distinct_results_path = os.path.join(
-            work_dir, 'distinct_{}.csv'.format(maybe_work))
-        results = [yn_results_path, ym_results_path]
-        labels = [self._no_label, self._maybe_label]
-        self._run_query(distinct_results_path, self._store.diff_supplied,
-                        [results, labels, self._tokenizer])
-        return self._update_stats('diff', work_dir, distinct_results_path,
-                                  yes_work, maybe_work, stats, SHARED, COMMON)
-
-    def _process_intersection(self, yes_work, maybe_work, work_dir,
-                              ym_results_path, stats):
-        """Returns statistics on the intersection between `yes_work` and
-        `maybe_work`.
-
-        :param yes_work: name of work for which stats are collected
-        :type yes_work: `str`
-        :param maybe_work: name of work being compared with `yes_work`
-        :type maybe_work: `str`
-        :param work_dir: directory where generated files are saved
-        :type work_dir: `str`
-        :param ym_results_path: path to results intersecting
-                                `yes_work` with `maybe_work`
-        :type ym_results_path: `str`
-        :param stats: data structure to hold the statistical data
-        :type stats: `dict`
-        :rtype: `dict`
+        token_count = len(witness.tokens)
+        common = np.zeros((token_count, ngram_works.shape[1]), dtype=np.uint8)
+        shared = np.zeros_like(common)
+        indices, starts, ends = witness.get_ngram_positions(ngrams)
+        sizes = ends - starts
+        previous_size = None
+        # Each window of tokens of a given size is the occurrence of
+        # exactly one n-gram, so the bitsets are laid out by window
+        # start, one array per size. The n-grams of each size are
+        # checked for filler against those one token smaller, at the
+        # same and the following window start.
+        for size in np.unique(sizes).tolist():
+            size_indices = indices[sizes == size]
+            size_starts = starts[sizes == size]
+            window_count = token_count - size + 1
+            in_common = np.zeros((window_count, common.shape[1]),
+                                 dtype=np.uint8)
+            in_common[size_starts] = ngram_works[size_indices]
+            in_shared = in_common.copy()
+            in_shared[size_starts[no_ngrams[size_indices]]] = 0
+            kept = in_shared
+            if previous_size == size - 1:
+                kept = in_shared & (
+                    (~previous_shared[:-1] & ~previous_shared[1:]) |
+                    (previous_kept[:-1] & previous_kept[1:]))
+            for offset in range(size):
+                common[offset:offset + window_count] |= in_common
+                shared[offset:offset + window_count] |= kept
+            previous_size = size
+            previous_shared = in_shared
+            previous_kept = kept
+        percentages = []
+        for coverage in (common, shared):
+            counts = np.unpackbits(coverage, axis=1, bitorder='little').sum(
+                axis=0, dtype=np.int64)
+            if token_count:
+                percentages.append(counts / token_count * 100)
+            else:
+                percentages.append(counts.astype(float))
+        return tuple(percentages)
+
+    @staticmethod
+    def _get_work_statistics(corpus, maybe_works, membership, maybe_index,
+                             witnesses):
+        """Returns the shared, common and unique percentages of each
+        witness to the "maybe" work at `maybe_index` in `maybe_works`,
+        against each other "maybe" work.
+
+        :param corpus: corpus of works
+        :type corpus: `tacl.Corpus`
+        :param maybe_works: names of "maybe" works
+        :type maybe_works: `list` of `str`
+        :param membership: n-grams, bitsets of the works having them,
+                           and whether each is in a "no" work
+        :type membership: `tuple`
+        :param maybe_index: index of the work in `maybe_works`
+        :type maybe_index: `int`
+        :param witnesses: siglum and n-gram indices of each witness
+        :type witnesses: `list` of `tuple`
+        :rtype: `list` of `tuple`
 
         """
-        catalogue = {yes_work: self._no_label, maybe_work: self._maybe_label}
-        self._run_query(ym_results_path, self._store.intersection, [catalogue],
-                        False)
-        # Though this is the intersection only between "yes" and
-        # "maybe", the percentage of overlap is added to the "common"
-        # stat rather than "shared". Then, in _process_diff, the
-        # percentage of difference between "yes" and "no" can be
-        # removed from "common" and added to "shared".
-        return self._update_stats('intersect', work_dir, ym_results_path,
-                                  yes_work, maybe_work, stats, COMMON, UNIQUE)
-
-    def _process_maybe_work(self, yes_work, maybe_work, work_dir,
-                            yn_results_path, stats):
-        """Returns statistics of how `yes_work` compares with `maybe_work`.
-
-        :param yes_work: name of work for which stats are collected
-        :type yes_work: `str`
-        :param maybe_work: name of work being compared with `yes_work`
-        :type maybe_work: `str`
-        :param work_dir: directory where generated files are saved
-        :type work_dir: `str`
-        :param yn_results_path: path to results intersecting
-                                `yes_work` with "no" works
-        :type yn_results_path: `str`
-        :param stats: data structure to hold statistical data of the
-                      comparison
-        :type stats: `dict`
+        ngrams, ngram_works, no_ngrams = membership
+        maybe_work = maybe_works[maybe_index]
+        statistics = []
+        for siglum, ngram_ids in witnesses:
+            ids = np.frombuffer(ngram_ids, dtype=np.int64)
+            common, shared = JitCReport._get_witness_coverage(
+                corpus.get_witness(maybe_work, siglum),
+                [ngrams[ngram_id] for ngram_id in ids.tolist()],
+                ngram_works[ids], no_ngrams[ids])
+            common, shared = common.tolist(), shared.tolist()
+            for yes_index, yes_work in enumerate(maybe_works):
+                if yes_index == maybe_index:
+                    continue
+                # The proportion of the witness that is in common with
+                # the "yes" work includes that which is shared with
+                # it; the former is reported without the latter.
+                statistics.append((
+                    yes_work, siglum, shared[yes_index],
+                    common[yes_index] - shared[yes_index],
+                    100 - common[yes_index]))
+        return statistics
+
+    def _load_manifest(self, data_dir, maybe_works, no_works):
+        """Returns the manifest of the "maybe" works whose statistics
+        have been saved in `data_dir`.
+
+        A manifest saved by a run over different inputs (works,
+        labels, corpus, tokenizer or data store content) is ignored,
+        along with the statistics it lists. A work whose statistics
+        file is missing is treated as not completed.
+
+        :param data_dir: directory where generated files are saved
+        :type data_dir: `str`
+        :param maybe_works: names of "maybe" works
+        :type maybe_works: `list` of `str`
+        :param no_works: names of "no" works
+        :type no_works: `list` of `str`
         :rtype: `dict`
 
         """
-        if maybe_work == yes_work:
-            return stats
-        self._logger.info(
-            'Processing "maybe" work {} against "yes" work {}.'.format(
-                maybe_work, yes_work))
-        # Set base values for each statistic of interest, for each
-        # witness.
-        for siglum in self._corpus.get_sigla(maybe_work):
-            witness = (maybe_work, siglum)
-            stats[COMMON][witness] = 0
-            stats[SHARED][witness] = 0
-            stats[UNIQUE][witness] = 100
-        works = [yes_work, maybe_work]
-        # Sort the works to have a single filename for the
-        # intersection each pair of works, whether they are yes or
-        # maybe. This saves repeating the intersection with the roles
-        # switched, since _run_query will use a found file rather than
-        # rerun the query.
-        works.sort()
-        ym_results_path = os.path.join(
-            self._ym_intersects_dir, '{}_intersect_{}.csv'.format(*works))
-        stats = self._process_intersection(yes_work, maybe_work, work_dir,
-                                           ym_results_path, stats)
-        stats = self._process_diff(yes_work, maybe_work, work_dir,
-                                   ym_results_path, yn_results_path, stats)
-        return stats
-
-    def _process_works(self, maybe_works, no_works, output_dir):
+        manifest = {'fingerprint': self._get_inputs_fingerprint(
+            maybe_works, no_works), 'completed': []}
+        path = os.path.join(data_dir, MANIFEST_FILENAME)
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as fh:
+                saved_manifest = json.load(fh)
+            if saved_manifest.get('fingerprint') == manifest['fingerprint']:
+                manifest['completed'] = [
+                    work for work in saved_manifest['completed']
+                    if os.path.exists(os.path.join(
+                        data_dir, 'stats_{}.csv'.format(work)))]
+                self._logger.info(
+                    'Resuming with the statistics of {} "maybe" works '
+                    'already generated'.format(len(manifest['completed'])))
+            else:
+                self._logger.info('Ignoring the statistics of a previous '
+                                  'run over different inputs')
+        return manifest
+
+    def _process_works(self, maybe_works, no_works, output_dir, jobs=1):
         """Collect and return the data of how each work in `maybe_works`
         relates to each other work.
 
-        :param maybe_works:
+        Rather than query the data store for each pair of works, the
+        n-grams of all of the works are read once, and the statistics
+        for every pair derived from the works that have each n-gram.
+
+        The statistics of each "maybe" work are saved, and recorded
+        in a manifest, as soon as they are generated, so that a run
+        that is interrupted can be resumed from the works that remain.
+        If `jobs` is greater than 1, the "maybe" works are divided
+        among that many processes.
+
+        :param maybe_works: names of "maybe" works
         :type maybe_works: `list` of `str`
-        :param no_works:
+        :param no_works: names of "no" works
         :type no_works: `list` of `str`
         :param output_dir: base output directory
         :type output_dir: `str`
+        :param jobs: number of processes to use
+        :type jobs: `int`
         :rtype: `pandas.DataFrame`
 
         """
-        output_data_dir = os.path.join(output_dir, 'data')
-        no_catalogue = {work: self._no_label for work in no_works}
-        self._ym_intersects_dir = os.path.join(output_data_dir,
-                                               'ym_intersects')
+        data_dir = os.path.join(output_dir, 'data')
+        os.makedirs(data_dir, exist_ok=True)
+        manifest = self._load_manifest(data_dir, maybe_works, no_works)
+        remaining_works = [work for work in maybe_works
+                           if work not in manifest['completed']]
+        if remaining_works:
+            ngrams, ngram_works, no_ngrams, witness_ngrams = \
+                self._get_ngram_membership(maybe_works, no_works)
+            membership = (ngrams, ngram_works, no_ngrams)
+            tasks = []
+            for maybe_work in remaining_works:
+                witnesses = [
+                    (siglum, witness_ngrams.get((maybe_work, siglum),
+                                                array.array('q')))
+                    for siglum in self._corpus.get_sigla(maybe_work)]
+                tasks.append((maybe_works.index(maybe_work), witnesses))
+            if jobs > 1 and len(tasks) > 1:
+                with ProcessPoolExecutor(
+                        max_workers=jobs, initializer=_initialise_worker,
+                        initargs=(self._corpus, maybe_works,
+                                  membership)) as executor:
+                    futures = {
+                        executor.submit(_get_work_statistics, *task):
+                        maybe_works[task[0]] for task in tasks}
+                    for future in as_completed(futures):
+                        self._save_work_statistics(
+                            data_dir, manifest, futures[future],
+                            future.result())
+            else:
+                for maybe_index, witnesses in tasks:
+                    statistics = self._get_work_statistics(
+                        self._corpus, maybe_works, membership, maybe_index,
+                        witnesses)
+                    self._save_work_statistics(
+                        data_dir, manifest, maybe_works[maybe_index],
+                        statistics)
+        stats = {yes_work: {COMMON: {}, SHARED: {}, UNIQUE: {}}
+                 for yes_work in maybe_works}
+        for maybe_work in maybe_works:
+            path = os.path.join(data_dir, 'stats_{}.csv'.format(maybe_work))
+            with open(path, encoding='utf-8', newline='') as fh:
+                for row in csv.DictReader(fh):
+                    witness = (maybe_work, row[SIGLUM])
+                    for scope in (SHARED, COMMON, UNIQUE):
+                        stats[row[BASE_WORK]][scope][witness] = float(
+                            row[scope])
         data = {}
-        os.makedirs(self._ym_intersects_dir, exist_ok=True)
         for yes_work in maybe_works:
-            no_catalogue[yes_work] = self._maybe_label
-            stats = self._process_yes_work(yes_work, no_catalogue,
-                                           maybe_works, output_data_dir)
-            no_catalogue.pop(yes_work)
             for scope in (SHARED, COMMON, UNIQUE):
-                work_data = stats[scope]
+                work_data = stats[yes_work][scope]
                 index = pd.MultiIndex.from_tuples(
                     list(work_data.keys()), names=[RELATED_WORK, SIGLUM])
                 data[(yes_work, scope)] = pd.Series(list(work_data.values()),
@@ -388,71 +527,71 @@ class JitCReport(Report):
             BASE_WORK, SIGLUM).swaplevel(RELATED_WORK, BASE_WORK)
         return df
 
-    def _process_yes_work(self, yes_work, no_catalogue, maybe_works,
-                          output_dir):
-        """Returns statistics of how `yes_work` compares with the other works
-        in `no_catalogue` and the "maybe" works.
+    def _save_work_statistics(self, data_dir, manifest, maybe_work,
+                              statistics):
+        """Saves `statistics` of `maybe_work` in `data_dir`, and records
+        them in `manifest`.
 
-        :param yes_work: name of work being processed
-        :type yes_work: `str`
-        :param no_catalogue: catalogue of containing `yes_work` and the "no"
-                             works
-        :type no_catalogue: `Catalogue`
-        :param maybe_works: names of "maybe" works
-        :type maybe_works: `list` of `str`
-        :param output_dir: directory where generated files are saved
-        :type output_dir: `str`
-        :rtype: `dict`
+        Both files are written in full before replacing any existing
+        file, so that an interrupted run leaves neither incomplete.
+
+        :param data_dir: directory where generated files are saved
+        :type data_dir: `str`
+        :param manifest: manifest of the works with saved statistics
+        :type manifest: `dict`
+        :param maybe_work: name of "maybe" work
+        :type maybe_work: `str`
+        :param statistics: statistics of `maybe_work`
+        :type statistics: `list` of `tuple`
 
         """
-        self._logger.info('Processing "maybe" work {} as "yes".'.format(
-            yes_work))
-        stats = {COMMON: {}, SHARED: {}, UNIQUE: {}}
-        yes_work_dir = os.path.join(output_dir, yes_work)
-        os.makedirs(yes_work_dir, exist_ok=True)
-        results_path = os.path.join(yes_work_dir, 'intersect_with_no.csv')
-        self._run_query(results_path, self._store.intersection, [no_catalogue])
-        for maybe_work in maybe_works:
-            stats = self._process_maybe_work(
-                yes_work, maybe_work, yes_work_dir, results_path, stats)
-        return stats
+        self._logger.info('Saving statistics for "maybe" work {}'.format(
+            maybe_work))
+        path = os.path.join(data_dir, 'stats_{}.csv'.format(maybe_work))
+        with open(path + '.tmp', mode='w', encoding='utf-8',
+                  newline='') as fh:
+            writer = csv.writer(fh)
+            writer.writerow([BASE_WORK, SIGLUM, SHARED, COMMON, UNIQUE])
+            writer.writerows(statistics)
+        os.replace(path + '.tmp', path)
+        manifest['completed'].append(maybe_work)
+        path = os.path.join(data_dir, MANIFEST_FILENAME)
+        with open(path + '.tmp', mode='w', encoding='utf-8') as fh:
+            json.dump(manifest, fh, indent=2)
+        os.replace(path + '.tmp', path)
+
+
+def _get_work_statistics(maybe_index, witnesses):
+    """Returns the statistics of the witnesses to the "maybe" work at
+    `maybe_index`, using the worker process's corpus and n-gram
+    membership data.
+
+    :param maybe_index: index of the "maybe" work
+    :type maybe_index: `int`
+    :param witnesses: siglum and n-gram indices of each witness
+    :type witnesses: `list` of `tuple`
+    :rtype: `list` of `tuple`
 
-    def _run_query(self, path, query, query_args, drop_no=True):
-        """Runs `query` and outputs results to a file at `path`.
+    """
+    return JitCReport._get_work_statistics(
+        _worker_corpus, _worker_maybe_works, _worker_membership, maybe_index,
+        witnesses)
 
-        If `path` exists, the query is not run.
 
-        :param path: path to output results to
-        :type path: `str`
-        :param query: query to run
-        :type query: `method`
-        :param query_args: arguments to supply to the query
-        :type query_args: `list`
-        :param drop_no: whether to drop results from the No corpus
-        :type drop_no: `bool`
+def _initialise_worker(corpus, maybe_works, membership):
+    """Sets the corpus, "maybe" works and n-gram membership data to be
+    used in this worker process.
 
-        """
-        if os.path.exists(path):
-            return
-        output_results = io.StringIO(newline='')
-        query(*query_args, output_fh=output_results)
-        with open(path, mode='w', encoding='utf-8', newline='') as fh:
-            if drop_no:
-                self._drop_no_label_results(output_results, fh)
-            else:
-                fh.write(output_results.getvalue())
-
-    def _update_stats(self, stats_type, work_dir, results_path, yes_work,
-                      maybe_work, stats, add_type, minus_type):
-        stats_path = os.path.join(work_dir, 'stats_{}_{}.csv'.format(
-            stats_type, maybe_work))
-        self._generate_statistics(stats_path, results_path)
-        with open(stats_path, encoding='utf-8', newline='') as fh:
-            reader = csv.DictReader(fh)
-            for row in reader:
-                if row[constants.WORK_FIELDNAME] == maybe_work:
-                    witness = (maybe_work, row[constants.SIGLUM_FIELDNAME])
-                    ratio = float(row[constants.PERCENTAGE_FIELDNAME])
-                    stats[add_type][witness] += ratio
-                    stats[minus_type][witness] -= ratio
-        return stats
+    :param corpus: corpus of works
+    :type corpus: `tacl.Corpus`
+    :param maybe_works: names of "maybe" works
+    :type maybe_works: `list` of `str`
+    :param membership: n-grams, bitsets of the works having them, and
+                       whether each is in a "no" work
+    :type membership: `tuple`
+
+    """
+    global _worker_corpus, _worker_maybe_works, _worker_membership
+    _worker_corpus = corpus
+    _worker_maybe_works = maybe_works
+    _worker_membership = membership
@@ -1,6 +1,8 @@
 import os
 import os.path
 
+import pandas as pd
+
 from . import constants
 from .report import Report
 
@@ -72,34 +74,35 @@ class LifetimeReport (Report):
         only occurred, and last occurred in that label.
 
         """
+        # Classify each n-gram in each label by comparing that
+        # label's position in `labels` with the earliest and latest
+        # positions of any label the n-gram occurs in. Results with a
+        # label not in `labels` are ignored.
+        positions = pd.Categorical(results[constants.LABEL_FIELDNAME],
+                                   categories=labels).codes
+        labelled = positions >= 0
+        occurrences = pd.DataFrame({
+            constants.NGRAM_FIELDNAME: results[
+                constants.NGRAM_FIELDNAME].to_numpy()[labelled],
+            'position': positions[labelled]}).drop_duplicates()
+        lifetimes = occurrences.groupby(constants.NGRAM_FIELDNAME, sort=False)[
+            'position'].agg(['min', 'max'])
+        occurrences = occurrences.join(lifetimes, on=constants.NGRAM_FIELDNAME)
+        earlier = occurrences['min'] < occurrences['position']
+        later = occurrences['max'] > occurrences['position']
+        categories = {'first': ~earlier & later, 'only': ~earlier & ~later,
+                      'last': earlier & ~later}
         ngrams = {}
         for idx, label in enumerate(labels):
-            now_results = results[results[constants.LABEL_FIELDNAME] == label]
-            earlier_labels = labels[:idx]
-            earlier_ngrams = results[results[constants.LABEL_FIELDNAME].isin(
-                earlier_labels)][constants.NGRAM_FIELDNAME].values
-            later_labels = labels[idx + 1:]
-            later_ngrams = results[results[constants.LABEL_FIELDNAME].isin(
-                later_labels)][constants.NGRAM_FIELDNAME].values
-            first_ngrams = []
-            only_ngrams = []
-            last_ngrams = []
-            for ngram in now_results[constants.NGRAM_FIELDNAME].unique():
-                if ngram in earlier_ngrams:
-                    if ngram not in later_ngrams:
-                        last_ngrams.append(ngram)
-                elif ngram in later_ngrams:
-                    first_ngrams.append(ngram)
-                else:
-                    only_ngrams.append(ngram)
-            self._save_results(output_dir, label, now_results, first_ngrams,
-                               'first')
-            self._save_results(output_dir, label, now_results, only_ngrams,
-                               'only')
-            self._save_results(output_dir, label, now_results, last_ngrams,
-                               'last')
-            ngrams[label] = {'first': first_ngrams, 'last': last_ngrams,
-                             'only': only_ngrams}
+            now_results = results[positions == idx]
+            now = occurrences['position'] == idx
+            ngrams[label] = {}
+            for type_label, category in categories.items():
+                type_ngrams = list(occurrences[now & category][
+                    constants.NGRAM_FIELDNAME])
+                self._save_results(output_dir, label, now_results,
+                                   type_ngrams, type_label)
+                ngrams[label][type_label] = type_ngrams
         return ngrams
 
     def _render_corpus_row(self, label, ngrams):
@@ -117,7 +120,8 @@ class LifetimeReport (Report):
         label_data = {}
         for label in labels:
             label_data[label] = []
-        work_grouped = ngram_group.groupby(constants.WORK_FIELDNAME)
+        work_grouped = ngram_group.groupby(constants.WORK_FIELDNAME,
+                                           observed=True)
         for work, group in work_grouped:
             min_count = group[constants.COUNT_FIELDNAME].min()
             max_count = group[constants.COUNT_FIELDNAME].max()
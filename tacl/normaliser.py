@@ -1,7 +1,10 @@
-from collections import OrderedDict
 import csv
+import hashlib
 import itertools
+import json
+import os
 import re
+import tempfile
 
 from tacl import constants, exceptions
 
@@ -19,12 +22,17 @@ class VariantMapping:
     "ABA" -> "ACA", where the surrounding "A"s are themselves able to
     be normalised.
 
+    The mapping is compiled into a token-level automaton that
+    normalises a text in a single pass. If a cache directory is
+    supplied, the compiled mapping is stored there and reused by any
+    later `VariantMapping` of the same mapping file and tokenizer.
+
     """
 
-    def __init__(self, mapping_path, tokenizer):
+    def __init__(self, mapping_path, tokenizer, cache_dir=None):
         self._mapping_path = mapping_path
         self._tokenizer = tokenizer
-        self._variant_to_normal_map = None
+        self._variant_automaton = None
         self._normal_to_variant_map = None
         # First character in Supplementary Private Use Area-A. The
         # Private Use Area is not large enough to hold all of the
@@ -32,7 +40,37 @@ class VariantMapping:
         self._pua_char_code = 983040
         self._pua_to_token_map = {}
         self._token_to_pua_map = {}
-        self._generate_mappings()
+        cache_path = None
+        if cache_dir is not None:
+            cache_path = self._get_cache_path(cache_dir)
+        if cache_path is not None and os.path.exists(cache_path):
+            self._load_mappings(cache_path)
+        else:
+            self._generate_mappings()
+            if cache_path is not None:
+                self._save_mappings(cache_path)
+
+    @staticmethod
+    def _add_variant(automaton, tokens, normalised_form):
+        """Adds the variant form consisting of `tokens` to `automaton`,
+        as normalising to `normalised_form`.
+
+        Each node of the automaton is a pair of the normalised form
+        of the variant ending at that node (or None) and a dictionary
+        of the nodes following it, keyed by token.
+
+        :param automaton: root node of automaton
+        :type automaton: `list`
+        :param tokens: tokens of variant form
+        :type tokens: `list` of `str`
+        :param normalised_form: normalised form of variant
+        :type normalised_form: `str`
+
+        """
+        node = automaton
+        for token in tokens:
+            node = node[1].setdefault(token, [None, {}])
+        node[0] = normalised_form
 
     def denormalise(self, text):
         """Returns `text` in all possible denormalised forms.
@@ -89,21 +127,20 @@ class VariantMapping:
         return set(denormalised_texts)
 
     def _generate_mappings(self):
-        """Generates the dictionary mappings used to normalise and denormalise
-        text.
+        """Generates the mappings used to normalise and denormalise text.
 
-        The mappings (from variant to normalised form, and from
-        normalised form to possible variants) make use of Private Use
-        Area characters to ensure that a form is not used in multiple
-        transformation in a single normalisation or denormalisation
-        process. Eg, given "AB" -> "CD" and "C" -> "E", the string
-        "AB" should become "CD" and not "ED".
+        The mapping from normalised form to possible variants makes
+        use of Private Use Area characters to ensure that a form is
+        not used in multiple transformation in a single
+        denormalisation process. Eg, given "AB" -> "CD" and "C" ->
+        "E", the string "AB" should become "CD" and not "ED". The
+        automaton mapping variant to normalised form gives the same
+        guarantee by converting each token at most once.
 
         """
         normal_to_variant_map = {}
-        variant_to_normal_map = {}
-        ordered_map = OrderedDict()
-        seen_forms = []
+        variant_automaton = [None, {}]
+        seen_forms = set()
         with open(self._mapping_path, encoding='utf-8', newline='') \
              as csv_file:
             reader = csv.reader(csv_file)
@@ -112,14 +149,30 @@ class VariantMapping:
                 variant_forms = self._get_variant_forms(row, normalised_form)
                 substitute_forms = self._get_variant_substitute_forms(
                     normalised_form, variant_forms, seen_forms,
-                    variant_to_normal_map)
+                    variant_automaton)
                 normal_to_variant_map[normalised_form] = substitute_forms
-        sorted_keys = sorted(variant_to_normal_map.keys(),
-                             key=lambda x: len(x), reverse=True)
-        for variant_form in sorted_keys:
-            ordered_map[variant_form] = variant_to_normal_map[variant_form]
         self._normal_to_variant_map = normal_to_variant_map
-        self._variant_to_normal_map = ordered_map
+        self._variant_automaton = variant_automaton
+
+    def _get_cache_path(self, cache_dir):
+        """Returns the path in `cache_dir` of the compiled form of this
+        mapping.
+
+        The filename is derived from the checksum of the mapping file
+        and the tokenizer, so that a change to either is not served
+        by an outdated compiled mapping.
+
+        :param cache_dir: directory containing compiled mappings
+        :type cache_dir: `str`
+        :rtype: `str`
+
+        """
+        checksum = hashlib.md5()
+        with open(self._mapping_path, 'rb') as fh:
+            checksum.update(fh.read())
+        for value in (self._tokenizer.pattern, self._tokenizer.joiner):
+            checksum.update(b'\0' + value.encode('utf-8'))
+        return os.path.join(cache_dir, '{}.json'.format(checksum.hexdigest()))
 
     def _get_normalised_form(self, row, seen_forms):
         """Returns the normalised form from `row`.
@@ -130,7 +183,7 @@ class VariantMapping:
         :param row: mapping row
         :type row: `list` of `str`
         :param seen_forms: forms already specified in the mapping
-        :type seen_forms: `list` of `str`
+        :type seen_forms: `set` of `str`
         :rtype: `str`
 
         """
@@ -148,7 +201,7 @@ class VariantMapping:
             raise exceptions.MalformedNormaliserMappingError(
                 normalised_form,
                 constants.TOO_LONG_NORMALISED_FORM_ERROR)
-        seen_forms.append(normalised_form)
+        seen_forms.add(normalised_form)
         return normalised_form
 
     def _get_substitute(self, token):
@@ -190,8 +243,9 @@ class VariantMapping:
         return variant_forms
 
     def _get_variant_substitute_forms(self, normalised_form, variant_forms,
-                                      seen_forms, variant_to_normal_map):
-        """Returns a list of substitute forms for `variant_forms`.
+                                      seen_forms, variant_automaton):
+        """Returns a list of substitute forms for `variant_forms`, and adds
+        each variant form to `variant_automaton`.
 
         Checks that each variant form is valid (not previously
         specified in the mapping, consisting of one or more tokens).
@@ -201,15 +255,15 @@ class VariantMapping:
         :param variant_forms: variant forms to generate substitutes for
         :type variant_forms: `list` of `str`
         :param seen_forms: forms already specified in the mapping
-        :type seen_forms: `list` of `str`
-        :param variant_to_normal_map: mapping between variant form and
-                                      normalised form
-        :type variant_to_normal_map: `dict`
+        :type seen_forms: `set` of `str`
+        :param variant_automaton: automaton mapping variant form to
+                                  normalised form
+        :type variant_automaton: `list`
         :rtype: `list` of `str`
 
         """
         substitute_forms = []
-        substitute = self._get_substitute(normalised_form)
+        self._get_substitute(normalised_form)
         for variant_form in variant_forms:
             tokenized_form = self._tokenizer.tokenize(variant_form)
             variant_form = self._tokenizer.joiner.join(tokenized_form)
@@ -221,17 +275,68 @@ class VariantMapping:
                 raise exceptions.MalformedNormaliserMappingError(
                     normalised_form,
                     constants.EMPTY_VARIANT_FORM_ERROR)
-            seen_forms.append(variant_form)
-            variant_to_normal_map[variant_form] = substitute
+            seen_forms.add(variant_form)
+            self._add_variant(variant_automaton, tokenized_form,
+                              normalised_form)
             substitute_forms.append(self._get_substitute(variant_form))
         return substitute_forms
 
+    def _load_mappings(self, cache_path):
+        """Loads the mappings used to normalise and denormalise text from
+        the compiled mapping at `cache_path`.
+
+        :param cache_path: path to compiled mapping
+        :type cache_path: `str`
+
+        """
+        with open(cache_path, encoding='utf-8') as fh:
+            mappings = json.load(fh)
+        self._normal_to_variant_map = mappings['normal_to_variant_map']
+        self._variant_automaton = mappings['variant_automaton']
+        self._pua_char_code = mappings['pua_char_code']
+        self._pua_to_token_map = mappings['pua_to_token_map']
+        self._token_to_pua_map = mappings['token_to_pua_map']
+
+    def _match_variants(self, tokens):
+        """Yields the start and end indices within `tokens` of each
+        variant form to be normalised, along with its normalised form.
+
+        The tokens are read once, from first to last. At each token,
+        the longest variant form starting there is matched, and
+        reading continues after it.
+
+        :param tokens: tokens of text to normalise
+        :type tokens: `list` of `str`
+        :rtype: `generator` of 3-`tuple` of `int`, `int`, `str`
+
+        """
+        root = self._variant_automaton[1]
+        token_count = len(tokens)
+        position = 0
+        while position < token_count:
+            normalised_form = None
+            node = root.get(tokens[position])
+            end = position + 1
+            while node is not None:
+                if node[0] is not None:
+                    normalised_form, match_end = node[0], end
+                if end == token_count:
+                    break
+                node = node[1].get(tokens[end])
+                end += 1
+            if normalised_form is None:
+                position += 1
+            else:
+                yield position, match_end, normalised_form
+                position = match_end
+
     def normalise(self, text):
         """Returns the normalised form of `text`.
 
-        It is assumed that `text` is in the form of tokens separated
-        by a token separator, matching the form of the items in the
-        mapping supplied to this object.
+        Each variant form in `text` is replaced with its normalised
+        form. A variant form of several tokens is only matched where
+        those tokens are separated by the tokenizer's joiner. All
+        other text, including that between tokens, is kept as is.
 
         :param text: text to normalise
         :type text: `str`
@@ -239,16 +344,71 @@ class VariantMapping:
 
         """
         joiner = self._tokenizer.joiner
-        text = self._preprocess_text(text, joiner)
-        for variant, substitute in self._variant_to_normal_map.items():
-            text = text.replace('{}{}{}'.format(joiner, variant, joiner),
-                                '{}{}{}'.format(joiner, substitute, joiner))
-        for substitute, normal_form in self._pua_to_token_map.items():
-            text = text.replace(substitute, normal_form)
-        return self._postprocess_text(text, joiner)
+        spans = self._tokenizer.get_spans(text)
+        parts = []
+        index = 0
+        run_start = 0
+        for run_end in range(1, len(spans) + 1):
+            if run_end < len(spans) and \
+               text[spans[run_end - 1][1]:spans[run_end][0]] == joiner:
+                continue
+            # Normalise the run of tokens separated only by the
+            # joiner that ends here.
+            run_spans = spans[run_start:run_end]
+            tokens = [text[start:end] for start, end in run_spans]
+            for start, end, normalised_form in self._match_variants(tokens):
+                parts.append(text[index:run_spans[start][0]])
+                parts.append(normalised_form)
+                index = run_spans[end - 1][1]
+            run_start = run_end
+        parts.append(text[index:])
+        return ''.join(parts)
+
+    def normalise_tokens(self, tokens):
+        """Returns the normalised form of the text consisting of `tokens`,
+        joined by the tokenizer's joiner.
+
+        :param tokens: tokens of text to normalise
+        :type tokens: `list` of `str`
+        :rtype: `str`
+
+        """
+        normalised_tokens = []
+        position = 0
+        for start, end, normalised_form in self._match_variants(tokens):
+            normalised_tokens.extend(tokens[position:start])
+            normalised_tokens.append(normalised_form)
+            position = end
+        normalised_tokens.extend(tokens[position:])
+        return self._tokenizer.joiner.join(normalised_tokens)
 
     def _postprocess_text(self, text, joiner):
         return text.strip(joiner)
 
     def _preprocess_text(self, text, joiner):
         return '{}{}{}'.format(joiner, text, joiner)
+
+    def _save_mappings(self, cache_path):
+        """Writes the mappings used to normalise and denormalise text to
+        `cache_path`.
+
+        The file is written in full before it replaces any existing
+        compiled mapping.
+
+        :param cache_path: path to write compiled mapping to
+        :type cache_path: `str`
+
+        """
+        mappings = {
+            'normal_to_variant_map': self._normal_to_variant_map,
+            'pua_char_code': self._pua_char_code,
+            'pua_to_token_map': self._pua_to_token_map,
+            'token_to_pua_map': self._token_to_pua_map,
+            'variant_automaton': self._variant_automaton,
+        }
+        cache_dir = os.path.dirname(cache_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        with open(fd, 'w', encoding='utf-8') as fh:
+            json.dump(mappings, fh, ensure_ascii=False)
+        os.replace(temp_path, cache_path)
@@ -5,15 +5,42 @@ import logging
 import os
 import tempfile
 
+import numpy as np
 import pandas as pd
 
 from . import constants
-from .decorators import requires_columns
+from .corpus import Corpus
+from .decorators import deferrable, requires_columns
 from .exceptions import MalformedResultsError
 from .text import FilteredWitnessText, Text
 
 
 DELETE_FIELDNAME = 'delete'
+FILTER_STEP = 'filter'
+
+# Operations that remove rows according to a test applied to each row
+# independently. These are cheap and may be combined into a single
+# selection.
+FILTER_OPERATIONS = ('excise', 'prune_by_ngram', 'prune_by_ngram_size',
+                     'remove_label')
+# Filter operations whose test depends only on the n-gram, and which
+# therefore remove either all or none of the rows for an n-gram.
+NGRAM_FILTER_OPERATIONS = ('excise', 'prune_by_ngram', 'prune_by_ngram_size')
+# For each operation, those filter operations that may be performed
+# before it rather than after without changing the outcome. Any
+# operation not listed here has no filters moved ahead of it.
+MOVABLE_FILTERS = {
+    'add_label_count': FILTER_OPERATIONS,
+    'add_label_work_count': FILTER_OPERATIONS,
+    'prune_by_ngram_count': NGRAM_FILTER_OPERATIONS,
+    'prune_by_ngram_count_per_work': NGRAM_FILTER_OPERATIONS,
+    'prune_by_work_count': NGRAM_FILTER_OPERATIONS,
+    'reciprocal_remove': NGRAM_FILTER_OPERATIONS,
+    'reduce': ('remove_label',),
+    'relabel': NGRAM_FILTER_OPERATIONS,
+    'sort': FILTER_OPERATIONS,
+    'zero_fill': FILTER_OPERATIONS,
+}
 
 
 class Results:
@@ -28,18 +55,26 @@ class Results:
     A method's modifications to the field names, if any, are specified
     in that method's docstring.
 
+    A lazy Results object does not perform operations when they are
+    called, but records them as a plan. The plan is optimised and
+    executed when the results are output or the raw data is
+    requested.
+
     """
 
-    def __init__(self, matches, tokenizer):
+    def __init__(self, matches, tokenizer, lazy=False):
         """Initialise a Results object.
 
         :param matches: results data
         :type matches: either filepath or buffer, or pandas DataFrame
         :param tokenizer: tokenizer used for the n-grams in the results
         :type tokenizer: `Tokenizer`
+        :param lazy: whether to defer operations until output
+        :type lazy: `bool`
 
         """
         self._logger = logging.getLogger(__name__)
+        self._plan = [] if lazy else None
         if isinstance(matches, pd.DataFrame):
             self._matches = matches
         else:
@@ -59,7 +94,12 @@ class Results:
         for column in constants.STRING_FIELDNAMES:
             if column in self._matches.columns:
                 self._matches = self._matches.astype({column: "string"})
+        for column in constants.CATEGORICAL_FIELDNAMES:
+            if column in self._matches.columns:
+                self._matches = self._matches.astype(
+                    {column: "string"}).astype({column: "category"})
 
+    @deferrable
     @requires_columns([constants.NGRAM_FIELDNAME, constants.WORK_FIELDNAME,
                        constants.COUNT_FIELDNAME, constants.LABEL_FIELDNAME])
     def add_label_count(self):
@@ -75,10 +115,10 @@ class Results:
             # For each n-gram and label pair, we need the maximum count
             # among all witnesses to each work, and then the sum of those
             # across all works.
-            work_maxima = df.groupby(constants.WORK_FIELDNAME,
-                                     sort=False).max()
-            df.loc[:, constants.LABEL_COUNT_FIELDNAME] = work_maxima[
-                constants.COUNT_FIELDNAME].sum()
+            work_maxima = df.groupby(
+                constants.WORK_FIELDNAME, observed=True,
+                sort=False)[constants.COUNT_FIELDNAME].max()
+            df.loc[:, constants.LABEL_COUNT_FIELDNAME] = work_maxima.sum()
             return df
 
         if self._matches.empty:
@@ -87,9 +127,11 @@ class Results:
             self._matches.loc[:, constants.LABEL_COUNT_FIELDNAME] = 0
             self._matches = self._matches.groupby(
                 [constants.LABEL_FIELDNAME, constants.NGRAM_FIELDNAME],
-                group_keys=False, sort=False).apply(add_label_count)
+                group_keys=False, observed=True, sort=False).apply(
+                    add_label_count)
         self._logger.info('Finished adding label count')
 
+    @deferrable
     @requires_columns([constants.NGRAM_FIELDNAME, constants.WORK_FIELDNAME,
                        constants.COUNT_FIELDNAME, constants.LABEL_FIELDNAME])
     def add_label_work_count(self):
@@ -107,10 +149,10 @@ class Results:
         self._logger.info('Adding label work count')
 
         def add_label_text_count(df):
-            work_maxima = df.groupby(constants.WORK_FIELDNAME,
-                                     sort=False).any()
-            df.loc[:, constants.LABEL_WORK_COUNT_FIELDNAME] = work_maxima[
-                constants.COUNT_FIELDNAME].sum()
+            work_maxima = df.groupby(
+                constants.WORK_FIELDNAME, observed=True,
+                sort=False)[constants.COUNT_FIELDNAME].any()
+            df.loc[:, constants.LABEL_WORK_COUNT_FIELDNAME] = work_maxima.sum()
             return df
 
         if self._matches.empty:
@@ -119,7 +161,8 @@ class Results:
             self._matches.loc[:, constants.LABEL_WORK_COUNT_FIELDNAME] = 0
             self._matches = self._matches.groupby(
                 [constants.LABEL_FIELDNAME, constants.NGRAM_FIELDNAME],
-                group_keys=False, sort=False).apply(add_label_text_count)
+                group_keys=False, observed=True, sort=False).apply(
+                    add_label_text_count)
         self._logger.info('Finished adding label work count')
 
     def _annotate_bifurcated_extend_data(self, row, smaller, larger, tokenize,
@@ -167,6 +210,7 @@ class Results:
             row[DELETE_FIELDNAME] = True
         return row
 
+    @deferrable
     @requires_columns([constants.NGRAM_FIELDNAME, constants.SIZE_FIELDNAME,
                        constants.WORK_FIELDNAME, constants.SIGLUM_FIELDNAME,
                        constants.LABEL_FIELDNAME])
@@ -204,7 +248,8 @@ class Results:
         new_results = []
         group_cols = [constants.WORK_FIELDNAME, constants.SIGLUM_FIELDNAME,
                       constants.SIZE_FIELDNAME]
-        grouped = self._matches.groupby(group_cols, sort=False)
+        grouped = self._matches.groupby(group_cols, observed=True,
+                                        sort=False)
         for (work, siglum, size), group in grouped:
             try:
                 smaller_grams = grouped.get_group((work, siglum, size - 1))
@@ -224,6 +269,7 @@ class Results:
                                   sort=False).reindex(columns=all_cols)
         del self._matches[DELETE_FIELDNAME]
 
+    @deferrable
     @requires_columns([constants.NGRAM_FIELDNAME, constants.WORK_FIELDNAME,
                        constants.SIGLUM_FIELDNAME, constants.COUNT_FIELDNAME])
     def collapse_witnesses(self):
@@ -236,40 +282,29 @@ class Results:
         methods on results that have had their witnesses collapsed.
 
         """
-        # In order to allow for additional columns to be present in
-        # the input data (such as label count), copy the siglum
-        # information into a new final column, then put the sigla
-        # information into the siglum field and finally rename it.
-        #
-        # This means that in merge_sigla below, the column names are
-        # reversed from what would be expected.
         if self._matches.empty:
             self._matches.rename(columns={constants.SIGLUM_FIELDNAME:
                                           constants.SIGLA_FIELDNAME},
                                  inplace=True)
             return
-        self._matches.loc[:, constants.SIGLA_FIELDNAME] = \
-            self._matches[constants.SIGLUM_FIELDNAME]
         # This code makes the not unwarranted assumption that the same
         # n-gram means the same size and that the same work means the
         # same label.
-        grouped = self._matches.groupby(
-            [constants.WORK_FIELDNAME, constants.NGRAM_FIELDNAME,
-             constants.COUNT_FIELDNAME], group_keys=False, sort=False)
-
-        def merge_sigla(df):
-            # Take the first result row; only the siglum should differ
-            # between them, and there may only be one row.
-            merged = df[0:1]
-            sigla = list(df[constants.SIGLA_FIELDNAME])
-            sigla.sort()
-            merged[constants.SIGLUM_FIELDNAME] = ', '.join(sigla)
-            return merged
-
-        self._matches = grouped.apply(merge_sigla)
-        del self._matches[constants.SIGLA_FIELDNAME]
-        self._matches.rename(columns={constants.SIGLUM_FIELDNAME:
-                                      constants.SIGLA_FIELDNAME}, inplace=True)
+        group_cols = [constants.WORK_FIELDNAME, constants.NGRAM_FIELDNAME,
+                      constants.COUNT_FIELDNAME]
+        sigla = self._join_by_group(
+            self._matches.sort_values(by=constants.SIGLUM_FIELDNAME,
+                                      kind='stable'),
+            group_cols, constants.SIGLUM_FIELDNAME)
+        # Take the first result row for each group; only the siglum
+        # should differ between them, and there may only be one row.
+        merged = self._matches.drop_duplicates(subset=group_cols)
+        merged = merged.assign(**{
+            constants.SIGLUM_FIELDNAME: merged[group_cols].merge(
+                sigla, how='left', on=group_cols)[
+                    constants.SIGLUM_FIELDNAME].to_numpy()})
+        self._matches = merged.rename(columns={constants.SIGLUM_FIELDNAME:
+                                               constants.SIGLA_FIELDNAME})
 
     def csv(self, fh):
         """Writes the results data to `fh` in CSV format and returns `fh`.
@@ -279,11 +314,13 @@ class Results:
         :rtype: file object
 
         """
+        self._execute_plan()
         self._logger.info('Writing results to CSV')
         self._matches.to_csv(fh, encoding='utf-8', float_format='%d',
                              index=False)
         return fh
 
+    @deferrable
     @requires_columns([constants.NGRAM_FIELDNAME, constants.WORK_FIELDNAME,
                        constants.SIGLUM_FIELDNAME, constants.COUNT_FIELDNAME,
                        constants.LABEL_FIELDNAME])
@@ -370,10 +407,11 @@ class Results:
             return pd.DataFrame(rows, columns=fieldnames)
 
         matches = self._matches.groupby(group_cols, group_keys=False,
-                                        sort=False).apply(
+                                        observed=True, sort=False).apply(
             denormalise_witness_ngrams)
         self._matches = matches
 
+    @deferrable
     @requires_columns([constants.NGRAM_FIELDNAME])
     def excise(self, ngram):
         """Removes all rows whose n-gram contains `ngram`.
@@ -388,11 +426,60 @@ class Results:
 
         """
         self._logger.info('Excising results containing "{}"'.format(ngram))
+        mask = self._excise_mask(ngram)
+        if mask is not None:
+            self._matches = self._matches[mask]
+
+    @requires_columns([constants.NGRAM_FIELDNAME])
+    def _excise_mask(self, ngram):
+        """Returns a mask selecting those rows whose n-gram does not contain
+        `ngram`, or None if all rows are selected.
+
+        :param ngram: n-gram to remove containing n-gram rows by
+        :type ngram: `str`
+        :rtype: `pandas.Series`
+
+        """
         if not ngram:
+            return None
+        return ~self._matches[constants.NGRAM_FIELDNAME].str.contains(
+            ngram, regex=False)
+
+    def _execute_plan(self):
+        """Performs the operations recorded in the plan, if any, after
+        optimising it."""
+        if not self._plan:
             return
-        self._matches = self._matches[~self._matches[
-            constants.NGRAM_FIELDNAME].str.contains(ngram, regex=False)]
+        plan = self._optimise_plan(self._plan)
+        self._logger.info('Executing results plan')
+        self._plan = None
+        try:
+            for name, args, kwargs in plan:
+                if name == FILTER_STEP:
+                    self._filter(args)
+                else:
+                    getattr(self, name)(*args, **kwargs)
+        finally:
+            self._plan = []
+
+    def explain(self, fh):
+        """Writes the optimised plan of operations to be performed on the
+        results to `fh` and returns `fh`.
 
+        Only a lazy Results object has a plan; for any other, nothing
+        is written.
+
+        :param fh: file to write plan to
+        :type fh: file object
+        :rtype: file object
+
+        """
+        plan = self._optimise_plan(self._plan or [])
+        for index, step in enumerate(plan, start=1):
+            fh.write('{}. {}\n'.format(index, self._format_plan_step(step)))
+        return fh
+
+    @deferrable
     @requires_columns([constants.NGRAM_FIELDNAME, constants.SIZE_FIELDNAME,
                        constants.WORK_FIELDNAME, constants.SIGLUM_FIELDNAME,
                        constants.COUNT_FIELDNAME, constants.LABEL_FIELDNAME])
@@ -464,8 +551,9 @@ class Results:
                          constants.LABEL_FIELDNAME]
         self._logger.info("Extending to {}-grams".format(highest_n + 1))
         self._matches = self._matches.groupby(
-            grouping_cols, as_index=False, group_keys=False, sort=False).apply(
-                extend_ngrams, corpus=corpus, current_n=highest_n)
+            grouping_cols, as_index=False, group_keys=False, observed=True,
+            sort=False).apply(extend_ngrams, corpus=corpus,
+                              current_n=highest_n)
         if self._matches.shape[0] > num_rows:
             self._extend(corpus, highest_n + 1, is_intersect)
         else:
@@ -473,6 +561,65 @@ class Results:
                 self._matches = self._reciprocal_remove(self._matches)
             self._matches.reset_index(drop=True, inplace=True)
 
+    def _filter(self, steps):
+        """Removes results rows that do not pass every one of the filter
+        operations in `steps`, using a single selection.
+
+        :param steps: filter operations as recorded in a plan
+        :type steps: `tuple` of `tuple`
+
+        """
+        self._logger.info('Applying {} filters'.format(len(steps)))
+        mask = None
+        for name, args, kwargs in steps:
+            step_mask = getattr(self, '_{}_mask'.format(name))(*args, **kwargs)
+            if step_mask is None:
+                continue
+            if mask is None:
+                mask = step_mask
+            else:
+                mask &= step_mask
+        if mask is not None:
+            self._matches = self._matches[mask]
+
+    @staticmethod
+    def _format_plan_argument(value):
+        """Returns a short string representation of `value`, an argument to
+        an operation in a plan.
+
+        :param value: argument to format
+        :type value: `object`
+        :rtype: `str`
+
+        """
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return repr(value)
+        if isinstance(value, Corpus):
+            return 'Corpus({!r})'.format(value.path)
+        if isinstance(value, (list, tuple)):
+            if len(value) > 10:
+                return '<{} of {} items>'.format(type(value).__name__,
+                                                 len(value))
+            return repr(value)
+        return '<{}>'.format(type(value).__name__)
+
+    def _format_plan_step(self, step):
+        """Returns a string representation of `step` in a plan.
+
+        :param step: operation name, positional and keyword arguments
+        :type step: `tuple`
+        :rtype: `str`
+
+        """
+        name, args, kwargs = step
+        if name == FILTER_STEP:
+            return '{}: {}'.format(name, ' & '.join(
+                [self._format_plan_step(filter_step) for filter_step in args]))
+        arguments = [self._format_plan_argument(arg) for arg in args]
+        arguments.extend(['{}={}'.format(key, self._format_plan_argument(
+            value)) for key, value in kwargs.items()])
+        return '{}({})'.format(name, ', '.join(arguments))
+
     def _generate_filter_ngrams(self, data, min_size):
         """Returns the n-grams in `data` that do not contain any other n-gram
         in `data`.
@@ -519,8 +666,10 @@ class Results:
         :rtype: `pandas.DataFrame`
 
         """
+        self._execute_plan()
         return self._matches
 
+    @deferrable
     @requires_columns([constants.NGRAM_FIELDNAME, constants.WORK_FIELDNAME,
                        constants.SIGLUM_FIELDNAME, constants.COUNT_FIELDNAME,
                        constants.LABEL_FIELDNAME])
@@ -545,44 +694,41 @@ class Results:
                     constants.WORK_COUNTS_FIELDNAME])
             return
         label_order_col = 'label order'
-
-        def work_summary(group):
-            match = group.iloc[0]
-            work = match[constants.WORK_FIELDNAME]
-            minimum = group[constants.COUNT_FIELDNAME].min()
-            maximum = group[constants.COUNT_FIELDNAME].max()
-            if minimum == maximum:
-                work_count = '{}({})'.format(work, minimum)
-            else:
-                work_count = '{}({}-{})'.format(work, minimum, maximum)
-            match['work count'] = work_count
-            return match
-
-        def ngram_label_summary(group):
-            match = group.iloc[0]
-            summary = group.groupby(constants.WORK_FIELDNAME).apply(
-                work_summary)
-            work_counts = ', '.join(list(summary['work count']))
-            match[constants.WORK_COUNTS_FIELDNAME] = work_counts
-            return match
-
-        def add_label_order(row, labels):
-            row[label_order_col] = labels.index(row[constants.LABEL_FIELDNAME])
-            return row
-
         group_cols = [constants.NGRAM_FIELDNAME, constants.LABEL_FIELDNAME]
-        matches = self._matches.groupby(group_cols, sort=False).apply(
-            ngram_label_summary)
-        del matches[constants.WORK_FIELDNAME]
-        del matches[constants.SIGLUM_FIELDNAME]
-        del matches[constants.COUNT_FIELDNAME]
-        matches = matches.apply(add_label_order, axis=1, args=(labels,))
-        matches.reset_index(drop=True, inplace=True)
+        work_cols = group_cols + [constants.WORK_FIELDNAME]
+        # Summarise each work's range of counts, in work order, and
+        # then combine those summaries for each n-gram and label.
+        work_counts = self._matches.groupby(work_cols, observed=True,
+                                            sort=False)[
+            constants.COUNT_FIELDNAME].agg(['min', 'max']).reset_index()
+        work_counts.sort_values(by=constants.WORK_FIELDNAME, kind='stable',
+                                inplace=True)
+        minimum = work_counts['min'].astype(str)
+        maximum = work_counts['max'].astype(str)
+        count_range = minimum.where(
+            work_counts['min'] == work_counts['max'],
+            minimum + '-' + maximum)
+        work_counts[constants.WORK_COUNTS_FIELDNAME] = (
+            work_counts[constants.WORK_FIELDNAME].astype(str) + '(' +
+            count_range + ')')
+        summaries = self._join_by_group(work_counts, group_cols,
+                                        constants.WORK_COUNTS_FIELDNAME)
+        # All other fields are taken from the first row for each
+        # n-gram and label.
+        matches = self._matches.drop_duplicates(subset=group_cols).drop(
+            columns=[constants.WORK_FIELDNAME, constants.SIGLUM_FIELDNAME,
+                     constants.COUNT_FIELDNAME])
+        matches = matches.merge(summaries, how='left', on=group_cols)
+        matches[label_order_col] = pd.Categorical(
+            matches[constants.LABEL_FIELDNAME], categories=labels,
+            ordered=True)
         matches.sort_values(by=[constants.NGRAM_FIELDNAME, label_order_col],
                             ascending=True, inplace=True)
         del matches[label_order_col]
+        matches.reset_index(drop=True, inplace=True)
         self._matches = matches
 
+    @deferrable
     @requires_columns([constants.NGRAM_FIELDNAME, constants.SIZE_FIELDNAME,
                        constants.WORK_FIELDNAME, constants.SIGLUM_FIELDNAME,
                        constants.COUNT_FIELDNAME])
@@ -602,26 +748,27 @@ class Results:
                              constants.TOTAL_COUNT_FIELDNAME])
             return
 
-        def witness_summary(group):
-            matches = group.sort_values(by=[constants.NGRAM_FIELDNAME],
-                                        ascending=[True])
-            match = matches.iloc[0]
-            ngrams = ', '.join(list(matches[constants.NGRAM_FIELDNAME]))
-            match[constants.NGRAMS_FIELDNAME] = ngrams
-            match[constants.NUMBER_FIELDNAME] = len(matches)
-            match[constants.TOTAL_COUNT_FIELDNAME] = matches[
-                constants.COUNT_FIELDNAME].sum()
-            return match
-
         group_cols = [constants.WORK_FIELDNAME, constants.SIGLUM_FIELDNAME]
         # Remove zero-count results.
-        self._matches = self._matches[
-            self._matches[constants.COUNT_FIELDNAME] != 0]
-        self._matches = self._matches.groupby(group_cols, group_keys=False,
-                                              sort=False).apply(witness_summary)
-        del self._matches[constants.NGRAM_FIELDNAME]
-        del self._matches[constants.SIZE_FIELDNAME]
-        del self._matches[constants.COUNT_FIELDNAME]
+        matches = self._matches[self._matches[constants.COUNT_FIELDNAME] != 0]
+        witness_order = matches[group_cols].drop_duplicates()
+        matches = matches.sort_values(by=[constants.NGRAM_FIELDNAME],
+                                      kind='stable')
+        grouped = matches.groupby(group_cols, observed=True, sort=False)
+        summaries = self._join_by_group(
+            matches, group_cols, constants.NGRAM_FIELDNAME).rename(
+                columns={constants.NGRAM_FIELDNAME:
+                         constants.NGRAMS_FIELDNAME})
+        summaries[constants.NUMBER_FIELDNAME] = grouped.size().to_numpy()
+        summaries[constants.TOTAL_COUNT_FIELDNAME] = grouped[
+            constants.COUNT_FIELDNAME].sum().to_numpy()
+        # All other fields are taken from each witness' row with the
+        # first n-gram.
+        first_rows = matches.drop_duplicates(subset=group_cols).drop(
+            columns=[constants.NGRAM_FIELDNAME, constants.SIZE_FIELDNAME,
+                     constants.COUNT_FIELDNAME])
+        self._matches = witness_order.merge(first_rows, on=group_cols).merge(
+            summaries, on=group_cols)
 
     @staticmethod
     def _is_intersect_results(results):
@@ -643,6 +790,79 @@ class Results:
         counts = data.groupby(constants.NGRAM_FIELDNAME).count()
         return counts[counts[constants.LABEL_FIELDNAME] != num_labels].empty
 
+    @staticmethod
+    def _join_by_group(matches, group_cols, column, separator=', '):
+        """Returns the values of `column` in `matches` joined by
+        `separator` for each group of `group_cols`.
+
+        Groups are returned in the order of their first appearance in
+        `matches`, and each group's values are joined in the order in
+        which they appear in `matches`.
+
+        :param matches: results data
+        :type matches: `pandas.DataFrame`
+        :param group_cols: names of columns to group by
+        :type group_cols: `list` of `str`
+        :param column: name of column whose values are to be joined
+        :type column: `str`
+        :param separator: string to join values with
+        :type separator: `str`
+        :rtype: `pandas.DataFrame`
+
+        """
+        codes = matches.groupby(group_cols, observed=True,
+                                sort=False).ngroup().to_numpy()
+        order = np.argsort(codes, kind='stable')
+        values = matches[column].astype(str).to_numpy(dtype=object)[order]
+        boundaries = np.flatnonzero(np.diff(codes[order])) + 1
+        joined = matches[group_cols].drop_duplicates().reset_index(drop=True)
+        joined[column] = [separator.join(group) for group in
+                          np.split(values, boundaries)] if len(values) else []
+        return joined
+
+    @staticmethod
+    def _optimise_plan(plan):
+        """Returns `plan` optimised for execution.
+
+        Each filter operation is moved ahead of preceding operations
+        so long as doing so does not change the outcome, and
+        consecutive filter operations are combined into a single
+        step.
+
+        :param plan: operations to be performed
+        :type plan: `list` of `tuple`
+        :rtype: `list` of `tuple`
+
+        """
+        reordered = []
+        for step in plan:
+            position = len(reordered)
+            if step[0] in FILTER_OPERATIONS:
+                # Filters may be freely reordered with respect to
+                # each other, but are only moved past them if that
+                # allows them to be moved past another operation.
+                index = position
+                while index > 0:
+                    previous = reordered[index - 1][0]
+                    if previous not in FILTER_OPERATIONS:
+                        if step[0] not in MOVABLE_FILTERS.get(previous, ()):
+                            break
+                        position = index - 1
+                    index -= 1
+            reordered.insert(position, step)
+        optimised = []
+        for step in reordered:
+            if step[0] not in FILTER_OPERATIONS:
+                optimised.append(step)
+            elif optimised and optimised[-1][0] == FILTER_STEP:
+                name, steps, kwargs = optimised[-1]
+                optimised[-1] = (name, steps + (step,), kwargs)
+            elif optimised and optimised[-1][0] in FILTER_OPERATIONS:
+                optimised[-1] = (FILTER_STEP, (optimised[-1], step), {})
+            else:
+                optimised.append(step)
+        return optimised
+
     def _prepare_bifurcated_extend_data(self, corpus, max_size, temp_path,
                                         temp_fd):
         # It might be wondered why this whole derivation of n-grams
@@ -666,7 +886,7 @@ class Results:
             writer = csv.writer(fh)
             writer.writerow(constants.QUERY_FIELDNAMES)
             for (text, siglum, label), group in self._matches.groupby(
-                    group_cols, sort=False):
+                    group_cols, observed=True, sort=False):
                 min_size = group[constants.SIZE_FIELDNAME].min()
                 filter_ngrams = self._generate_filter_ngrams(group, min_size)
                 witness = corpus.get_witness(text, siglum, FilteredWitnessText)
@@ -679,6 +899,7 @@ class Results:
                                     na_filter=False)
         self.add_label_count()
 
+    @deferrable
     @requires_columns([constants.NGRAM_FIELDNAME])
     def prune_by_ngram(self, ngrams):
         """Removes results rows whose n-gram is in `ngrams`.
@@ -688,9 +909,21 @@ class Results:
 
         """
         self._logger.info('Pruning results by n-gram')
-        self._matches = self._matches[
-            ~self._matches[constants.NGRAM_FIELDNAME].isin(ngrams)]
+        self._matches = self._matches[self._prune_by_ngram_mask(ngrams)]
+
+    @requires_columns([constants.NGRAM_FIELDNAME])
+    def _prune_by_ngram_mask(self, ngrams):
+        """Returns a mask selecting those rows whose n-gram is not in
+        `ngrams`.
+
+        :param ngrams: n-grams to remove
+        :type ngrams: `list` of `str`
+        :rtype: `pandas.Series`
+
+        """
+        return ~self._matches[constants.NGRAM_FIELDNAME].isin(ngrams)
 
+    @deferrable
     @requires_columns([constants.NGRAM_FIELDNAME, constants.WORK_FIELDNAME,
                        constants.COUNT_FIELDNAME])
     def prune_by_ngram_count(self, minimum=None, maximum=None, label=None):
@@ -715,7 +948,8 @@ class Results:
         self._logger.info('Pruning results by n-gram count')
 
         def calculate_total(group):
-            work_grouped = group.groupby(constants.WORK_FIELDNAME, sort=False)
+            work_grouped = group.groupby(constants.WORK_FIELDNAME,
+                                         observed=True, sort=False)
             total_count = work_grouped[constants.COUNT_FIELDNAME].max().sum()
             group['total_count'] = pd.Series([total_count] * len(group.index),
                                              index=group.index)
@@ -747,6 +981,7 @@ class Results:
         self._matches = self._matches[
             self._matches[constants.NGRAM_FIELDNAME].isin(ngrams)]
 
+    @deferrable
     @requires_columns([constants.NGRAM_FIELDNAME, constants.COUNT_FIELDNAME])
     def prune_by_ngram_count_per_work(self, minimum=None, maximum=None,
                                       label=None):
@@ -790,6 +1025,7 @@ class Results:
         self._matches = self._matches[self._matches[
             constants.NGRAM_FIELDNAME].isin(keep_ngrams)]
 
+    @deferrable
     @requires_columns([constants.SIZE_FIELDNAME])
     def prune_by_ngram_size(self, minimum=None, maximum=None):
         """Removes results rows whose n-gram size is outside the
@@ -802,13 +1038,35 @@ class Results:
 
         """
         self._logger.info('Pruning results by n-gram size')
+        mask = self._prune_by_ngram_size_mask(minimum, maximum)
+        if mask is not None:
+            self._matches = self._matches[mask]
+
+    @requires_columns([constants.SIZE_FIELDNAME])
+    def _prune_by_ngram_size_mask(self, minimum=None, maximum=None):
+        """Returns a mask selecting those rows whose n-gram size is within
+        the range specified by `minimum` and `maximum`, or None if all
+        rows are selected.
+
+        :param minimum: minimum n-gram size
+        :type minimum: `int`
+        :param maximum: maximum n-gram size
+        :type maximum: `int`
+        :rtype: `pandas.Series`
+
+        """
+        mask = None
+        sizes = self._matches[constants.SIZE_FIELDNAME]
         if minimum:
-            self._matches = self._matches[
-                self._matches[constants.SIZE_FIELDNAME] >= minimum]
+            mask = sizes >= minimum
         if maximum:
-            self._matches = self._matches[
-                self._matches[constants.SIZE_FIELDNAME] <= maximum]
+            if mask is None:
+                mask = sizes <= maximum
+            else:
+                mask &= sizes <= maximum
+        return mask
 
+    @deferrable
     @requires_columns([constants.NGRAM_FIELDNAME, constants.WORK_FIELDNAME,
                        constants.COUNT_FIELDNAME])
     def prune_by_work_count(self, minimum=None, maximum=None, label=None):
@@ -850,6 +1108,7 @@ class Results:
                                  right_index=True)
         del self._matches[count_fieldname]
 
+    @deferrable
     @requires_columns([constants.NGRAM_FIELDNAME, constants.COUNT_FIELDNAME,
                        constants.LABEL_FIELDNAME])
     def reciprocal_remove(self):
@@ -868,6 +1127,7 @@ class Results:
         return grouped.filter(
             lambda x: x[constants.LABEL_FIELDNAME].nunique() == number_labels)
 
+    @deferrable
     @requires_columns([constants.NGRAM_FIELDNAME, constants.SIZE_FIELDNAME,
                        constants.WORK_FIELDNAME, constants.SIGLUM_FIELDNAME,
                        constants.COUNT_FIELDNAME, constants.LABEL_FIELDNAME])
@@ -933,6 +1193,7 @@ class Results:
             else:
                 substring_data['count'] -= count
 
+    @deferrable
     @requires_columns([constants.WORK_FIELDNAME, constants.LABEL_FIELDNAME])
     def relabel(self, catalogue):
         """Relabels results rows according to `catalogue`.
@@ -945,10 +1206,19 @@ class Results:
         :type catalogue: `Catalogue`
 
         """
-        for work, label in catalogue.items():
-            self._matches.loc[self._matches[constants.WORK_FIELDNAME] == work,
-                              constants.LABEL_FIELDNAME] = label
-
+        works = self._matches[constants.WORK_FIELDNAME].astype(
+            'category').cat
+        # Look up the label for each distinct work once, and apply
+        # those labels to the rows via the category codes.
+        work_labels = np.array([catalogue.get(work) for work in
+                                works.categories] + [None], dtype=object)
+        labels = work_labels[works.codes.to_numpy()]
+        unlabelled = pd.isna(labels)
+        labels[unlabelled] = self._matches[constants.LABEL_FIELDNAME].to_numpy(
+            dtype=object)[unlabelled]
+        self._matches[constants.LABEL_FIELDNAME] = pd.Categorical(labels)
+
+    @deferrable
     @requires_columns([constants.LABEL_FIELDNAME])
     def remove_label(self, label):
         """Removes all results rows associated with `label`.
@@ -958,12 +1228,23 @@ class Results:
 
         """
         self._logger.info('Removing label "{}"'.format(label))
-        count = self._matches[constants.LABEL_FIELDNAME].value_counts().get(
-            label, 0)
-        self._matches = self._matches[
-            self._matches[constants.LABEL_FIELDNAME] != label]
+        mask = self._remove_label_mask(label)
+        count = len(mask) - mask.sum()
+        self._matches = self._matches[mask]
         self._logger.info('Removed {} labelled results'.format(count))
 
+    @requires_columns([constants.LABEL_FIELDNAME])
+    def _remove_label_mask(self, label):
+        """Returns a mask selecting those rows not associated with `label`.
+
+        :param label: label to filter results on
+        :type label: `str`
+        :rtype: `pandas.Series`
+
+        """
+        return self._matches[constants.LABEL_FIELDNAME] != label
+
+    @deferrable
     @requires_columns([constants.NGRAM_FIELDNAME, constants.SIZE_FIELDNAME,
                        constants.WORK_FIELDNAME, constants.SIGLUM_FIELDNAME,
                        constants.COUNT_FIELDNAME, constants.LABEL_FIELDNAME])
@@ -980,6 +1261,7 @@ class Results:
                 constants.WORK_FIELDNAME, constants.SIGLUM_FIELDNAME],
             ascending=[False, True, False, True, True, True], inplace=True)
 
+    @deferrable
     @requires_columns([constants.NGRAM_FIELDNAME, constants.SIZE_FIELDNAME,
                        constants.WORK_FIELDNAME, constants.SIGLUM_FIELDNAME,
                        constants.LABEL_FIELDNAME])
@@ -993,25 +1275,25 @@ class Results:
 
         """
         self._logger.info('Zero-filling results')
-        zero_rows = []
-        work_sigla = {}
-        grouping_cols = [constants.LABEL_FIELDNAME, constants.NGRAM_FIELDNAME,
-                         constants.SIZE_FIELDNAME, constants.WORK_FIELDNAME]
-        grouped = self._matches.groupby(grouping_cols, sort=False)
-        for (label, ngram, size, work), group in grouped:
-            row_data = {
-                constants.NGRAM_FIELDNAME: ngram,
-                constants.LABEL_FIELDNAME: label,
-                constants.SIZE_FIELDNAME: size,
-                constants.COUNT_FIELDNAME: 0,
-                constants.WORK_FIELDNAME: work,
-            }
-            if work not in work_sigla:
-                work_sigla[work] = corpus.get_sigla(work)
-            for siglum in work_sigla[work]:
-                if group[group[constants.SIGLUM_FIELDNAME] == siglum].empty:
-                    row_data[constants.SIGLUM_FIELDNAME] = siglum
-                    zero_rows.append(row_data)
-        zero_df = pd.DataFrame(zero_rows, columns=constants.QUERY_FIELDNAMES)
+        key_cols = [constants.LABEL_FIELDNAME, constants.NGRAM_FIELDNAME,
+                    constants.SIZE_FIELDNAME, constants.WORK_FIELDNAME]
+        witness_cols = key_cols + [constants.SIGLUM_FIELDNAME]
+        keys = self._matches[key_cols].drop_duplicates()
+        # Cross join each distinct (label, n-gram, size, work) with
+        # every siglum of that work, then remove those combinations
+        # that already have a row; what remains needs a zero row.
+        work_sigla = pd.DataFrame(
+            [(work, siglum) for work in keys[constants.WORK_FIELDNAME].unique()
+             for siglum in corpus.get_sigla(work)],
+            columns=[constants.WORK_FIELDNAME, constants.SIGLUM_FIELDNAME])
+        work_sigla = work_sigla.astype(
+            keys[[constants.WORK_FIELDNAME]].dtypes.to_dict())
+        candidates = keys.merge(work_sigla, on=constants.WORK_FIELDNAME)
+        existing = self._matches[witness_cols].drop_duplicates()
+        zero_df = candidates.merge(existing, how='left', on=witness_cols,
+                                   indicator=True)
+        zero_df = zero_df[zero_df['_merge'] == 'left_only']
+        zero_df = zero_df.assign(**{constants.COUNT_FIELDNAME: 0}).reindex(
+            columns=constants.QUERY_FIELDNAMES)
         self._matches = pd.concat([self._matches, zero_df], ignore_index=True,
                                   sort=False)
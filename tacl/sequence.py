@@ -1,5 +1,8 @@
-"""Module containing the Sequence and SequenceReport classes."""
+"""Module containing the CoveredSpans, Sequence and SequenceReport
+classes."""
 
+import bisect
+from concurrent.futures import ProcessPoolExecutor
 import logging
 import os
 import re
@@ -12,6 +15,66 @@ from .report import Report
 from .text import Text
 
 
+# The SequenceReport and n-grams used by each worker process, set by
+# `_initialise_worker`.
+_worker_ngrams = None
+_worker_report = None
+
+
+class CoveredSpans:
+
+    """Class to record the parts of a text covered by spans, and to
+    determine whether a span falls within any one of them.
+
+    Only those spans that are not within another span are kept, in
+    order of start index. Since no kept span is within another, they
+    are also in order of end index, and the only span that can contain
+    a given span is the last one to start at or before it.
+
+    """
+
+    def __init__(self):
+        self._starts = []
+        self._ends = []
+
+    def add(self, span):
+        """Adds `span` to the covered spans.
+
+        :param span: start and end indices of a span
+        :type span: 2-`tuple` of `int`
+
+        """
+        if self.contains(span):
+            return
+        start, end = span
+        # Remove the spans that fall within the new span; being
+        # ordered, they are contiguous.
+        first = bisect.bisect_left(self._starts, start)
+        last = bisect.bisect_right(self._ends, end, lo=first)
+        self._starts[first:last] = [start]
+        self._ends[first:last] = [end]
+
+    def contains(self, span):
+        """Returns True if `span` falls within any covered span.
+
+        :param span: start and end indices of a span
+        :type span: 2-`tuple` of `int`
+        :rtype: `bool`
+
+        """
+        index = bisect.bisect_right(self._starts, span[0]) - 1
+        return index >= 0 and self._ends[index] >= span[1]
+
+    @property
+    def spans(self):
+        """Returns the covered spans that are not within another.
+
+        :rtype: `list` of 2-`tuple` of `int`
+
+        """
+        return list(zip(self._starts, self._ends))
+
+
 class Sequence:
 
     """Class to format supplied sequences using simple HTML span markup."""
@@ -57,21 +120,76 @@ class SequenceReport (Report):
 
     _report_name = 'sequence'
 
-    def __init__(self, corpus, tokenizer, results):
+    def __init__(self, corpus, tokenizer, results, maximum_context=None):
         self._logger = logging.getLogger(__name__)
         self._corpus = corpus
         self._tokenizer = tokenizer
         self._matches = pd.read_csv(results, encoding='utf-8', na_filter=False)
+        self._maximum_context = maximum_context
         self._substitutes = {}
         self._char_code = 61440
+        self._aligner = Align.PairwiseAligner(
+            mode='global', match_score=constants.IDENTICAL_CHARACTER_SCORE,
+            mismatch_score=constants.DIFFERENT_CHARACTER_SCORE,
+            open_gap_score=constants.OPEN_GAP_PENALTY,
+            extend_gap_score=constants.EXTEND_GAP_PENALTY)
+
+    def _align(self, s1, s2):
+        """Returns the aligned forms of `s1` and `s2`.
+
+        :param s1: text sequence from one witness
+        :type s1: `str`
+        :param s2: text sequence from another witness
+        :type s2: `str`
+        :rtype: 2-`tuple` of `str`
+
+        """
+        if not s1 or not s2:
+            return s1 or '-' * len(s2), s2 or '-' * len(s1)
+        alignment = self._aligner.align(s1, s2)[0]
+        return alignment[0], alignment[1]
+
+    def _align_flanks(self, t1, t1_span, span1, t2, t2_span, span2):
+        """Returns the alignment of extract `span1` of `t1` with extract
+        `span2` of `t2`.
 
-    def generate(self, output_dir, minimum_size):
+        The n-gram at `t1_span` and `t2_span` is common to both
+        extracts, and is used as a fixed point, so that only the text
+        on either side of it need be aligned.
+
+        :param t1: text content of first witness
+        :type t1: `str`
+        :param t1_span: start and end indices of the n-gram within `t1`
+        :type t1_span: 2-`tuple` of `int`
+        :param span1: start and end indices of the extract of `t1`
+        :type span1: 2-`tuple` of `int`
+        :param t2: text content of second witness
+        :type t2: `str`
+        :param t2_span: start and end indices of the n-gram within `t2`
+        :type t2_span: 2-`tuple` of `int`
+        :param span2: start and end indices of the extract of `t2`
+        :type span2: 2-`tuple` of `int`
+        :rtype: 2-`tuple` of `str`
+
+        """
+        before = self._align(t1[span1[0]:t1_span[0]], t2[span2[0]:t2_span[0]])
+        after = self._align(t1[t1_span[1]:span1[1]], t2[t2_span[1]:span2[1]])
+        ngram = t1[t1_span[0]:t1_span[1]]
+        return before[0] + ngram + after[0], before[1] + ngram + after[1]
+
+    def generate(self, output_dir, minimum_size, jobs=1):
         """Generates sequence reports and writes them to the output directory.
 
+        Each pair of witnesses is independent of the others, and if
+        `jobs` is greater than 1, the pairs are divided among that
+        many processes.
+
         :param output_dir: directory to output reports to
         :type output_dir: `str`
         :param minimum_size: minimum size of n-grams to create sequences for
         :type minimum_size: `int`
+        :param jobs: number of processes to use
+        :type jobs: `int`
 
         """
         self._output_dir = output_dir
@@ -88,26 +206,45 @@ class SequenceReport (Report):
         for original_ngram in original_ngrams:
             ngrams.append(self._get_text(Text(original_ngram,
                                               self._tokenizer)))
+        # Substitute for the multi-character tokens in every witness
+        # before any alignment is done, so that the complete
+        # substitution map can be given to each pair of witnesses.
+        texts = self._get_texts()
+        self._reverse_substitutes = dict((v, k) for k, v in
+                                         self._substitutes.items())
         # Generate sequences for each witness in every combination of
         # (different) labels.
+        pairs = []
         for index, primary_label in enumerate(labels):
             for secondary_label in labels[index+1:]:
-                self._generate_sequences(primary_label, secondary_label,
-                                         ngrams)
+                pairs.extend(self._get_witness_pairs(
+                    primary_label, secondary_label, texts))
+        if jobs > 1 and len(pairs) > 1:
+            with ProcessPoolExecutor(
+                    max_workers=jobs, initializer=_initialise_worker,
+                    initargs=(self, ngrams)) as executor:
+                # Consume the results so that any exception raised
+                # in a worker is raised here.
+                list(executor.map(_generate_sequences_for_pair, pairs))
+        else:
+            for l1, t1, l2, t2 in pairs:
+                self._generate_sequences_for_texts(l1, t1, l2, t2, ngrams)
 
     def _generate_sequence(self, t1, t1_span, t2, t2_span, context_length,
                            covered_spans):
-        """Returns an aligned sequence (or None) between extract `t1_span` of
-        witness text `t1` and extract `t2_span` of witness text `t2`.
+        """Returns an aligned sequence between extract `t1_span` of witness
+        text `t1` and extract `t2_span` of witness text `t2`.
 
-        Adds the span of the aligned sequence, if any, to
+        Adds the span of the aligned sequence to
         `covered_spans` (which, being mutable, is modified in place
         without needing to be returned).
 
-        This method repeats the alignment process, increasing the
-        context length until the alignment score (the measure of how
-        much the two sequences align) drops below a certain point or
-        it is not possible to increase the context length.
+        This method repeats the scoring of the alignment, increasing
+        the context length until the alignment score (the measure of
+        how much the two sequences align) drops below a certain point
+        or it is not possible to increase the context length (beyond
+        the maximum context, if one was given). Only the final
+        extracts are aligned.
 
         :param t1: text content of first witness
         :type t1: `str`
@@ -120,69 +257,32 @@ class SequenceReport (Report):
         :param context_length: length of context on either side of
                                the spans to include in the sequence
         :type context_length: `int`
-        :param covered_spans: lists of start and end indices for parts
-                              of the texts already covered by a sequence
-        :type covered_spans: `list` of two `list`s of 2-`tuple` of `int`
+        :param covered_spans: parts of each text already covered by a
+                              sequence
+        :type covered_spans: 2-`tuple` of `CoveredSpans`
 
         """
         old_length = 0
         self._logger.debug('Match found; generating new sequence')
         while True:
+            if self._maximum_context is not None:
+                context_length = min(context_length, self._maximum_context)
             s1, span1 = self._get_text_sequence(t1, t1_span, context_length)
             s2, span2 = self._get_text_sequence(t2, t2_span, context_length)
             length = len(s1)
-            aligner = Align.PairwiseAligner(
-                mode="global", match_score=constants.IDENTICAL_CHARACTER_SCORE,
-                mismatch_score=constants.DIFFERENT_CHARACTER_SCORE,
-                open_gap_score=constants.OPEN_GAP_PENALTY,
-                extend_gap_score=constants.EXTEND_GAP_PENALTY)
-            alignments = aligner.align(s1, s2)
-            score = alignments.score / length
-            alignment = alignments[0]
-            if not alignment:
-                return None
-            elif score < constants.SCORE_THRESHOLD or length == old_length:
+            score = self._score_flanks(
+                t1, t1_span, span1, t2, t2_span, span2) / length
+            if score < constants.SCORE_THRESHOLD or length == old_length:
                 break
             else:
                 self._logger.debug('Score: {}'.format(score))
             context_length = length
             old_length = length
-        covered_spans[0].append(span1)
-        covered_spans[1].append(span2)
+        alignment = self._align_flanks(t1, t1_span, span1, t2, t2_span, span2)
+        covered_spans[0].add(span1)
+        covered_spans[1].add(span2)
         return Sequence(alignment, self._reverse_substitutes, t1_span[0])
 
-    def _generate_sequences(self, primary_label, secondary_label, ngrams):
-        """Generates aligned sequences between each witness labelled
-        `primary_label` and each witness labelled `secondary_label`,
-        based around `ngrams`.
-
-        :param primary_label: label for one side of the pairs of
-                              witnesses to align
-        :type primary_label: `str`
-        :param secondary_label: label for the other side of the pairs
-                                of witnesses to align
-        :type secondary_label: `str`
-        :param ngrams: n-grams to base sequences off
-        :type ngrams: `list` of `str`
-
-        """
-        cols = [constants.WORK_FIELDNAME, constants.SIGLUM_FIELDNAME]
-        primary_works = self._matches[self._matches[
-            constants.LABEL_FIELDNAME] == primary_label][
-                cols].drop_duplicates()
-        secondary_works = self._matches[self._matches[
-            constants.LABEL_FIELDNAME] == secondary_label][
-                cols].drop_duplicates()
-        for index, (work1, siglum1) in primary_works.iterrows():
-            text1 = self._get_text(self._corpus.get_witness(work1, siglum1))
-            label1 = '{}_{}'.format(work1, siglum1)
-            for index, (work2, siglum2) in secondary_works.iterrows():
-                text2 = self._get_text(self._corpus.get_witness(
-                    work2, siglum2))
-                label2 = '{}_{}'.format(work2, siglum2)
-                self._generate_sequences_for_texts(label1, text1, label2,
-                                                   text2, ngrams)
-
     def _generate_sequences_for_ngram(self, t1, t2, ngram, covered_spans):
         """Generates aligned sequences for the texts `t1` and `t2`, based
         around `ngram`.
@@ -195,9 +295,9 @@ class SequenceReport (Report):
         :type t2: `str`
         :param ngram: n-gram to base sequences on
         :type ngram: `str`
-        :param covered_spans: lists of start and end indices for parts
-                              of the texts already covered by a sequence
-        :type covered_spans: `list` of two `list`s of 2-`tuple` of `int`
+        :param covered_spans: parts of each text already covered by a
+                              sequence
+        :type covered_spans: 2-`tuple` of `CoveredSpans`
 
         """
         self._logger.debug('Generating sequences for n-gram "{}"'.format(
@@ -208,8 +308,24 @@ class SequenceReport (Report):
         t2_spans = [match.span() for match in pattern.finditer(t2)]
         sequences = []
         self._logger.debug(t1)
+        if not t2_spans:
+            return sequences
+        # Covered parts of the texts only ever grow, and generating a
+        # sequence for a pair of spans covers both of them. Every span
+        # in t2 is therefore covered once the first span in t1 has
+        # been checked against each of them, and is no longer a
+        # candidate for later spans in t1. A later span in t1 that is
+        # not itself covered pairs only with the first span in t2, as
+        # it would be inside covered parts with any other.
+        uncovered_t2_spans = t2_spans
         for t1_span in t1_spans:
-            for t2_span in t2_spans:
+            if not covered_spans[0].contains(t1_span):
+                sequence = self._generate_sequence(
+                    t1, t1_span, t2, t2_spans[0], context_length,
+                    covered_spans)
+                if sequence:
+                    sequences.append(sequence)
+            for t2_span in uncovered_t2_spans:
                 if self._is_inside(t1_span, t2_span, covered_spans):
                     self._logger.debug(
                         'Skipping match due to existing coverage')
@@ -218,6 +334,7 @@ class SequenceReport (Report):
                     t1, t1_span, t2, t2_span, context_length, covered_spans)
                 if sequence:
                     sequences.append(sequence)
+            uncovered_t2_spans = []
         return sequences
 
     def _generate_sequences_for_texts(self, l1, t1, l2, t2, ngrams):
@@ -236,16 +353,12 @@ class SequenceReport (Report):
         :type ngrams: `list` of `str`
 
         """
-        # self._subsitutes is gradually populated as each text is
-        # processed, so this needs to be regenerated each time.
-        self._reverse_substitutes = dict((v, k) for k, v in
-                                         self._substitutes.items())
         sequences = []
         # Keep track of spans within each text that have been covered
         # by an aligned sequence, to ensure that they aren't reported
         # more than once. The first sub-list contains span indices for
         # text t1, the second for t2.
-        covered_spans = [[], []]
+        covered_spans = (CoveredSpans(), CoveredSpans())
         for ngram in ngrams:
             sequences.extend(self._generate_sequences_for_ngram(
                 t1, t2, ngram, covered_spans))
@@ -293,6 +406,53 @@ class SequenceReport (Report):
         end = min(len(text), span[1] + context_length)
         return text[start:end], (start, end)
 
+    def _get_texts(self):
+        """Returns the text content, with multi-character tokens
+        substituted, of each witness in the results.
+
+        :rtype: `dict` of 2-`tuple` of `str` to `str`
+
+        """
+        cols = [constants.WORK_FIELDNAME, constants.SIGLUM_FIELDNAME]
+        texts = {}
+        for work, siglum in self._matches[cols].drop_duplicates().itertuples(
+                index=False):
+            texts[(work, siglum)] = self._get_text(
+                self._corpus.get_witness(work, siglum))
+        return texts
+
+    def _get_witness_pairs(self, primary_label, secondary_label, texts):
+        """Returns each pair of a witness labelled `primary_label` and a
+        witness labelled `secondary_label`, with their text content
+        taken from `texts`.
+
+        :param primary_label: label for one side of the pairs of
+                              witnesses to align
+        :type primary_label: `str`
+        :param secondary_label: label for the other side of the pairs
+                                of witnesses to align
+        :type secondary_label: `str`
+        :param texts: text content of each witness
+        :type texts: `dict` of 2-`tuple` of `str` to `str`
+        :rtype: `list` of 4-`tuple` of `str`
+
+        """
+        cols = [constants.WORK_FIELDNAME, constants.SIGLUM_FIELDNAME]
+        primary_works = self._matches[self._matches[
+            constants.LABEL_FIELDNAME] == primary_label][
+                cols].drop_duplicates()
+        secondary_works = self._matches[self._matches[
+            constants.LABEL_FIELDNAME] == secondary_label][
+                cols].drop_duplicates()
+        pairs = []
+        for index, (work1, siglum1) in primary_works.iterrows():
+            label1 = '{}_{}'.format(work1, siglum1)
+            for index, (work2, siglum2) in secondary_works.iterrows():
+                label2 = '{}_{}'.format(work2, siglum2)
+                pairs.append((label1, texts[(work1, siglum1)], label2,
+                               texts[(work2, siglum2)]))
+        return pairs
+
     def _is_inside(self, span1, span2, covered_spans):
         """Returns True if both `span1` and `span2` fall within
         `covered_spans`.
@@ -301,31 +461,84 @@ class SequenceReport (Report):
         :type span1: 2-`tuple` of `int`
         :param span2: start and end indices of a span
         :type span2: 2-`tuple` of `int`
-        :param covered_spans: lists of start and end indices for parts
-                              of the texts already covered by a sequence
-        :type covered_spans: `list` of two `list`s of 2-`tuple` of `int`
+        :param covered_spans: parts of each text already covered by a
+                              sequence
+        :type covered_spans: 2-`tuple` of `CoveredSpans`
         :rtype: `bool`
 
         """
-        if self._is_span_inside(span1, covered_spans[0]) and \
-           self._is_span_inside(span2, covered_spans[1]):
+        if covered_spans[0].contains(span1) and \
+           covered_spans[1].contains(span2):
             return True
         return False
 
-    def _is_span_inside(self, span, covered_spans):
-        """Returns True if `span` falls within `covered_spans`.
+    def _score(self, s1, s2):
+        """Returns the score of the alignment of `s1` and `s2`.
 
-        :param span: start and end indices of a span
-        :type span: 2-`tuple` of `int`
-        :param covered_spans: list of start and end indices for parts
-                              of the text already covered by a sequence
-        :type covered_spans: `list` of  2-`tuple` of `int`
-        :rtype: `bool`
+        :param s1: text sequence from one witness
+        :type s1: `str`
+        :param s2: text sequence from another witness
+        :type s2: `str`
+        :rtype: `float`
 
         """
-        start = span[0]
-        end = span[1]
-        for c_start, c_end in covered_spans:
-            if start >= c_start and end <= c_end:
-                return True
-        return False
+        if s1 and s2:
+            return self._aligner.score(s1, s2)
+        gap_length = len(s1) + len(s2)
+        if not gap_length:
+            return 0
+        return constants.OPEN_GAP_PENALTY + \
+            constants.EXTEND_GAP_PENALTY * (gap_length - 1)
+
+    def _score_flanks(self, t1, t1_span, span1, t2, t2_span, span2):
+        """Returns the score of the alignment of extract `span1` of `t1`
+        with extract `span2` of `t2`, treating the n-gram at `t1_span`
+        and `t2_span` as a fixed point.
+
+        :param t1: text content of first witness
+        :type t1: `str`
+        :param t1_span: start and end indices of the n-gram within `t1`
+        :type t1_span: 2-`tuple` of `int`
+        :param span1: start and end indices of the extract of `t1`
+        :type span1: 2-`tuple` of `int`
+        :param t2: text content of second witness
+        :type t2: `str`
+        :param t2_span: start and end indices of the n-gram within `t2`
+        :type t2_span: 2-`tuple` of `int`
+        :param span2: start and end indices of the extract of `t2`
+        :type span2: 2-`tuple` of `int`
+        :rtype: `float`
+
+        """
+        before = self._score(t1[span1[0]:t1_span[0]], t2[span2[0]:t2_span[0]])
+        after = self._score(t1[t1_span[1]:span1[1]], t2[t2_span[1]:span2[1]])
+        ngram_score = (t1_span[1] - t1_span[0]) * \
+            constants.IDENTICAL_CHARACTER_SCORE
+        return before + ngram_score + after
+
+
+def _generate_sequences_for_pair(pair):
+    """Generates and outputs aligned sequences for the pair of witnesses
+    `pair`, using the worker process's report.
+
+    :param pair: label and text content of each of two witnesses
+    :type pair: 4-`tuple` of `str`
+
+    """
+    l1, t1, l2, t2 = pair
+    _worker_report._generate_sequences_for_texts(l1, t1, l2, t2,
+                                                 _worker_ngrams)
+
+
+def _initialise_worker(report, ngrams):
+    """Sets the report and n-grams to be used in this worker process.
+
+    :param report: report to generate sequences with
+    :type report: `SequenceReport`
+    :param ngrams: n-grams to base sequences on
+    :type ngrams: `list` of `str`
+
+    """
+    global _worker_ngrams, _worker_report
+    _worker_ngrams = ngrams
+    _worker_report = report
@@ -0,0 +1,177 @@
+"""Module containing the SourceManifest class."""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+
+from . import constants
+from .exceptions import TACLError
+
+
+class SourceManifest:
+
+    """A SourceManifest records, in an output directory, the
+    fingerprint of the source files of each work processed into that
+    directory, along with the outputs generated for the work.
+
+    It allows a process to be rerun over only those works whose
+    source files have changed, and to remove the outputs of works
+    whose source files have changed or gone.
+
+    Each change to the manifest is appended to a journal file as it
+    is made, so that the record of a run that is interrupted before
+    the manifest is saved is not lost.
+
+    """
+
+    def __init__(self, output_dir):
+        self._logger = logging.getLogger(__name__)
+        self._output_dir = output_dir
+        self._path = os.path.join(output_dir,
+                                  constants.SOURCE_MANIFEST_FILENAME)
+        self._journal_path = os.path.join(
+            output_dir, constants.SOURCE_MANIFEST_JOURNAL_FILENAME)
+        self._works = {}
+        if os.path.exists(self._path):
+            with open(self._path, encoding='utf-8') as fh:
+                self._works = json.load(fh)
+        if os.path.exists(self._journal_path):
+            self._replay_journal()
+
+    def add(self, work, fingerprint, outputs):
+        """Records `outputs` as having been generated for `work` from
+        source files with `fingerprint`.
+
+        Raises a `TACLError` if any of `outputs` is recorded for
+        another work, whose record is removed, since its output has
+        been overwritten.
+
+        :param work: name of work
+        :type work: `str`
+        :param fingerprint: fingerprint of the source files of `work`
+        :type fingerprint: `dict`
+        :param outputs: names of the files and directories generated
+                        in the output directory
+        :type outputs: `list` of `str`
+
+        """
+        for other_work, entry in list(self._works.items()):
+            if other_work == work:
+                continue
+            shared = set(outputs).intersection(entry['outputs'])
+            if shared:
+                del self._works[other_work]
+                self._journal(other_work, None)
+                raise TACLError(
+                    'Output {} of {} was already created for {}.'.format(
+                        ', '.join(sorted(shared)), work, other_work))
+        self._works[work] = {'fingerprint': fingerprint, 'outputs': outputs}
+        self._journal(work, self._works[work])
+
+    @staticmethod
+    def get_fingerprint(base_dir, paths):
+        """Returns the fingerprint of the source files at `paths`.
+
+        The fingerprint gives the checksum of the content of each file
+        under its path relative to `base_dir`.
+
+        :param base_dir: directory containing the source files
+        :type base_dir: `str`
+        :param paths: paths of source files
+        :type paths: `list` of `str`
+        :rtype: `dict`
+
+        """
+        fingerprint = {}
+        for path in paths:
+            with open(path, 'rb') as fh:
+                checksum = hashlib.md5(fh.read()).hexdigest()
+            fingerprint[os.path.relpath(path, base_dir)] = checksum
+        return fingerprint
+
+    def is_current(self, work, fingerprint):
+        """Returns True if the outputs recorded for `work` were
+        generated from source files with `fingerprint`.
+
+        :param work: name of work
+        :type work: `str`
+        :param fingerprint: fingerprint of the source files of `work`
+        :type fingerprint: `dict`
+        :rtype: `bool`
+
+        """
+        return work in self._works and \
+            self._works[work]['fingerprint'] == fingerprint
+
+    def _journal(self, work, entry):
+        """Appends the change of the record of `work` to `entry` to the
+        journal.
+
+        :param work: name of work
+        :type work: `str`
+        :param entry: new record of `work`, or None if it is removed
+        :type entry: `dict`
+
+        """
+        with open(self._journal_path, 'a', encoding='utf-8') as fh:
+            fh.write(json.dumps([work, entry], ensure_ascii=False) + '\n')
+
+    def remove_stale(self, fingerprints):
+        """Removes the outputs, and their record, of each work that is
+        not current according to `fingerprints`.
+
+        A work that is not in `fingerprints` no longer has any source
+        files, and its outputs are removed.
+
+        :param fingerprints: fingerprint of the source files of each
+                             work
+        :type fingerprints: `dict`
+
+        """
+        for work in sorted(self._works):
+            if not self.is_current(work, fingerprints.get(work)):
+                self._logger.info('Removing outdated output for {}'.format(
+                    work))
+                outputs = self._works.pop(work)['outputs']
+                self._journal(work, None)
+                for output in outputs:
+                    path = os.path.join(self._output_dir, output)
+                    if os.path.isdir(path):
+                        shutil.rmtree(path)
+                    elif os.path.exists(path):
+                        os.remove(path)
+
+    def _replay_journal(self):
+        """Applies the changes recorded in the journal to this manifest.
+
+        A final change that was only partly written, by a run that was
+        interrupted, is ignored.
+
+        """
+        with open(self._journal_path, encoding='utf-8') as fh:
+            for line in fh:
+                try:
+                    work, entry = json.loads(line)
+                except ValueError:
+                    break
+                if entry is None:
+                    self._works.pop(work, None)
+                else:
+                    self._works[work] = entry
+
+    def save(self):
+        """Writes this manifest to the output directory.
+
+        The file is written in full before it replaces any existing
+        manifest, and only then is the journal removed.
+
+        """
+        temp_path = self._path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as fh:
+            json.dump(self._works, fh, ensure_ascii=False, indent=2,
+                      sort_keys=True)
+        os.replace(temp_path, self._path)
+        if os.path.exists(self._journal_path):
+            os.remove(self._journal_path)
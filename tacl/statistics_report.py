@@ -1,11 +1,11 @@
 """Module containing the StatisticsReport class."""
 
-import re
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np
 import pandas as pd
 
 from . import constants
-from .text import Text
 
 
 class StatisticsReport:
@@ -27,26 +27,44 @@ class StatisticsReport:
         self._stats.to_csv(fh, encoding='utf-8', index=False)
         return fh
 
-    def generate_statistics(self):
+    def generate_statistics(self, jobs=1):
         """Replaces result rows with summary statistics about the results.
 
         These statistics give the filename, total matching tokens,
         percentage of matching tokens and label for each witness in
-        the results.
+        the results. A witness that appears under more than one label
+        has a row for each, with its matching tokens counted from its
+        results under every label.
+
+        :param jobs: number of processes to use
+        :type jobs: `int`
 
         """
-        matches = self._matches
         witness_fields = [constants.WORK_FIELDNAME, constants.SIGLUM_FIELDNAME,
                           constants.LABEL_FIELDNAME]
-        witnesses = matches[witness_fields].drop_duplicates()
+        labelled_witnesses = self._matches[witness_fields].drop_duplicates()
+        works = []
+        sigla = []
+        matches = []
+        grouped = self._matches.groupby(witness_fields[:2], sort=False)[
+            [constants.NGRAM_FIELDNAME]]
+        for (work, siglum), witness_matches in grouped:
+            works.append(work)
+            sigla.append(siglum)
+            matches.append(witness_matches)
+        corpora = [self._corpus] * len(works)
+        if jobs > 1 and len(works) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                counts = list(executor.map(
+                    _count_witness_tokens, corpora, works, sigla, matches))
+        else:
+            counts = list(map(_count_witness_tokens, corpora, works, sigla,
+                              matches))
+        witness_counts = dict(zip(zip(works, sigla), counts))
         rows = []
-        for index, (work, siglum, label) in witnesses.iterrows():
-            witness = self._corpus.get_witness(work, siglum)
-            witness_matches = matches[
-                (matches[constants.WORK_FIELDNAME] == work) &
-                (matches[constants.SIGLUM_FIELDNAME] == siglum)]
-            total_count, matching_count = self._process_witness(
-                witness, witness_matches)
+        for work, siglum, label in labelled_witnesses.itertuples(
+                index=False, name=None):
+            total_count, matching_count = witness_counts[(work, siglum)]
             percentage = matching_count / total_count * 100
             rows.append({constants.WORK_FIELDNAME: work,
                          constants.SIGLUM_FIELDNAME: siglum,
@@ -57,39 +75,8 @@ class StatisticsReport:
         self._stats = pd.DataFrame(
             rows, columns=constants.STATISTICS_FIELDNAMES)
 
-    def _generate_text_from_slices(self, full_text, slices):
-        """Return a single string consisting of the parts specified in
-        `slices` joined together by the tokenizer's joining string.
-
-        :param full_text: the text to be sliced
-        :type full_text: `str`
-        :param slices: list of slice indices to apply to `full_text`
-        :type slices: `list` of `list`\s
-        :rtype: `str`
-
-        """
-        sliced_text = []
-        for start, end in slices:
-            sliced_text.append(full_text[start:end])
-        return self._tokenizer.joiner.join(sliced_text)
-
     @staticmethod
-    def _merge_slices(match_slices):
-        """Return a list of slice indices lists derived from `match_slices`
-        with no overlaps."""
-        # Sort by earliest range, then by largest range.
-        match_slices.sort(key=lambda x: (x[0], -x[1]))
-        merged_slices = [match_slices.pop(0)]
-        for slice_indices in match_slices:
-            last_end = merged_slices[-1][1]
-            if slice_indices[0] <= last_end:
-                if slice_indices[1] > last_end:
-                    merged_slices[-1][1] = slice_indices[1]
-            else:
-                merged_slices.append(slice_indices)
-        return merged_slices
-
-    def _process_witness(self, witness, matches):
+    def _process_witness(witness, matches):
         """Return the counts of total tokens and matching tokens in `witness`.
 
         :param witness: witness text
@@ -104,30 +91,30 @@ class StatisticsReport:
         # multiple times due to being part of multiple n-grams (which
         # can happen even in reduced results) and not counting tokens
         # due to an n-gram overlapping with itself or another n-gram,
-        # a bit of work is required.
-        #
-        # Using regular expressions, get the slice indices for all
-        # matches (including overlapping ones) for all matching
-        # n-grams. Merge these slices together (without overlap) and
-        # create a Text using that text, which can then be tokenised
-        # and the tokens counted.
-        tokens = witness.get_tokens()
-        full_text = witness.get_token_content()
-        fields = [constants.NGRAM_FIELDNAME, constants.SIZE_FIELDNAME]
-        match_slices = []
-        for index, (ngram, size) in matches[fields].iterrows():
-            pattern = re.compile(re.escape(ngram))
-            # Because the same n-gram may overlap itself ("heh" in the
-            # string "heheh"), re.findall cannot be used.
-            start = 0
-            while True:
-                match = pattern.search(full_text, start)
-                if match is None:
-                    break
-                match_slices.append([match.start(), match.end()])
-                start = match.start() + 1
-        merged_slices = self._merge_slices(match_slices)
-        match_content = self._generate_text_from_slices(
-            full_text, merged_slices)
-        match_text = Text(match_content, self._tokenizer)
-        return len(tokens), len(match_text.get_tokens())
+        # mark each token that is covered by any occurrence of any
+        # matching n-gram, and count the marked tokens.
+        ngrams = list(matches[constants.NGRAM_FIELDNAME].astype(str).unique())
+        coverage = witness.get_ngram_coverage(ngrams)
+        return len(witness.tokens), int(np.count_nonzero(coverage))
+
+
+def _count_witness_tokens(corpus, work, siglum, matches):
+    """Returns the counts of total tokens and of tokens covered by any
+    n-gram in `matches` in the witness `siglum` of `work` in `corpus`.
+
+    This is a module level function so that it may be run in a
+    separate process.
+
+    :param corpus: corpus containing the witness
+    :type corpus: `tacl.Corpus`
+    :param work: name of work
+    :type work: `str`
+    :param siglum: siglum of witness
+    :type siglum: `str`
+    :param matches: n-gram matches
+    :type matches: `pandas.DataFrame`
+    :rtype: `tuple` of `int`
+
+    """
+    return StatisticsReport._process_witness(
+        corpus.get_witness(work, siglum), matches)
@@ -1,12 +1,22 @@
 """Module containing the Stripper class."""
 
+from concurrent.futures import as_completed, ProcessPoolExecutor
+import copy
 import importlib.resources
 import logging
 import os
+import re
+import shutil
 
 from lxml import etree
 
 from . import constants
+from .source_manifest import SourceManifest
+
+
+# The Stripper used by each worker process, set by
+# `_initialise_worker`.
+_worker_stripper = None
 
 
 class Stripper:
@@ -49,6 +59,17 @@ class Stripper:
             witnesses = [(constants.BASE_WITNESS, constants.BASE_WITNESS_ID)]
         return witnesses
 
+    @staticmethod
+    def _get_work(filename):
+        """Returns the name of the work in `filename`.
+
+        :param filename: filename of TEI XML document
+        :type filename: `str`
+        :rtype: `str`
+
+        """
+        return os.path.splitext(os.path.basename(filename))[0]
+
     def _output_file(self, work, witnesses):
         work_dir = os.path.join(self._output_dir, work)
         if not witnesses:
@@ -66,7 +87,79 @@ class Stripper:
             with open(witness_file_path, 'wb') as output_file:
                 output_file.write(witnesses[witness].encode('utf-8'))
 
-    def strip_files(self):
+    @staticmethod
+    def _split_witnesses(text, witnesses):
+        """Returns the text of each of `witnesses`, separated out from
+        `text`, the output of the transform with witness markers.
+
+        :param text: stripped text of all witnesses, with markers
+        :type text: `str`
+        :param witnesses: witnesses and their XML ids
+        :type witnesses: `list` of `tuple`
+        :rtype: `dict`
+
+        """
+        witness_refs = [' #{} '.format(witness_id)
+                        for witness, witness_id in witnesses]
+        witness_texts = [[] for witness in witnesses]
+        # Indices of the witnesses whose text is being output.
+        included = list(range(len(witnesses)))
+        enclosing = []
+        start_marker = None
+        pattern = '([{}{}{}{}])'.format(
+            constants.WITNESS_MARKER_LEM_START,
+            constants.WITNESS_MARKER_RDG_START,
+            constants.WITNESS_MARKER_WITNESSES_END,
+            constants.WITNESS_MARKER_CONTENT_END)
+        for index, part in enumerate(re.split(pattern, text)):
+            if index % 2:
+                if part == constants.WITNESS_MARKER_CONTENT_END:
+                    included = enclosing.pop()
+                elif part != constants.WITNESS_MARKER_WITNESSES_END:
+                    start_marker = part
+            elif start_marker is not None:
+                # `part` holds the witnesses of the tei:rdg(s) that
+                # determine whether the tei:lem or tei:rdg content
+                # that follows is part of each witness.
+                is_rdg = start_marker == constants.WITNESS_MARKER_RDG_START
+                enclosing.append(included)
+                included = [witness_index for witness_index in included
+                            if (witness_refs[witness_index] in part) ==
+                            is_rdg]
+                start_marker = None
+            elif part:
+                for witness_index in included:
+                    witness_texts[witness_index].append(part)
+        return {witness: ''.join(witness_text) for (witness, witness_id),
+                witness_text in zip(witnesses, witness_texts)}
+
+    def strip_files(self, jobs=1, incremental=False, streaming=False):
+        """Writes the plain text witnesses of each TEI XML file in the
+        input directory to the output directory.
+
+        If `jobs` is greater than 1, the files are divided among that
+        many processes, each with its own copy of this stripper and
+        its compiled XSLT.
+
+        If `incremental` is True, only those files that have changed
+        since the last incremental run into the output directory are
+        stripped, and the output of files that have changed or been
+        removed is removed. Any other existing output of the files
+        that are stripped, such as that of an interrupted run, is
+        removed before they are stripped.
+
+        If `streaming` is True, only one part of each file is held in
+        memory at a time.
+
+        :param jobs: number of processes to use
+        :type jobs: `int`
+        :param incremental: whether to strip only changed files
+        :type incremental: `bool`
+        :param streaming: whether to hold one part of a file in memory
+                          at a time
+        :type streaming: `bool`
+
+        """
         if not os.path.exists(self._output_dir):
             try:
                 os.makedirs(self._output_dir)
@@ -74,28 +167,198 @@ class Stripper:
                 self._logger.error(
                     'Could not create output directory: {}'.format(err))
                 raise
+        paths = []
         for dirpath, dirnames, filenames in os.walk(self._input_dir):
             for filename in sorted(filenames):
                 if os.path.splitext(filename)[1] == '.xml':
-                    work, witnesses = self.strip_file(
-                        os.path.join(dirpath, filename))
-                    self._output_file(work, witnesses)
+                    paths.append(os.path.join(dirpath, filename))
+        manifest = None
+        if incremental:
+            manifest = SourceManifest(self._output_dir)
+            fingerprints = {}
+            for path in paths:
+                fingerprints.setdefault(self._get_work(path), {}).update(
+                    manifest.get_fingerprint(self._input_dir, [path]))
+            manifest.remove_stale(fingerprints)
+            paths = [path for path in paths if not manifest.is_current(
+                self._get_work(path), fingerprints[self._get_work(path)])]
+            self._logger.info('{} files have changed'.format(len(paths)))
+            for work in sorted(set(map(self._get_work, paths))):
+                work_dir = os.path.join(self._output_dir, work)
+                if os.path.exists(work_dir):
+                    self._logger.info(
+                        'Removing unrecorded output for {}'.format(work))
+                    shutil.rmtree(work_dir)
+        try:
+            for work in self._strip_works(paths, jobs, streaming):
+                if manifest is not None:
+                    manifest.add(work, fingerprints[work], [work])
+        finally:
+            if manifest is not None:
+                manifest.save()
+
+    def strip_file(self, filename, streaming=False):
+        """Returns the name of the work in the TEI XML document
+        `filename` and the plain text of each of its witnesses.
 
-    def strip_file(self, filename):
+        The text of all of the witnesses is output by a single
+        transform of the document, or, if `streaming` is True, by a
+        single transform of each TEI part of the document in turn.
+
+        :param filename: filename of TEI XML document
+        :type filename: `str`
+        :param streaming: whether to hold one part of the document in
+                          memory at a time
+        :type streaming: `bool`
+        :rtype: `tuple`
+
+        """
         file_path = os.path.join(self._input_dir, filename)
-        work = os.path.splitext(os.path.basename(filename))[0]
+        work = self._get_work(filename)
         stripped_file_path = os.path.join(self._output_dir, work)
         self._logger.info('Stripping file {} into {}'.format(
             file_path, stripped_file_path))
         try:
-            tei_doc = etree.parse(file_path)
+            if streaming:
+                witness_texts = self._strip_parts(file_path)
+            else:
+                tei_doc = etree.parse(file_path)
+                witness_texts = self._split_witnesses(
+                    str(self.transform(tei_doc, mark_witnesses='true()')),
+                    self.get_witnesses(tei_doc))
         except etree.XMLSyntaxError:
             self._logger.warning('XML file "{}" is invalid'.format(filename))
             return
         witnesses = {}
-        for witness, witness_id in self.get_witnesses(tei_doc):
-            witness_param = "'{}'".format(witness_id)
-            text = str(self.transform(tei_doc, witness_id=witness_param))
+        for witness, text in witness_texts.items():
             if text.strip():
                 witnesses[witness] = text
         return work, witnesses
+
+    def _strip_parts(self, file_path):
+        """Returns the text of each witness to the TEI XML document at
+        `file_path`, transforming each TEI part of a teiCorpus
+        document separately as it is parsed, so that only one is held
+        in memory at a time.
+
+        Any other document is transformed whole.
+
+        :param file_path: path of TEI XML document
+        :type file_path: `str`
+        :rtype: `dict`
+
+        """
+        corpus_tag = '{{{}}}teiCorpus'.format(constants.NAMESPACES['tei'])
+        header_tag = '{{{}}}teiHeader'.format(constants.NAMESPACES['tei'])
+        texts = []
+        context = etree.iterparse(
+            file_path, events=('end',),
+            tag='{{{}}}TEI'.format(constants.NAMESPACES['tei']))
+        for event, element in context:
+            parent = element.getparent()
+            if parent is not None and parent.tag == corpus_tag and \
+               parent.getparent() is None:
+                # Transform a copy of the part, since the document it
+                # is in is still being built.
+                texts.append(str(self.transform(
+                    copy.deepcopy(element), mark_witnesses='true()')))
+                # Free both the part and the earlier parts that would
+                # otherwise stay attached to the root, keeping the
+                # teiHeader that the witnesses are read from.
+                element.clear()
+                while element.getprevious() is not None and \
+                        element.getprevious().tag != header_tag:
+                    parent.remove(element.getprevious())
+        tree = context.root.getroottree()
+        if context.root.tag != corpus_tag:
+            texts = [str(self.transform(tree, mark_witnesses='true()'))]
+        return self._split_witnesses(''.join(texts),
+                                     self.get_witnesses(tree))
+
+    def _strip_work(self, path, streaming=False):
+        """Writes the plain text witnesses of the TEI XML document at
+        `path` to the output directory, and returns the name of its
+        work.
+
+        :param path: path of TEI XML document
+        :type path: `str`
+        :param streaming: whether to hold one part of the document in
+                          memory at a time
+        :type streaming: `bool`
+        :rtype: `str`
+
+        """
+        work, witnesses = self.strip_file(path, streaming)
+        self._output_file(work, witnesses)
+        return work
+
+    def _strip_works(self, paths, jobs, streaming):
+        """Strips each of the TEI XML documents at `paths`, yielding
+        the name of its work as soon as it is done.
+
+        When the documents are divided among processes, a document
+        that fails does not stop the others; the first failure is
+        raised once they are all done.
+
+        :param paths: paths of TEI XML documents
+        :type paths: `list` of `str`
+        :param jobs: number of processes to use
+        :type jobs: `int`
+        :param streaming: whether to hold one part of a document in
+                          memory at a time
+        :type streaming: `bool`
+        :rtype: `generator`
+
+        """
+        if jobs > 1 and len(paths) > 1:
+            with ProcessPoolExecutor(
+                    max_workers=jobs, initializer=_initialise_worker,
+                    initargs=(type(self), self._input_dir,
+                              self._output_dir)) as executor:
+                futures = {executor.submit(_strip_work, path, streaming):
+                           path for path in paths}
+                errors = []
+                for future in as_completed(futures):
+                    try:
+                        work = future.result()
+                    except Exception as err:
+                        self._logger.error('Failed to strip {}: {}'.format(
+                            futures[future], err))
+                        errors.append(err)
+                        continue
+                    yield work
+                if errors:
+                    raise errors[0]
+        else:
+            for path in paths:
+                yield self._strip_work(path, streaming)
+
+
+def _initialise_worker(stripper_class, input_dir, output_dir):
+    """Creates the Stripper to be used in this worker process.
+
+    :param stripper_class: class of the stripper
+    :type stripper_class: `type`
+    :param input_dir: directory containing TEI XML documents
+    :type input_dir: `str`
+    :param output_dir: directory to write stripped texts to
+    :type output_dir: `str`
+
+    """
+    global _worker_stripper
+    _worker_stripper = stripper_class(input_dir, output_dir)
+
+
+def _strip_work(path, streaming):
+    """Strips the TEI XML document at `path` using the worker
+    process's stripper, and returns the name of its work.
+
+    :param path: path of TEI XML document
+    :type path: `str`
+    :param streaming: whether to hold one part of the document in
+                      memory at a time
+    :type streaming: `bool`
+    :rtype: `str`
+
+    """
+    return _worker_stripper._strip_work(path, streaming)
@@ -1,14 +1,19 @@
 """Module containing the TEICorpus class."""
 
+from concurrent.futures import as_completed, ProcessPoolExecutor
+import copy
+import functools
 import importlib.resources
 import logging
 import os
 import re
+import tempfile
 
 from lxml import etree
 
 from . import constants
 from .exceptions import TACLError
+from .source_manifest import SourceManifest
 
 
 LEAVE_UNNAMED_DIVS = 'leave'
@@ -35,6 +40,10 @@ resp_splitter = re.compile(r'\{|\}')
 witnesses_splitter = re.compile(r'【|】')
 ns = etree.FunctionNamespace(constants.NAMESPACES['tacl'])
 
+# The TEICorpus used by each worker process, set by
+# `_initialise_worker`.
+_worker_corpus = None
+
 
 @ns
 def char_from_codepoint(context, codepoint):
@@ -69,8 +78,83 @@ class TEICorpus:
         self._logger = logging.getLogger(__name__)
         self._input_dir = os.path.abspath(input_dir)
         self._output_dir = os.path.abspath(output_dir)
+        # Names of the files output for the work being tidied.
+        self._output_filenames = []
+        # Whether the work being tidied may overwrite existing files.
+        self._overwrite = False
         self.transform = self._get_xslt('assets/xslt/{}'.format(self.xslt))
 
+    def _add_resp_list(self, root, resps):
+        raise NotImplementedError
+
+    def _add_witness_list(self, root, witnesses):
+        """Adds a list of `witnesses` to the TEI header of `root`.
+
+        :param root: root of teiCorpus document
+        :type root: `etree._Element`
+        :param witnesses: sorted witnesses
+        :type witnesses: `list` of `str`
+
+        """
+        source_desc = root.xpath(
+            '/tei:teiCorpus/tei:teiHeader/tei:fileDesc/tei:sourceDesc',
+            namespaces=constants.NAMESPACES)[0]
+        wit_list = etree.SubElement(source_desc, TEI + 'listWit')
+        for index, siglum in enumerate(witnesses):
+            wit = etree.SubElement(wit_list, TEI + 'witness')
+            wit.set(constants.XML + 'id', 'wit{}'.format(index + 1))
+            wit.text = siglum
+
+    def _assemble_part_files(self, work, paths, temp_dir):
+        """Returns the root of the teiCorpus document for `work`,
+        holding only its TEI header, and the paths of its tidied
+        parts, assembled from the parts at `paths`.
+
+        Each part is tidied and saved in `temp_dir` with its
+        references updated to the lists in the returned header, so
+        that only one part is held in memory at a time.
+
+        :param work: filename of the work
+        :type work: `str`
+        :param paths: paths of the parts of the work, by part label
+        :type paths: `dict`
+        :param temp_dir: directory to save tidied parts in
+        :type temp_dir: `str`
+        :rtype: `tuple`
+
+        """
+        parser = etree.XMLParser(remove_blank_text=True)
+        corpus_root = etree.XML(TEI_CORPUS_XML, parser)
+        resps = set()
+        witnesses = set()
+        part_paths = []
+        for part in sorted(paths.keys()):
+            xml_part = self._tidy(work, paths[part])
+            if not part_paths:
+                corpus_root.append(copy.deepcopy(xml_part))
+                self._populate_header(corpus_root)
+                del corpus_root[-1]
+            resps.update(self.get_resps(xml_part)[0])
+            witnesses.update(self.get_witnesses(xml_part)[0])
+            part_paths.append(self._save_part_file(
+                etree.ElementTree(xml_part), temp_dir))
+        resps = sorted(resps)
+        witnesses = sorted(witnesses)
+        if resps:
+            self._add_resp_list(corpus_root, resps)
+        if witnesses:
+            self._add_witness_list(corpus_root, witnesses)
+        for index, part_path in enumerate(part_paths):
+            part = etree.parse(part_path).getroot()
+            if resps:
+                self._update_resp_refs(part, self.get_resps(part)[1], resps)
+            if witnesses:
+                self._update_witness_refs(
+                    part, self.get_witnesses(part)[1], witnesses)
+            part_paths[index] = self._save_part_file(
+                etree.ElementTree(part), temp_dir)
+        return corpus_root, part_paths
+
     def _assemble_parts(self, work, paths):
         parts = list(paths.keys())
         parts.sort()
@@ -119,6 +203,22 @@ class TEICorpus:
         with importlib.resources.as_file(ref) as xslt_path:
             return etree.XSLT(etree.parse(xslt_path))
 
+    @staticmethod
+    def _get_part_file_id(part_path):
+        """Returns the xml:id of the part saved at `part_path`, reading
+        only its start tag.
+
+        :param part_path: path of part of a work
+        :type part_path: `str`
+        :rtype: `str`
+
+        """
+        for event, element in etree.iterparse(part_path, events=('start',)):
+            return element.get(constants.XML + 'id')
+
+    def get_resps(self, source_tree):
+        raise NotImplementedError
+
     def get_witnesses(self, source_tree):
         """Returns a sorted list of all witnesses of readings in
         `source_tree`, and the elements that bear @wit attributes.
@@ -145,25 +245,13 @@ class TEICorpus:
         witnesses, bearers = self.get_witnesses(root)
         if not witnesses:
             return root
-        for wit_list in root.xpath("//tei:listWit",
-                                   namespaces=constants.NAMESPACES):
-            wit_list.getparent().remove(wit_list)
-        source_desc = root.xpath(
-            '/tei:teiCorpus/tei:teiHeader/tei:fileDesc/tei:sourceDesc',
-            namespaces=constants.NAMESPACES)[0]
-        wit_list = etree.SubElement(source_desc, TEI + 'listWit')
-        for index, siglum in enumerate(witnesses):
-            wit = etree.SubElement(wit_list, TEI + 'witness')
-            xml_id = 'wit{}'.format(index + 1)
-            wit.set(constants.XML + 'id', xml_id)
-            wit.text = siglum
-            full_siglum = '【{}】'.format(siglum)
-            self._update_refs(root, bearers, 'wit', full_siglum, xml_id)
+        self._update_witness_refs(root, bearers, witnesses)
+        self._add_witness_list(root, witnesses)
         return root
 
-    def _output_tree(self, filename, tree, seen_filenames=None):
-        """Saves the TEI XML document `tree` as `filename` in the output
-        directory."""
+    def _output(self, filename, write, seen_filenames=None):
+        """Creates the file `filename` in the output directory, and
+        calls `write` with it open to write its content."""
         if seen_filenames is None:
             seen_filenames = {}
         # Remove characters that Windows cannot handle in filenames,
@@ -177,21 +265,77 @@ class TEICorpus:
         if output_path in seen_filenames:
             root, ext = os.path.splitext(output_path)
             if seen_filenames[output_path] == 1:
-                os.rename(output_path, '{}-{}{}'.format(
-                    root, str(seen_filenames[output_path]), ext))
+                renamed_path = '{}-{}{}'.format(
+                    root, str(seen_filenames[output_path]), ext)
+                os.rename(output_path, renamed_path)
+                self._output_filenames[self._output_filenames.index(
+                    os.path.basename(output_path))] = os.path.basename(
+                        renamed_path)
             seen_filenames[output_path] += 1
             output_path = '{}-{}{}'.format(
                 root, str(seen_filenames[output_path]), ext)
         else:
             seen_filenames[output_path] = 1
-        if os.path.exists(output_path):
-            raise TACLError('Already created output file at {}.'.format(
-                output_path))
         self._logger.debug('Serialising XML tree to output file at {}.'.format(
             output_path))
-        tree.write(output_path, encoding='utf-8', pretty_print=True)
+        # Create the file exclusively, so that a collision is detected
+        # even when another process is writing to the output
+        # directory. When overwriting the output of an earlier
+        # incremental run, collisions are instead detected by the
+        # manifest.
+        try:
+            with open(output_path, 'wb' if self._overwrite else 'xb') as fh:
+                write(fh)
+        except FileExistsError:
+            raise TACLError('Already created output file at {}.'.format(
+                output_path))
+        self._output_filenames.append(os.path.basename(output_path))
         return seen_filenames
 
+    def _output_part_files(self, filename, header_root, part_paths,
+                           seen_filenames=None):
+        """Saves the TEI XML document made up of `header_root` and the
+        parts saved at `part_paths` as `filename` in the output
+        directory, reading in one part at a time.
+
+        The document is serialised identically to the same document
+        held entirely in memory and saved by `_output_tree`.
+
+        :param filename: filename of the document
+        :type filename: `str`
+        :param header_root: root of the document, with its TEI header
+        :type header_root: `etree._Element`
+        :param part_paths: paths of the parts of the document
+        :type part_paths: `list` of `str`
+        :param seen_filenames: counts of the paths output so far
+        :type seen_filenames: `dict`
+        :rtype: `dict`
+
+        """
+        def write(fh):
+            document = etree.tostring(header_root, encoding='utf-8',
+                                      pretty_print=True)
+            end = document.rindex(b'</')
+            fh.write(document[:end])
+            for part_path in part_paths:
+                # Serialise each part within an empty root element,
+                # so that it is indented and has its namespace
+                # declarations as it would within the document.
+                wrapper = etree.Element(header_root.tag,
+                                        nsmap=header_root.nsmap)
+                wrapper.append(etree.parse(part_path).getroot())
+                part = etree.tostring(wrapper, encoding='utf-8',
+                                      pretty_print=True)
+                fh.write(part[part.index(b'>\n') + 2:part.rindex(b'</')])
+            fh.write(document[end:])
+        return self._output(filename, write, seen_filenames)
+
+    def _output_tree(self, filename, tree, seen_filenames=None):
+        """Saves the TEI XML document `tree` as `filename` in the output
+        directory."""
+        return self._output(filename, functools.partial(
+            tree.write, encoding='utf-8', pretty_print=True), seen_filenames)
+
     def _populate_header(self, root):
         """Populate the teiHeader of the teiCorpus with useful information
         from the teiHeader of the first TEI part."""
@@ -222,7 +366,94 @@ class TEICorpus:
         if hasattr(self, pp_func):
             getattr(self, pp_func)(work, tree)
 
-    def tidy(self):
+    def _postprocess_part_files(self, work, header_root, part_paths,
+                                temp_dir):
+        """Post-process the XML document made up of `header_root` and
+        the parts saved at `part_paths`, reading in one part at a
+        time.
+
+        :param work: name of the work
+        :type work: `str`
+        :param header_root: root of the document, with its TEI header
+        :type header_root: `etree._Element`
+        :param part_paths: paths of the parts of the document
+        :type part_paths: `list` of `str`
+        :param temp_dir: directory to save intermediate parts in
+        :type temp_dir: `str`
+
+        """
+        self._output_part_files('{}.xml'.format(work), header_root,
+                                part_paths)
+        pp_func = '_postprocess_part_files_{}'.format(work)
+        if hasattr(self, pp_func):
+            getattr(self, pp_func)(work, header_root, part_paths, temp_dir)
+
+    @staticmethod
+    def _save_part_file(tree, temp_dir):
+        """Saves `tree` to a new file in `temp_dir` and returns its path.
+
+        :param tree: XML tree of part of a work
+        :type tree: `etree._ElementTree`
+        :param temp_dir: directory to save `tree` in
+        :type temp_dir: `str`
+        :rtype: `str`
+
+        """
+        fd, path = tempfile.mkstemp(suffix='.xml', dir=temp_dir)
+        with os.fdopen(fd, 'wb') as fh:
+            tree.write(fh, encoding='utf-8')
+        return path
+
+    def _stream_work(self, work, work_filename, paths):
+        """Writes the tidied TEI XML documents for `work`, assembled
+        from the parts at `paths`, holding only one part in memory at
+        a time.
+
+        :param work: name of the work
+        :type work: `str`
+        :param work_filename: filename of the work
+        :type work_filename: `str`
+        :param paths: paths of the parts of the work, by part label
+        :type paths: `dict`
+
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            header_root, part_paths = self._assemble_part_files(
+                work_filename, paths, temp_dir)
+            self._output_part_files('{}-original.xml'.format(work),
+                                    header_root, part_paths)
+            self._postprocess_part_files(work, header_root, part_paths,
+                                         temp_dir)
+
+    def tidy(self, jobs=1, incremental=False, streaming=False):
+        """Writes a tidied TEI XML document for each work in the input
+        directory to the output directory.
+
+        If `jobs` is greater than 1, the works are divided among that
+        many processes, each with its own copy of this corpus and its
+        compiled XSLT.
+
+        If `incremental` is True, only those works whose source files
+        have changed since the last incremental run into the output
+        directory are tidied, and the output of works whose source
+        files have changed or been removed is removed. Any other
+        existing output of the works that are tidied, such as that of
+        an interrupted run, is overwritten.
+
+        If `streaming` is True, each work is assembled and written
+        holding only one of its parts in memory at a time, other than
+        those works whose post-processing requires the whole work,
+        which are held in memory as usual.
+
+        :param jobs: number of processes to use
+        :type jobs: `int`
+        :param incremental: whether to tidy only changed works
+        :type incremental: `bool`
+        :param streaming: whether to hold one part of a work in
+                          memory at a time
+        :type streaming: `bool`
+
+        """
         if not os.path.exists(self._output_dir):
             try:
                 os.makedirs(self._output_dir)
@@ -230,21 +461,117 @@ class TEICorpus:
                 self._logger.error(
                     'Could not create output directory: {}'.format(err))
                 raise
-        works = self._assemble_part_list()
-        for work_filename, paths in sorted(works.items()):
-            self._logger.debug('Tidying {}'.format(work_filename))
-            work = os.path.splitext(work_filename)[0]
-            root = self._assemble_parts(work_filename, paths)
-            root = self._populate_header(root)
-            root = self._handle_resps(root)
-            root = self._handle_witnesses(root)
-            tree = etree.ElementTree(root)
-            self._output_tree('{}-original.xml'.format(work), tree)
-            self._postprocess(work, tree)
+        works = sorted(self._assemble_part_list().items())
+        manifest = None
+        if incremental:
+            manifest = SourceManifest(self._output_dir)
+            fingerprints = {
+                work_filename: manifest.get_fingerprint(
+                    self._input_dir, sorted(paths.values()))
+                for work_filename, paths in works}
+            manifest.remove_stale(fingerprints)
+            works = [(work_filename, paths) for work_filename, paths in works
+                     if not manifest.is_current(
+                         work_filename, fingerprints[work_filename])]
+            self._logger.info('{} works have changed'.format(len(works)))
+        try:
+            for work_filename, output_filenames in self._tidy_works(
+                    works, jobs, streaming, incremental):
+                if manifest is not None:
+                    manifest.add(work_filename, fingerprints[work_filename],
+                                 output_filenames)
+        finally:
+            if manifest is not None:
+                manifest.save()
 
     def _tidy(self, *args, **kwargs):
         raise NotImplementedError
 
+    def _tidy_work(self, work_filename, paths, streaming=False,
+                   overwrite=False):
+        """Writes the tidied TEI XML document(s) for the work
+        `work_filename`, assembled from the parts at `paths`, and
+        returns the names of the files written.
+
+        :param work_filename: filename of the work
+        :type work_filename: `str`
+        :param paths: paths of the parts of the work, by part label
+        :type paths: `dict`
+        :param streaming: whether to hold one part of the work in
+                          memory at a time
+        :type streaming: `bool`
+        :param overwrite: whether to overwrite existing files
+        :type overwrite: `bool`
+        :rtype: `list` of `str`
+
+        """
+        self._logger.debug('Tidying {}'.format(work_filename))
+        self._output_filenames = []
+        self._overwrite = overwrite
+        work = os.path.splitext(work_filename)[0]
+        if streaming:
+            if hasattr(self, '_postprocess_{}'.format(work)) and \
+               not hasattr(self, '_postprocess_part_files_{}'.format(work)):
+                self._logger.info(
+                    'Tidying {} in memory, since it is post-processed as '
+                    'a whole'.format(work))
+            else:
+                self._stream_work(work, work_filename, paths)
+                return self._output_filenames
+        root = self._assemble_parts(work_filename, paths)
+        root = self._populate_header(root)
+        root = self._handle_resps(root)
+        root = self._handle_witnesses(root)
+        tree = etree.ElementTree(root)
+        self._output_tree('{}-original.xml'.format(work), tree)
+        self._postprocess(work, tree)
+        return self._output_filenames
+
+    def _tidy_works(self, works, jobs, streaming, overwrite):
+        """Tidies each of `works`, yielding its filename along with the
+        names of the files written for it as soon as it is done.
+
+        When the works are divided among processes, a work that fails
+        does not stop the others; the first failure is raised once
+        they are all done.
+
+        :param works: filename of each work and the paths of its parts
+        :type works: `list` of `tuple`
+        :param jobs: number of processes to use
+        :type jobs: `int`
+        :param streaming: whether to hold one part of a work in
+                          memory at a time
+        :type streaming: `bool`
+        :param overwrite: whether to overwrite existing files
+        :type overwrite: `bool`
+        :rtype: `generator`
+
+        """
+        if jobs > 1 and len(works) > 1:
+            with ProcessPoolExecutor(
+                    max_workers=jobs, initializer=_initialise_worker,
+                    initargs=(type(self), self._input_dir,
+                              self._output_dir)) as executor:
+                futures = {
+                    executor.submit(_tidy_work, work, streaming, overwrite):
+                    work[0] for work in works}
+                errors = []
+                for future in as_completed(futures):
+                    try:
+                        output_filenames = future.result()
+                    except Exception as err:
+                        self._logger.error('Failed to tidy {}: {}'.format(
+                            futures[future], err))
+                        errors.append(err)
+                        continue
+                    yield futures[future], output_filenames
+                if errors:
+                    raise errors[0]
+        else:
+            for work_filename, paths in works:
+                yield work_filename, self._tidy_work(
+                    work_filename, paths, streaming, overwrite)
+
     def _update_refs(self, root, bearers, attribute, ref_text, xml_id):
         """Change `ref_text` on `bearers` to xml:id references.
 
@@ -265,6 +592,28 @@ class TEICorpus:
             refs = ' '.join(sorted(attribute_text.strip().split()))
             bearer.set(attribute, refs)
 
+    def _update_resp_refs(self, root, bearers, resps):
+        raise NotImplementedError
+
+    def _update_witness_refs(self, root, bearers, witnesses):
+        """Removes any witness lists in `root` and changes the @wit
+        values of `bearers` to references to `witnesses`.
+
+        :param root: root of TEI document
+        :type root: `etree._Element`
+        :param bearers: elements bearing @wit
+        :type bearers: `list` of `etree._Element`
+        :param witnesses: sorted witnesses
+        :type witnesses: `list` of `str`
+
+        """
+        for wit_list in root.xpath("//tei:listWit",
+                                   namespaces=constants.NAMESPACES):
+            wit_list.getparent().remove(wit_list)
+        for index, siglum in enumerate(witnesses):
+            self._update_refs(root, bearers, 'wit', '【{}】'.format(siglum),
+                              'wit{}'.format(index + 1))
+
 
 class TEICorpusCBETAGitHub (TEICorpus):
 
@@ -281,6 +630,30 @@ class TEICorpusCBETAGitHub (TEICorpus):
         self._transform_div = self._get_xslt(
             'assets/xslt/CBETA_extract_div.xsl')
         self._remove_divs = self._get_xslt('assets/xslt/CBETA_remove_divs.xsl')
+        self._move_non_hui_divs = self._get_xslt(
+            'assets/xslt/CBETA_T0220_reparent_divs.xsl')
+
+    def _add_resp_list(self, root, resps):
+        """Adds a list of `resps` to the TEI header of `root`.
+
+        :param root: root of teiCorpus document
+        :type root: `etree._Element`
+        :param resps: sorted resps
+        :type resps: `list` of `tuple`
+
+        """
+        file_desc = root.xpath(
+            '/tei:teiCorpus/tei:teiHeader/tei:fileDesc',
+            namespaces=constants.NAMESPACES)[0]
+        edition_stmt = etree.Element(TEI + 'editionStmt')
+        file_desc.insert(1, edition_stmt)
+        for index, (resp_resp, resp_name) in enumerate(resps):
+            resp_stmt = etree.SubElement(edition_stmt, TEI + 'respStmt')
+            resp_stmt.set(constants.XML + 'id', 'resp{}'.format(index + 1))
+            resp = etree.SubElement(resp_stmt, TEI + 'resp')
+            resp.text = resp_resp
+            name = etree.SubElement(resp_stmt, TEI + 'name')
+            name.text = resp_name
 
     def _extract_divs(self, work, tree, div_types, exclude=None):
         """Writes out to files the individual parts of a work corresponding to
@@ -310,6 +683,37 @@ class TEICorpusCBETAGitHub (TEICorpus):
             tree = self._remove_divs(tree, div_type='"{}"'.format(div_type))
         return tree
 
+    def _extract_part_file_divs(self, work, header_root, part_paths,
+                                div_types, temp_dir):
+        """Writes out to files the individual parts of a work corresponding to
+        various types of cb:div, as `_extract_divs`, reading in one
+        part of the work at a time, and returns the paths of the parts
+        with those divs removed.
+
+        :param work: name of the work
+        :type work: `str`
+        :param header_root: root of the work, with its TEI header
+        :type header_root: `etree._Element`
+        :param part_paths: paths of the parts of the work
+        :type part_paths: `list` of `str`
+        :param div_types: types of cb:div and their filename labels
+        :type div_types: `list` of `tuple`
+        :param temp_dir: directory to save intermediate parts in
+        :type temp_dir: `str`
+        :rtype: `list` of `str`
+
+        """
+        for div_type, label in div_types:
+            divs, part_paths = self._split_part_files(
+                part_paths, div_type, temp_dir, remove=True)
+            for position, (div_part_paths, title) in enumerate(divs):
+                title = '' if title is None else '-' + title
+                filename = '{}-{}-{}{}.xml'.format(work, label, position + 1,
+                                                   title)
+                self._output_part_files(filename, header_root,
+                                        div_part_paths)
+        return part_paths
+
     def _extract_work(self, filename):
         """Returns the name of the work in `filename`.
 
@@ -365,21 +769,8 @@ class TEICorpusCBETAGitHub (TEICorpus):
         resps, bearers = self.get_resps(root)
         if not resps:
             return root
-        file_desc = root.xpath(
-            '/tei:teiCorpus/tei:teiHeader/tei:fileDesc',
-            namespaces=constants.NAMESPACES)[0]
-        edition_stmt = etree.Element(TEI + 'editionStmt')
-        file_desc.insert(1, edition_stmt)
-        for index, (resp_resp, resp_name) in enumerate(resps):
-            resp_stmt = etree.SubElement(edition_stmt, TEI + 'respStmt')
-            xml_id = 'resp{}'.format(index + 1)
-            resp_stmt.set(constants.XML + 'id', xml_id)
-            resp = etree.SubElement(resp_stmt, TEI + 'resp')
-            resp.text = resp_resp
-            name = etree.SubElement(resp_stmt, TEI + 'name')
-            name.text = resp_name
-            resp_data = '{{{}|{}}}'.format(resp_resp, resp_name)
-            self._update_refs(root, bearers, 'resp', resp_data, xml_id)
+        self._add_resp_list(root, resps)
+        self._update_resp_refs(root, bearers, resps)
         return root
 
     def _postprocess(self, work, tree):
@@ -412,6 +803,54 @@ class TEICorpusCBETAGitHub (TEICorpus):
             seen_filenames = self._output_tree(div_filename, div_tree,
                                                seen_filenames)
 
+    def _postprocess_part_files(self, work, header_root, part_paths,
+                                temp_dir):
+        """Post-process the XML document made up of `header_root` and
+        the parts saved at `part_paths`, reading in one part at a
+        time."""
+        div_types = [('xu', 'xu'), ('w', 'endmatter')]
+        part_paths = self._extract_part_file_divs(
+            work, header_root, part_paths, div_types, temp_dir)
+        super()._postprocess_part_files(work, header_root, part_paths,
+                                        temp_dir)
+
+    def _postprocess_part_files_T0220(self, work, header_root, part_paths,
+                                      temp_dir):
+        """Post-process the XML document T0220.xml, as
+        `_postprocess_T0220`, reading in one part at a time.
+
+        The part T0220a is read in along with T0220b, the divs of
+        which are moved into it.
+
+        """
+        ids = {self._get_part_file_id(part_path): part_path
+               for part_path in part_paths}
+        moved_paths = []
+        for part_path in part_paths:
+            part_id = self._get_part_file_id(part_path)
+            if part_id == 'T06n0220b':
+                continue
+            if part_id == 'T05n0220a' and 'T06n0220b' in ids:
+                wrapper = etree.Element(header_root.tag,
+                                        nsmap=header_root.nsmap)
+                wrapper.append(etree.parse(part_path).getroot())
+                wrapper.append(etree.parse(ids['T06n0220b']).getroot())
+                part_path = self._save_part_file(etree.ElementTree(
+                    self._move_non_hui_divs(wrapper).getroot()[0]), temp_dir)
+            moved_paths.append(part_path)
+        divs, _ = self._split_part_files(moved_paths, 'hui', temp_dir)
+        for position, (div_part_paths, title) in enumerate(divs):
+            div_filename = '{}-{}.xml'.format(work, position + 1)
+            self._output_part_files(div_filename, header_root, div_part_paths)
+        divs, _ = self._split_part_files(moved_paths, 'dharani', temp_dir)
+        seen_filenames = {}
+        for position, (div_part_paths, title) in enumerate(divs):
+            if title is None:
+                title = 'unnamed-{}'.format(position + 1)
+            div_filename = '{}-{}.xml'.format(work, title)
+            seen_filenames = self._output_part_files(
+                div_filename, header_root, div_part_paths, seen_filenames)
+
     def _postprocess_T0001(self, work, tree):
         """Post-process the XML document T0001.xml.
 
@@ -628,9 +1067,7 @@ class TEICorpusCBETAGitHub (TEICorpus):
         Also divide into one file for each cb:div[@type='dharani'].
 
         """
-        move_non_hui_divs = self._get_xslt(
-            'assets/xslt/CBETA_T0220_reparent_divs.xsl')
-        tree = move_non_hui_divs(tree)
+        tree = self._move_non_hui_divs(tree)
         divs = tree.xpath('//cb:div[@type="hui"]',
                           namespaces=constants.NAMESPACES)
         for position, div in enumerate(divs):
@@ -774,6 +1211,57 @@ class TEICorpusCBETAGitHub (TEICorpus):
                 div.getparent().remove(div)
         return tree
 
+    def _split_part_files(self, part_paths, div_type, temp_dir,
+                          remove=False):
+        """Returns, for each cb:div of type `div_type` in the document
+        made up of the parts saved at `part_paths`, the paths of the
+        parts making up the document extracted for that div, and the
+        div's cb:mulu (or None), along with the paths of the parts
+        with those divs removed (or None, if `remove` is False).
+
+        As in the extraction of a div from the whole document, every
+        part other than the one containing the div has its body
+        emptied.
+
+        :param part_paths: paths of the parts of the document
+        :type part_paths: `list` of `str`
+        :param div_type: type of cb:div to extract
+        :type div_type: `str`
+        :param temp_dir: directory to save the extracted parts in
+        :type temp_dir: `str`
+        :param remove: whether to remove the divs from the parts
+        :type remove: `bool`
+        :rtype: `tuple`
+
+        """
+        div_type_param = '"{}"'.format(div_type)
+        empty_paths = []
+        divs = []
+        remaining_paths = [] if remove else None
+        for index, part_path in enumerate(part_paths):
+            tree = etree.parse(part_path)
+            count = len(tree.xpath('//cb:div[@type="{}"]'.format(div_type),
+                                   namespaces=constants.NAMESPACES))
+            empty_paths.append(self._save_part_file(self._transform_div(
+                tree, position='-1', div_type=div_type_param), temp_dir))
+            for position in range(count):
+                subtree = self._transform_div(
+                    tree, position=str(position), div_type=div_type_param)
+                try:
+                    title = self._get_mulu(
+                        subtree.getroot(),
+                        '//tei:body/cb:div/cb:mulu[1]/text()')
+                except IndexError:
+                    title = None
+                divs.append((index, self._save_part_file(subtree, temp_dir),
+                             title))
+            if remove:
+                remaining_paths.append(self._save_part_file(
+                    self._remove_divs(tree, div_type=div_type_param),
+                    temp_dir))
+        return [(empty_paths[:index] + [div_path] + empty_paths[index + 1:],
+                 title) for index, div_path, title in divs], remaining_paths
+
     def _tidy(self, work, file_path):
         """Transforms the file at `file_path` into simpler XML and returns
         that."""
@@ -798,3 +1286,52 @@ class TEICorpusCBETAGitHub (TEICorpus):
                                  ref=ref):
                 anchor.attrib.clear()
         return self.transform(tei_doc).getroot()
+
+    def _update_resp_refs(self, root, bearers, resps):
+        """Changes the @resp values of `bearers` to references to
+        `resps`.
+
+        :param root: root of TEI document
+        :type root: `etree._Element`
+        :param bearers: elements bearing @resp
+        :type bearers: `list` of `etree._Element`
+        :param resps: sorted resps
+        :type resps: `list` of `tuple`
+
+        """
+        for index, (resp_resp, resp_name) in enumerate(resps):
+            resp_data = '{{{}|{}}}'.format(resp_resp, resp_name)
+            self._update_refs(root, bearers, 'resp', resp_data,
+                              'resp{}'.format(index + 1))
+
+
+def _initialise_worker(corpus_class, input_dir, output_dir):
+    """Creates the TEICorpus to be used in this worker process.
+
+    :param corpus_class: class of the corpus
+    :type corpus_class: `type`
+    :param input_dir: directory of source TEI documents
+    :type input_dir: `str`
+    :param output_dir: directory to write tidied documents to
+    :type output_dir: `str`
+
+    """
+    global _worker_corpus
+    _worker_corpus = corpus_class(input_dir, output_dir)
+
+
+def _tidy_work(work, streaming, overwrite):
+    """Tidies `work` using the worker process's corpus, and returns the
+    names of the files written.
+
+    :param work: filename of the work and the paths of its parts
+    :type work: `tuple`
+    :param streaming: whether to hold one part of the work in memory
+                      at a time
+    :type streaming: `bool`
+    :param overwrite: whether to overwrite existing files
+    :type overwrite: `bool`
+    :rtype: `list` of `str`
+
+    """
+    return _worker_corpus._tidy_work(*work, streaming, overwrite)
@@ -5,6 +5,16 @@ import hashlib
 import os.path
 import re
 
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# Moduli and bases for the pair of polynomial hashes used to find
+# n-grams among the token windows of a text. Each modulus is small
+# enough that hashing in 64-bit integers cannot overflow.
+HASH_MODULI = (2147483647, 2147483629)
+HASH_BASES = (1000003, 999983)
+
 
 class Text:
 
@@ -19,6 +29,7 @@ class Text:
         self._content = content
         self._tokenizer = tokenizer
         self._tokens = None
+        self._token_ids = None
 
     def excise(self, ngrams, replacement):
         """Returns the token content of this text with every occurrence of
@@ -49,6 +60,94 @@ class Text:
         """
         return self._content
 
+    @staticmethod
+    def get_coverage(length, starts, ends):
+        """Returns a boolean array of `length` tokens marking those tokens
+        that fall within any of the spans given by `starts` and `ends`.
+
+        :param length: number of tokens
+        :type length: `int`
+        :param starts: position of the first token of each span
+        :type starts: `numpy.ndarray`
+        :param ends: position after the last token of each span
+        :type ends: `numpy.ndarray`
+        :rtype: `numpy.ndarray`
+
+        """
+        changes = np.zeros(length + 1, dtype=np.int64)
+        np.add.at(changes, starts, 1)
+        np.add.at(changes, ends, -1)
+        return np.cumsum(changes[:-1]) > 0
+
+    def get_ngram_coverage(self, ngrams):
+        """Returns a boolean array marking those tokens in this text that
+        are part of an occurrence of any of `ngrams`.
+
+        :param ngrams: n-grams to mark the occurrences of
+        :type ngrams: `list` of `str`
+        :rtype: `numpy.ndarray`
+
+        """
+        indices, starts, ends = self.get_ngram_positions(ngrams)
+        return self.get_coverage(len(self.tokens), starts, ends)
+
+    def get_ngram_positions(self, ngrams):
+        """Returns the token positions of every occurrence, including
+        overlapping occurrences, of each of `ngrams` in this text.
+
+        The positions are returned as three arrays of equal length,
+        giving for each occurrence the index in `ngrams` of the n-gram,
+        the position of its first token, and the position after its
+        last token. If `ngrams` contains the same n-gram more than
+        once, only the first is reported.
+
+        Token windows of each n-gram size are hashed, and compared in
+        a single pass against the hashes of the n-grams of that size.
+        The window hashes are not kept beyond this call, so that the
+        memory used does not grow with the number of sizes searched.
+
+        :param ngrams: n-grams to locate
+        :type ngrams: `list` of `str`
+        :rtype: `tuple` of `numpy.ndarray`
+
+        """
+        token_ids, vocabulary = self._get_token_ids()
+        targets = {}
+        for index, ngram in enumerate(ngrams):
+            ids = tuple(vocabulary.get(token) for token in
+                        self._tokenizer.tokenize(ngram))
+            # An n-gram with a token not in this text cannot occur in
+            # it.
+            if ids and None not in ids:
+                targets.setdefault(len(ids), {}).setdefault(ids, index)
+        found_indices = [np.zeros(0, dtype=np.int64)]
+        found_starts = [np.zeros(0, dtype=np.int64)]
+        found_ends = [np.zeros(0, dtype=np.int64)]
+        for size, size_targets in targets.items():
+            if size > len(token_ids):
+                continue
+            windows = sliding_window_view(token_ids, size)
+            target_ids = np.array(list(size_targets.keys()), dtype=np.int64)
+            target_indices = np.array(list(size_targets.values()),
+                                      dtype=np.int64)
+            target_hashes = self._hash_token_windows(target_ids)
+            order = np.argsort(target_hashes)
+            target_hashes = target_hashes[order]
+            window_hashes = self._hash_token_windows(windows)
+            locations = np.minimum(np.searchsorted(
+                target_hashes, window_hashes), len(target_hashes) - 1)
+            starts = np.flatnonzero(target_hashes[locations] == window_hashes)
+            matched = order[locations[starts]]
+            # Guard against hash collisions by checking the tokens of
+            # each candidate occurrence.
+            exact = (windows[starts] == target_ids[matched]).all(axis=1)
+            starts = starts[exact]
+            found_indices.append(target_indices[matched[exact]])
+            found_starts.append(starts)
+            found_ends.append(starts + size)
+        return (np.concatenate(found_indices), np.concatenate(found_starts),
+                np.concatenate(found_ends))
+
     def get_ngrams(self, minimum, maximum, skip_sizes=None):
         """Returns a generator supplying the n-grams (`minimum` <= n
         <= `maximum`) for this text.
@@ -81,6 +180,20 @@ class Text:
         """
         return self._tokenizer.joiner.join(self.tokens)
 
+    def _get_token_ids(self):
+        """Returns an array of integer identifiers for the tokens in this
+        text, and the mapping from token to identifier.
+
+        :rtype: `tuple` of `numpy.ndarray` and `dict`
+
+        """
+        if self._token_ids is None:
+            vocabulary = {}
+            ids = [vocabulary.setdefault(token, len(vocabulary))
+                   for token in self.tokens]
+            self._token_ids = (np.array(ids, dtype=np.int64), vocabulary)
+        return self._token_ids
+
     def get_tokens(self):
         """Returns a list of tokens in this text.
 
@@ -90,6 +203,24 @@ class Text:
         return self._tokenizer.tokenize(self._content.replace(
             '\n', self._tokenizer.joiner))
 
+    @staticmethod
+    def _hash_token_windows(windows):
+        """Returns a hash of each row of token identifiers in `windows`.
+
+        :param windows: token identifiers, one window per row
+        :type windows: `numpy.ndarray`
+        :rtype: `numpy.ndarray`
+
+        """
+        hashes = []
+        for modulus, base in zip(HASH_MODULI, HASH_BASES):
+            window_hash = np.zeros(windows.shape[0], dtype=np.int64)
+            for column in range(windows.shape[1]):
+                window_hash = (window_hash * base + windows[:, column]) % \
+                    modulus
+            hashes.append(window_hash)
+        return (hashes[0] << 32) | hashes[1]
+
     def _ngrams(self, sequence, degree):
         """Returns the n-grams generated from `sequence`.
 
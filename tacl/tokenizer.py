@@ -33,6 +33,16 @@ class Tokenizer:
         tokens."""
         return self._pattern
 
+    def get_spans(self, text):
+        """Returns the start and end indices of all tokens in `text`.
+
+        :param text: text to be tokenized
+        :type text: `str`
+        :rtype: `list` of 2-`tuple` of `int`
+
+        """
+        return [match.span() for match in self._regexp.finditer(text)]
+
     def tokenize(self, text):
         """Returns all tokens in `text`.
 
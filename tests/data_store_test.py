@@ -5,7 +5,7 @@ import io
 import os.path
 import sqlite3
 import unittest
-from unittest.mock import call, MagicMock, PropertyMock, sentinel
+from unittest.mock import call, MagicMock, patch, PropertyMock, sentinel
 
 import pandas as pd
 
@@ -132,6 +132,22 @@ class DataStoreTestCase (TaclTestCase):
         actual_ngrams = set([row['ngram'] for row in cursor.fetchall()])
         self.assertEqual(actual_ngrams, expected_ngrams)
 
+    def test_add_temporary_results(self):
+        results = io.StringIO(
+            'ngram,size,work,siglum,count,label\n'
+            'a,1,T1,base,2,X\nb,1,T1,base,1,X\nab,2,T2,A,1,X\n',
+            newline='')
+        store = tacl.DataStore(':memory:')
+        store._conn = MagicMock(spec_set=sqlite3.Connection)
+        with patch('tacl.constants.TEMPORARY_RESULTS_BATCH_SIZE', 2):
+            store._add_temporary_results(results, 'L')
+        self.assertEqual(store._conn.executemany.mock_calls, [
+            call(tacl.constants.INSERT_TEMPORARY_RESULTS_SQL, [
+                ('a', '1', 'T1', 'base', '2', 'L'),
+                ('b', '1', 'T1', 'base', '1', 'L')]),
+            call(tacl.constants.INSERT_TEMPORARY_RESULTS_SQL, [
+                ('ab', '2', 'T2', 'A', '1', 'L')])])
+
     def test_add_text_ngrams_existing(self):
         get_text_id = self._create_patch('tacl.DataStore._get_text_id')
         get_text_id.return_value = sentinel.text_id
@@ -16,12 +16,10 @@ class NgramHighlightReportTestCase (TaclTestCase):
             tacl.constants.TOKENIZER_JOINER_CBETA)
 
     def test_highlight(self):
-        input_text = (
-            '<span>火</span><span>無</span><span>[火*因]</span>。'
-            '<span>是</span><span>故</span><span>顯</span><span>物</span>')
-        ngrams = ['無[火*因]是']
+        input_text = '火無[火*因]。是故顯物'
+        ngrams = [['無[火*因]是']]
         report = tacl.NgramHighlightReport(None, self._tokenizer)
-        actual_text = report._highlight(input_text, ngrams, True)
+        actual_text = report._highlight(input_text, ngrams, [])
         expected_text = (
             '<span>火</span><span class="highlight1">無</span>'
             '<span class="highlight1">[火*因]</span>。'
@@ -30,19 +28,16 @@ class NgramHighlightReportTestCase (TaclTestCase):
         self.assertEqual(actual_text, expected_text)
 
     def test_highlight_minus(self):
-        input_text = (
-            '<span class="highlight2">火</span><span class="highlight">無</span>'
-            '<span class="highlight1">[火*因]</span>。<span class="highlight1">'
-            '是</span><span>故</span><span class="highlight2">火</span>'
-            '<span>顯</span><span>物</span><span class="highlight2">火</span>')
+        input_text = '火無[火*因]。是故火顯物火'
+        ngrams = [['無[火*因]是', '故火'], ['火']]
         minus_ngrams = ['火顯']
         report = tacl.NgramHighlightReport(None, self._tokenizer)
-        actual_text = report._highlight(input_text, minus_ngrams, False)
+        actual_text = report._highlight(input_text, ngrams, minus_ngrams)
         expected_text = (
-            '<span class="highlight2">火</span><span class="highlight">無</span>'
+            '<span class="highlight2">火</span><span class="highlight1">無</span>'
             '<span class="highlight1">[火*因]</span>。<span class="highlight1">'
-            '是</span><span>故</span><span>火</span><span>顯</span><span>物'
-            '</span><span class="highlight2">火</span>')
+            '是</span><span class="highlight1">故</span><span>火</span>'
+            '<span>顯</span><span>物</span><span class="highlight2">火</span>')
         self.assertEqual(actual_text, expected_text)
 
     def test_prepare_text_cbeta(self):
@@ -122,23 +117,8 @@ class ResultsHighlightReportTestCase (TaclTestCase):
         expected_text_list = ['t2/base.txt', 't2/大.txt', 't3/base.txt']
         self.assertEqual(actual_text_list, expected_text_list)
 
-    def test_get_regexp_pattern(self):
-        input_ngram = 'ab[cd]e'
-        report = tacl.ResultsHighlightReport(None, self._tokenizer)
-        actual_pattern = report._get_regexp_pattern(input_ngram)
-        expected_pattern = (r'(<span[^>]*>a</span>\W*<span[^>]*>b</span>\W*'
-                            r'<span[^>]*>\[cd\]</span>\W*<span[^>]*>e</span>)')
-        self.assertEqual(actual_pattern, expected_pattern)
-
     def test_highlight(self):
-        input_text = (
-            '<span data-count="0" data-texts=" ">火</span>'
-            '<span data-count="0" data-texts=" ">無</span>'
-            '<span data-count="0" data-texts=" ">[火*因]</span>。'
-            '<span data-count="0" data-texts=" ">是</span>'
-            '<span data-count="0" data-texts=" ">故</span>'
-            '<span data-count="0" data-texts=" ">顯</span>'
-            '<span data-count="0" data-texts=" ">物</span>')
+        input_text = '火無[火*因]。是故顯物'
         input_results = pd.DataFrame([
             {tacl.constants.NGRAM_FIELDNAME: '無[火*因]是',
              tacl.constants.SIZE_FIELDNAME: '3',
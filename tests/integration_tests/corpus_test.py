@@ -58,7 +58,7 @@ class CorpusIntegrationTestCase (TaclTestCase):
         actual_works = sorted(corpus.get_works())
         self.assertEqual(actual_works, expected_works)
 
-    def test_normalise(self):
+    def _get_normalise_data(self):
         data_dir = os.path.join(os.path.dirname(__file__), 'normaliser_data')
         corpus_dir = os.path.join(data_dir, 'corpora')
         corpus = tacl.Corpus(os.path.join(corpus_dir, 'unnormalised'),
@@ -66,11 +66,52 @@ class CorpusIntegrationTestCase (TaclTestCase):
         expected_dir = os.path.join(corpus_dir, 'normalised')
         mapping = tacl.VariantMapping(
             os.path.join(data_dir, 'mappings', 'map2.csv'), self._tokenizer)
+        return corpus, mapping, expected_dir
+
+    def test_normalise(self):
+        corpus, mapping, expected_dir = self._get_normalise_data()
         with tempfile.TemporaryDirectory() as output_dir:
             actual_dir = os.path.join(output_dir, 'corpus')
             corpus.normalise(mapping, actual_dir)
             self._compare_dirs(actual_dir, expected_dir)
 
+    def test_normalise_jobs(self):
+        corpus, mapping, expected_dir = self._get_normalise_data()
+        with tempfile.TemporaryDirectory() as output_dir:
+            actual_dir = os.path.join(output_dir, 'corpus')
+            corpus.normalise(mapping, actual_dir, jobs=2)
+            self._compare_dirs(actual_dir, expected_dir)
+
+    def test_normalise_resume(self):
+        corpus, mapping, expected_dir = self._get_normalise_data()
+        with tempfile.TemporaryDirectory() as output_dir:
+            actual_dir = os.path.join(output_dir, 'corpus')
+            self.assertRaises(FileExistsError, corpus.normalise, mapping,
+                              output_dir)
+            # Simulate a run that failed after writing A/wit1.txt and
+            # while writing A/wit2.txt.
+            os.makedirs(os.path.join(actual_dir, 'A'))
+            with open(os.path.join(actual_dir, 'A', 'wit1.txt'), 'w',
+                      encoding='utf-8') as fh:
+                fh.write('resumed')
+            with open(os.path.join(actual_dir, 'A', 'wit2.txt.tmp'), 'w',
+                      encoding='utf-8') as fh:
+                fh.write('partial')
+            corpus.normalise(mapping, actual_dir, resume=True)
+            with open(os.path.join(actual_dir, 'A', 'wit1.txt'),
+                      encoding='utf-8') as fh:
+                self.assertEqual(fh.read(), 'resumed')
+            self.assertEqual(sorted(os.listdir(os.path.join(actual_dir, 'A'))),
+                             ['wit1.txt', 'wit2.txt'])
+            for filename in (os.path.join('A', 'wit2.txt'),
+                             os.path.join('B', 'wit1.txt')):
+                with open(os.path.join(actual_dir, filename),
+                          encoding='utf-8') as fh:
+                    actual = fh.read()
+                with open(os.path.join(expected_dir, filename),
+                          encoding='utf-8') as fh:
+                    self.assertEqual(actual, fh.read())
+
 
 if __name__ == '__main__':
     unittest.main()
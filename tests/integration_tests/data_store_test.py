@@ -2,6 +2,8 @@ import io
 import os.path
 import unittest
 
+import pandas as pd
+
 import tacl
 from tacl.exceptions import MalformedQueryError, MalformedResultsError
 from ..tacl_test_case import TaclTestCase
@@ -260,12 +262,12 @@ class DataStoreIntegrationTestCase (TaclTestCase):
         ]
         self.assertEqual(set(actual_rows), set(expected_rows))
 
-    def test_diff_supplied(self):
+    def _test_diff_supplied(self, load):
         tokenizer = tacl.Tokenizer(*tacl.constants.TOKENIZERS['cbeta'])
         supplied_dir = os.path.join(self._data_dir, 'supplied_input')
-        results = [os.path.join(supplied_dir, 'diff_input_1.csv'),
-                   os.path.join(supplied_dir, 'diff_input_2.csv'),
-                   os.path.join(supplied_dir, 'diff_input_3.csv')]
+        results = [load(os.path.join(supplied_dir, 'diff_input_1.csv')),
+                   load(os.path.join(supplied_dir, 'diff_input_2.csv')),
+                   load(os.path.join(supplied_dir, 'diff_input_3.csv'))]
         labels = ('A', 'B', 'C')
         actual_rows = self._get_rows_from_csv(
             self._store.diff_supplied(results, labels, tokenizer,
@@ -286,6 +288,17 @@ class DataStoreIntegrationTestCase (TaclTestCase):
             ('人子', '2', 'T0007', 'base', '1', 'C')]
         self.assertEqual(set(actual_rows), set(expected_rows))
 
+    def test_diff_supplied(self):
+        self._test_diff_supplied(lambda path: path)
+
+    def test_diff_supplied_dataframes(self):
+        self._test_diff_supplied(
+            lambda path: pd.read_csv(path, encoding='utf-8', na_filter=False))
+
+    def test_diff_supplied_results(self):
+        self._test_diff_supplied(lambda path: tacl.Results(
+            path, tacl.Tokenizer(*tacl.constants.TOKENIZERS['cbeta'])))
+
     def test_diff_supplied_argument_mismatch(self):
         # Supplying a list of labels that differs in length from the
         # list of results should raise an exception.
@@ -309,6 +322,41 @@ class DataStoreIntegrationTestCase (TaclTestCase):
         self.assertRaises(MalformedResultsError, self._store.diff_supplied,
                           results, labels, tokenizer, io.StringIO(newline=''))
 
+    def test_diff_supplied_non_results_dataframe(self):
+        """Supplying loaded data that is not results should raise an
+        exception."""
+        tokenizer = tacl.Tokenizer(*tacl.constants.TOKENIZERS['cbeta'])
+        supplied_dir = os.path.join(self._data_dir, 'supplied_input')
+        results = [pd.read_csv(os.path.join(supplied_dir, filename))
+                   for filename in ('diff_invalid_input_1.csv',
+                                    'diff_input_2.csv', 'diff_input_3.csv')]
+        labels = ('A', 'B', 'C')
+        self.assertRaises(MalformedResultsError, self._store.diff_supplied,
+                          results, labels, tokenizer, io.StringIO(newline=''))
+
+    def test_get_fingerprint(self):
+        fingerprint = self._store.get_fingerprint()
+        # Setting labels, as a query does, leaves the n-gram data as
+        # it was.
+        list(self._store.get_witness_ngrams(self._catalogue))
+        self.assertEqual(self._store.get_fingerprint(), fingerprint)
+        self._store.add_ngrams(self._corpus, 4, 4)
+        self.assertNotEqual(self._store.get_fingerprint(), fingerprint)
+
+    def test_get_witness_ngrams(self):
+        catalogue = {'T3': 'C', 'T5': 'A'}
+        actual_rows = [tuple(row) for row in
+                       self._store.get_witness_ngrams(catalogue)]
+        expected_rows = [
+            ('T3', 'base', 't'), ('T3', 'base', 'h'), ('T3', 'base', 'a'),
+            ('T3', 'base', 'th'), ('T3', 'base', 'ha'), ('T3', 'base', 'at'),
+            ('T3', 'base', 'tha'), ('T3', 'base', 'hat'),
+            ('T5', 'base', 'w'), ('T5', 'base', 'e'), ('T5', 'base', 'l'),
+            ('T5', 'base', 'we'), ('T5', 'base', 'el'), ('T5', 'base', 'll'),
+            ('T5', 'base', 'wel'), ('T5', 'base', 'ell'),
+        ]
+        self.assertEqual(sorted(actual_rows), sorted(expected_rows))
+
     def test_intersection(self):
         actual_rows = self._get_rows_from_csv(self._store.intersection(
                 self._catalogue, io.StringIO(newline='')))
@@ -331,11 +379,11 @@ class DataStoreIntegrationTestCase (TaclTestCase):
             ('th', '2', 'T3', 'base', '1', 'C')]
         self.assertEqual(set(actual_rows), set(expected_rows))
 
-    def test_intersection_supplied(self):
+    def _test_intersection_supplied(self, load):
         supplied_dir = os.path.join(self._data_dir, 'supplied_input')
-        results = [os.path.join(supplied_dir, 'intersect_input_1.csv'),
-                   os.path.join(supplied_dir, 'intersect_input_2.csv'),
-                   os.path.join(supplied_dir, 'intersect_input_3.csv')]
+        results = [load(os.path.join(supplied_dir, 'intersect_input_1.csv')),
+                   load(os.path.join(supplied_dir, 'intersect_input_2.csv')),
+                   load(os.path.join(supplied_dir, 'intersect_input_3.csv'))]
         labels = ('A', 'B', 'C')
         actual_rows = self._get_rows_from_csv(
             self._store.intersection_supplied(results, labels,
@@ -353,6 +401,17 @@ class DataStoreIntegrationTestCase (TaclTestCase):
         ]
         self.assertEqual(set(actual_rows), set(expected_rows))
 
+    def test_intersection_supplied(self):
+        self._test_intersection_supplied(lambda path: path)
+
+    def test_intersection_supplied_dataframes(self):
+        self._test_intersection_supplied(
+            lambda path: pd.read_csv(path, encoding='utf-8', na_filter=False))
+
+    def test_intersection_supplied_results(self):
+        self._test_intersection_supplied(lambda path: tacl.Results(
+            path, tacl.Tokenizer(*tacl.constants.TOKENIZERS['cbeta'])))
+
     def test_intersection_supplied_argument_mismatch(self):
         # Supplying a list of labels that differs in length from the
         # list of results should raise an exception.
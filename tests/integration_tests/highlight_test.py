@@ -36,12 +36,12 @@ class BaseHighlightIntegrationTestCase (TaclTestCase):
 
 class NgramHighlightIntegrationTestCase (BaseHighlightIntegrationTestCase):
 
-    def test_highlight(self):
+    def _test_highlight(self, options):
         ngrams = os.path.join(self._data_dir, 'ngrams.txt')
         minus_ngrams = os.path.join(self._data_dir, 'minus_ngrams.txt')
-        command = 'tacl highlight -t {} -m {} -n {} -l L {} {} {}'.format(
-            self._tokenizer, minus_ngrams, ngrams, self._corpus, 't1',
-            self._actual_output_dir)
+        command = 'tacl highlight {} -t {} -m {} -n {} -l L {} {} {}'.format(
+            options, self._tokenizer, minus_ngrams, ngrams, self._corpus,
+            't1', self._actual_output_dir)
         subprocess.call(shlex.split(command))
         with open(os.path.join(self._actual_output_dir, 't1-base.html')) as fh:
             actual_output = fh.read()
@@ -50,13 +50,19 @@ class NgramHighlightIntegrationTestCase (BaseHighlightIntegrationTestCase):
         self.assertEqual(self._extract_text(actual_output),
                          self._extract_text(expected_output))
 
+    def test_highlight(self):
+        self._test_highlight('')
+
+    def test_highlight_jobs(self):
+        self._test_highlight('-j 2')
+
 
 class ResultsHighlightIntegrationTestCase (BaseHighlightIntegrationTestCase):
 
-    def test_highlight(self):
+    def _test_highlight(self, options):
         results = os.path.join(self._data_dir, 'results.csv')
-        command = 'tacl highlight -t {} -r {} {} {} {}'.format(
-            self._tokenizer, results, self._corpus, 't1',
+        command = 'tacl highlight {} -t {} -r {} {} {} {}'.format(
+            options, self._tokenizer, results, self._corpus, 't1',
             self._actual_output_dir)
         subprocess.call(shlex.split(command))
         with open(os.path.join(self._actual_output_dir, 't1-base.html')) as fh:
@@ -66,6 +72,12 @@ class ResultsHighlightIntegrationTestCase (BaseHighlightIntegrationTestCase):
         self.assertEqual(self._extract_text(actual_output),
                          self._extract_text(expected_output))
 
+    def test_highlight(self):
+        self._test_highlight('')
+
+    def test_highlight_jobs(self):
+        self._test_highlight('-j 2')
+
 
 if __name__ == '__main__':
     unittest.main()
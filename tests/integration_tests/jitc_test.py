@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+
+import json
+import os.path
+import tempfile
+import unittest
+
+import tacl
+from tacl.jitc import COMMON, SHARED, UNIQUE
+from ..tacl_test_case import TaclTestCase
+
+
+class JitCReportIntegrationTestCase (TaclTestCase):
+
+    def setUp(self):
+        self._tokenizer = tacl.Tokenizer(
+            tacl.constants.TOKENIZER_PATTERN_CBETA,
+            tacl.constants.TOKENIZER_JOINER_CBETA)
+        self._data_dir = os.path.join(os.path.dirname(__file__), 'data')
+        self._corpus = tacl.Corpus(os.path.join(self._data_dir, 'stripped'),
+                                   self._tokenizer)
+        self._store = tacl.DataStore(':memory:')
+        self._store.add_ngrams(self._corpus, 1, 3)
+
+    def _check_data(self, data):
+        # Base work, related work, siglum, shared, common and unique
+        # token counts, and token count of the related witness.
+        expected_data = [
+            ('T1', 'T2', 'a', 6, 3, 2, 11),
+            ('T1', 'T2', 'base', 5, 4, 2, 11),
+            ('T1', 'T5', 'base', 1, 1, 2, 4),
+            ('T2', 'T1', 'a', 7, 2, 0, 9),
+            ('T2', 'T1', 'base', 7, 3, 0, 10),
+            ('T2', 'T5', 'base', 1, 1, 2, 4),
+            ('T5', 'T1', 'a', 2, 3, 4, 9),
+            ('T5', 'T1', 'base', 2, 3, 5, 10),
+            ('T5', 'T2', 'a', 1, 3, 7, 11),
+            ('T5', 'T2', 'base', 0, 4, 7, 11),
+        ]
+        self.assertEqual(len(data.index), len(expected_data))
+        for (base_work, related_work, siglum, shared, common, unique,
+             total) in expected_data:
+            row = data.loc[(base_work, related_work, siglum)]
+            self.assertAlmostEqual(row[SHARED], shared / total * 100)
+            self.assertAlmostEqual(row[COMMON], common / total * 100)
+            self.assertAlmostEqual(row[UNIQUE], unique / total * 100)
+
+    def _process_works(self, output_dir, jobs=1):
+        report = tacl.JitCReport(self._store, self._corpus, self._tokenizer)
+        report._maybe_label = 'A'
+        report._no_label = 'B'
+        return report._process_works(['T1', 'T2', 'T5'], ['T3', 'T4'],
+                                     output_dir, jobs)
+
+    def test_process_works(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            self._check_data(self._process_works(output_dir))
+            with open(os.path.join(output_dir, 'data',
+                                   'manifest.json')) as fh:
+                manifest = json.load(fh)
+            self.assertEqual(manifest['completed'], ['T1', 'T2', 'T5'])
+
+    def test_process_works_jobs(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            self._check_data(self._process_works(output_dir, 2))
+
+    def test_process_works_resume(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            self._process_works(output_dir)
+            manifest_path = os.path.join(output_dir, 'data', 'manifest.json')
+            with open(manifest_path) as fh:
+                manifest = json.load(fh)
+            # Simulate a run interrupted after the statistics of T1
+            # were saved, with those of T2 saved incorrectly before
+            # being recorded in the manifest.
+            manifest['completed'] = ['T1']
+            with open(manifest_path, 'w') as fh:
+                json.dump(manifest, fh)
+            stats_path = os.path.join(output_dir, 'data', 'stats_T2.csv')
+            with open(stats_path, 'w') as fh:
+                fh.write('base_work,siglum,shared,common,unique\n')
+            self._check_data(self._process_works(output_dir))
+            with open(manifest_path) as fh:
+                manifest = json.load(fh)
+            self.assertEqual(manifest['completed'], ['T1', 'T2', 'T5'])
+
+    def test_process_works_resume_changed_inputs(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            self._process_works(output_dir)
+            stats_path = os.path.join(output_dir, 'data', 'stats_T1.csv')
+            with open(stats_path, 'w') as fh:
+                fh.write('base_work,siglum,shared,common,unique\n')
+            # Adding n-grams to the data store invalidates the saved
+            # statistics.
+            self._store.add_ngrams(self._corpus, 4, 4)
+            self._process_works(output_dir)
+            with open(stats_path) as fh:
+                self.assertGreater(len(fh.readlines()), 1)
+
+    def test_process_works_resume_missing_statistics(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            self._process_works(output_dir)
+            os.remove(os.path.join(output_dir, 'data', 'stats_T2.csv'))
+            self._check_data(self._process_works(output_dir))
+
+
+if __name__ == '__main__':
+    unittest.main()
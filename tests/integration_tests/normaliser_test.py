@@ -1,6 +1,8 @@
 """Test suite for the normaliser/variant handling code."""
 
-import os.path
+import os
+import tempfile
+import unittest.mock
 
 from tacl import constants, exceptions, VariantMapping, Tokenizer
 from ..tacl_test_case import TaclTestCase
@@ -120,6 +122,21 @@ class VariantMappingTestCase(TaclTestCase):
         self.assertRaises(exceptions.MalformedNormaliserMappingError,
                           VariantMapping, mapping_path, self._tokenizer)
 
+    def test_normalise_non_token_content(self):
+        mapping_path = os.path.join(self._mapping_dir, 'map1.csv')
+        mapping = VariantMapping(mapping_path, self._tokenizer)
+        text = 'NB，C\nWX 「Y」'
+        expected = 'AB，C\nD 「D」'
+        actual = mapping.normalise(text)
+        self.assertEqual(actual, expected)
+        mapping_path = os.path.join(self._mapping_dir, 'map3.csv')
+        tokenizer = Tokenizer(*constants.TOKENIZERS['latin'])
+        mapping = VariantMapping(mapping_path, tokenizer)
+        text = 'then  the anthem,\nhit the ant.'
+        expected = 'then  that anthem,\nhit bees.'
+        actual = mapping.normalise(text)
+        self.assertEqual(actual, expected)
+
     def test_normalise_simple(self):
         mapping_path = os.path.join(self._mapping_dir, 'map1.csv')
         mapping = VariantMapping(mapping_path, self._tokenizer)
@@ -136,3 +153,39 @@ class VariantMappingTestCase(TaclTestCase):
         expected = 'then that anthem hit bees'
         actual = mapping.normalise(text)
         self.assertEqual(actual, expected)
+
+    def test_normalise_cache(self):
+        mapping_path = os.path.join(self._mapping_dir, 'map1.csv')
+        text = 'DURSTYVWX'
+        with tempfile.TemporaryDirectory() as cache_dir:
+            mapping = VariantMapping(mapping_path, self._tokenizer,
+                                     cache_dir)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            # The compiled mapping is loaded rather than generated
+            # again.
+            with unittest.mock.patch.object(
+                    VariantMapping, '_generate_mappings',
+                    side_effect=AssertionError) as generate_mappings:
+                cached_mapping = VariantMapping(
+                    mapping_path, self._tokenizer, cache_dir)
+            generate_mappings.assert_not_called()
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            self.assertEqual(cached_mapping.normalise(text),
+                             mapping.normalise(text))
+            self.assertEqual(cached_mapping.normalise(text), 'DQQDDD')
+            self.assertEqual(set(cached_mapping.denormalise('AQA')),
+                             set(mapping.denormalise('AQA')))
+            # A different tokenizer is not served the same compiled
+            # mapping.
+            tokenizer = Tokenizer(*constants.TOKENIZERS['latin'])
+            VariantMapping(mapping_path, tokenizer, cache_dir)
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+    def test_normalise_tokens(self):
+        mapping_path = os.path.join(self._mapping_dir, 'map3.csv')
+        tokenizer = Tokenizer(*constants.TOKENIZERS['latin'])
+        mapping = VariantMapping(mapping_path, tokenizer)
+        tokens = ['the', 'ant', 'the', 'Mozart', 's', 'the', 'anthem', 'the']
+        expected = 'bees that that that anthem that'
+        actual = mapping.normalise_tokens(tokens)
+        self.assertEqual(actual, expected)
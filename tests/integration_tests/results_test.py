@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 
 import os
+import shlex
+import subprocess
 import unittest
 
 
@@ -91,6 +93,16 @@ class ResultsIntegrationTestCase (TaclTestCase):
         expected_rows = self._get_rows_from_file(expected_results)
         self.assertEqual(set(actual_rows), set(expected_rows))
 
+    def test_explain(self):
+        results = os.path.join(self._data_dir, 'search-results.csv')
+        command = 'tacl results --explain --reduce --min-size 3 --remove A ' \
+            '{}'.format(results)
+        actual_plan = subprocess.check_output(shlex.split(command)).decode(
+            'utf-8').splitlines()
+        expected_plan = ["1. remove_label('A')", '2. reduce()',
+                         '3. prune_by_ngram_size(3, None)']
+        self.assertEqual(actual_plan, expected_plan)
+
     def test_extend_cbeta(self):
         results = os.path.join(self._data_dir, 'cbeta-non-extend-results.csv')
         command = 'tacl results -e {} -t {} {}'.format(
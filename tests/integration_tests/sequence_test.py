@@ -19,12 +19,11 @@ class SequenceIntegrationTestCase (unittest.TestCase):
         if os.path.exists(self._actual_output_dir):
             shutil.rmtree(self._actual_output_dir)
 
-    def test_file_creation(self):
-        """Tests that only the expected files are created."""
+    def _test_file_creation(self, options):
         corpus_dir = os.path.join(self._data_dir, 'corpus')
         results = os.path.join(self._data_dir, 'results.csv')
-        command = 'tacl align -m 4 {} {} {}'.format(
-            corpus_dir, self._actual_output_dir, results)
+        command = 'tacl align {} -m 4 {} {} {}'.format(
+            options, corpus_dir, self._actual_output_dir, results)
         subprocess.call(shlex.split(command))
         expected_files = set(['T1_base-T3_base.html', 'T1_base-T3_wit1.html',
                               'T2_base-T3_base.html', 'T2_base-T3_wit1.html'])
@@ -32,3 +31,12 @@ class SequenceIntegrationTestCase (unittest.TestCase):
         for filename in os.listdir(self._actual_output_dir):
             actual_files.add(filename)
         self.assertEqual(actual_files, expected_files)
+
+    def test_file_creation(self):
+        """Tests that only the expected files are created."""
+        self._test_file_creation('')
+
+    def test_file_creation_jobs(self):
+        """Tests that only the expected files are created when using
+        multiple processes."""
+        self._test_file_creation('-j 2')
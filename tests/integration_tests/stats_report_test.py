@@ -15,7 +15,7 @@ class StatisticsReportIntegrationTestCase (TaclTestCase):
         self._data_dir = os.path.join(base_dir, 'stats_data')
         self._stripped_dir = os.path.join(self._data_dir, 'stripped')
 
-    def test_generate_statistics(self):
+    def _test_generate_statistics(self, jobs):
         tokenizer = tacl.Tokenizer(tacl.constants.TOKENIZER_PATTERN_CBETA,
                                    tacl.constants.TOKENIZER_JOINER_CBETA)
         corpus = tacl.Corpus(self._stripped_dir, tokenizer)
@@ -32,7 +32,7 @@ class StatisticsReportIntegrationTestCase (TaclTestCase):
             )
         results_fh = self._create_csv(input_results)
         report = tacl.StatisticsReport(corpus, tokenizer, results_fh)
-        report.generate_statistics()
+        report.generate_statistics(jobs)
         actual_results = self._get_rows_from_csv(report.csv(
             io.StringIO(newline='')))
         expected_results = [
@@ -43,6 +43,36 @@ class StatisticsReportIntegrationTestCase (TaclTestCase):
         ]
         self.assertEqual(set(actual_results), set(expected_results))
 
+    def test_generate_statistics(self):
+        self._test_generate_statistics(1)
+
+    def test_generate_statistics_multiple_labels(self):
+        tokenizer = tacl.Tokenizer(tacl.constants.TOKENIZER_PATTERN_CBETA,
+                                   tacl.constants.TOKENIZER_JOINER_CBETA)
+        corpus = tacl.Corpus(self._stripped_dir, tokenizer)
+        # A witness that appears under two labels has its matching
+        # tokens counted from its results under both.
+        input_results = (
+            ['he', '2', 'a', 'base', '1', 'A'],
+            ['th', '2', 'a', 'base', '1', 'B'],
+            ['heh', '3', 'a', 'v1', '2', 'A'],
+            )
+        results_fh = self._create_csv(input_results)
+        report = tacl.StatisticsReport(corpus, tokenizer, results_fh)
+        report.generate_statistics()
+        actual_results = self._get_rows_from_csv(report.csv(
+            io.StringIO(newline='')))
+        expected_results = [
+            tacl.constants.STATISTICS_FIELDNAMES,
+            ('a', 'base', '3', '3', '100.0', 'A'),
+            ('a', 'base', '3', '3', '100.0', 'B'),
+            ('a', 'v1', '5', '6', str(5 / 6 * 100), 'A'),
+        ]
+        self.assertEqual(set(actual_results), set(expected_results))
+
+    def test_generate_statistics_jobs(self):
+        self._test_generate_statistics(2)
+
 
 if __name__ == '__main__':
     unittest.main()
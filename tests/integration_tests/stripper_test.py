@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 
+import json
 import os.path
+import shutil
 import tempfile
 import unittest
 
@@ -17,20 +19,94 @@ class StripperIntegrationTestCase (TaclTestCase):
         self._expected_output_dir = os.path.join(
             self._data_dir, 'expected_stripped_output')
 
-    def _strip_and_compare(self, input_path, output_path):
+    def _strip_and_compare(self, input_path, output_path, jobs=1,
+                           streaming=False):
         xml_dir = os.path.join(self._xml_dir, input_path)
         expected_dir = os.path.join(self._expected_output_dir, output_path)
         with tempfile.TemporaryDirectory() as actual_dir:
             stripper = tacl.Stripper(xml_dir, actual_dir)
-            stripper.strip_files()
+            stripper.strip_files(jobs, streaming=streaming)
             self._compare_dirs(actual_dir, expected_dir)
 
     def test_github_basic_strip_files(self):
         self._strip_and_compare(os.path.join('github', 'basic'), 'basic')
 
+    def test_github_basic_strip_files_jobs(self):
+        self._strip_and_compare(os.path.join('github', 'basic'), 'basic', 2)
+
+    def test_github_basic_strip_files_streaming(self):
+        self._strip_and_compare(os.path.join('github', 'basic'), 'basic',
+                                streaming=True)
+
     def test_github_cb_tt_strip_files(self):
         self._strip_and_compare(os.path.join('github', 'cb_tt'), 'cb_tt')
 
+    def test_github_strip_files_incremental(self):
+        expected_dir = os.path.join(self._expected_output_dir, 'basic')
+        with tempfile.TemporaryDirectory() as temp_dir:
+            xml_dir = os.path.join(temp_dir, 'input')
+            actual_dir = os.path.join(temp_dir, 'output')
+            shutil.copytree(os.path.join(self._xml_dir, 'github', 'basic'),
+                            xml_dir)
+            stripper = tacl.Stripper(xml_dir, actual_dir)
+            stripper.strip_files(incremental=True)
+            manifest_path = os.path.join(
+                actual_dir, tacl.constants.SOURCE_MANIFEST_FILENAME)
+            saved_manifest_path = os.path.join(temp_dir, 'manifest.json')
+            os.rename(manifest_path, saved_manifest_path)
+            self._compare_dirs(actual_dir, expected_dir)
+            os.rename(saved_manifest_path, manifest_path)
+            # Mark the output of an unchanged and a changed work, to
+            # show which are stripped again.
+            for path in (os.path.join('T0002b', 'base.txt'),
+                         os.path.join('T0003', '大.txt')):
+                with open(os.path.join(actual_dir, path), 'w') as fh:
+                    fh.write('marked')
+            with open(os.path.join(xml_dir, 'T0003.xml'), 'a') as fh:
+                fh.write('\n')
+            os.remove(os.path.join(xml_dir, 'T0002a.xml'))
+            stripper.strip_files(incremental=True)
+            self.assertNotIn('T0002a', os.listdir(actual_dir))
+            with open(os.path.join(actual_dir, 'T0002b', 'base.txt')) as fh:
+                self.assertEqual(fh.read(), 'marked')
+            self._compare_non_results_files(
+                os.path.join(actual_dir, 'T0003', '大.txt'),
+                os.path.join(expected_dir, 'T0003', '大.txt'))
+
+    def test_github_strip_files_incremental_resume(self):
+        expected_dir = os.path.join(self._expected_output_dir, 'basic')
+        with tempfile.TemporaryDirectory() as temp_dir:
+            xml_dir = os.path.join(temp_dir, 'input')
+            actual_dir = os.path.join(temp_dir, 'output')
+            shutil.copytree(os.path.join(self._xml_dir, 'github', 'basic'),
+                            xml_dir)
+            stripper = tacl.Stripper(xml_dir, actual_dir)
+            # A first incremental run replaces any existing output.
+            stripper.strip_files()
+            stripper.strip_files(incremental=True)
+            # Simulate a run that wrote the output of every work but
+            # was interrupted after recording only T0002a.
+            manifest_path = os.path.join(
+                actual_dir, tacl.constants.SOURCE_MANIFEST_FILENAME)
+            with open(manifest_path, encoding='utf-8') as fh:
+                entries = json.load(fh)
+            os.remove(manifest_path)
+            journal_path = os.path.join(
+                actual_dir, tacl.constants.SOURCE_MANIFEST_JOURNAL_FILENAME)
+            with open(journal_path, 'w', encoding='utf-8') as fh:
+                fh.write(json.dumps(['T0002a', entries['T0002a']]) + '\n')
+            for path in (os.path.join('T0002a', 'base.txt'),
+                         os.path.join('T0003', 'stale.txt')):
+                with open(os.path.join(actual_dir, path), 'w') as fh:
+                    fh.write('marked')
+            stripper.strip_files(jobs=2, incremental=True)
+            with open(os.path.join(actual_dir, 'T0002a', 'base.txt')) as fh:
+                self.assertEqual(fh.read(), 'marked')
+            shutil.copy(os.path.join(expected_dir, 'T0002a', 'base.txt'),
+                        os.path.join(actual_dir, 'T0002a', 'base.txt'))
+            os.remove(manifest_path)
+            self._compare_dirs(actual_dir, expected_dir)
+
     def test_github_strip_empty_file(self):
         input_dir = os.path.join(self._xml_dir, 'github', 'empty')
         output_dir = os.path.join(self._expected_output_dir, 'empty')
@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 
+import json
 import os
+import shutil
 import tempfile
 
 import tacl
@@ -18,12 +20,12 @@ class TEICorpusIntegrationTestCase (TaclTestCase):
             self._data_dir, 'expected_corpus_output', self._corpus_name)
         self.maxDiff = None
 
-    def _test_tidy(self, corpus_name):
+    def _test_tidy(self, corpus_name, jobs=1, streaming=False):
         corpus_dir = os.path.join(self._cbeta_xml_dir, corpus_name)
         expected_dir = os.path.join(self._expected_output_dir, corpus_name)
         with tempfile.TemporaryDirectory() as actual_dir:
             corpus = tacl.TEICorpusCBETAGitHub(corpus_dir, actual_dir)
-            corpus.tidy()
+            corpus.tidy(jobs, streaming=streaming)
             self._compare_dirs(actual_dir, expected_dir)
 
 
@@ -36,6 +38,12 @@ class TEICorpusCBETAGitHubIntegrationTestCase (TEICorpusIntegrationTestCase):
     def test_tidy_basic(self):
         self._test_tidy('basic')
 
+    def test_tidy_basic_jobs(self):
+        self._test_tidy('basic', 2)
+
+    def test_tidy_basic_streaming(self):
+        self._test_tidy('basic', streaming=True)
+
     def test_tidy_cb_tt(self):
         self._test_tidy('cb_tt')
 
@@ -53,10 +61,91 @@ class TEICorpusCBETAGitHubIntegrationTestCase (TEICorpusIntegrationTestCase):
         correctly."""
         self._test_tidy('extract-xu-w')
 
+    def test_extract_xu_w_streaming(self):
+        self._test_tidy('extract-xu-w', streaming=True)
+
     def test_tidy_no_join_texts(self):
         """Tests that works ending in A/B etc are not joined."""
         self._test_tidy('no-join-texts-corpus')
 
+    def test_tidy_no_join_texts_jobs(self):
+        self._test_tidy('no-join-texts-corpus', 2)
+
+    def test_tidy_incremental(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            corpus_dir = os.path.join(temp_dir, 'input')
+            actual_dir = os.path.join(temp_dir, 'output')
+            shutil.copytree(os.path.join(self._cbeta_xml_dir, 'basic'),
+                            corpus_dir)
+            corpus = tacl.TEICorpusCBETAGitHub(corpus_dir, actual_dir)
+            corpus.tidy(incremental=True)
+            expected_dir = os.path.join(self._expected_output_dir, 'basic')
+            self.assertEqual(
+                sorted(os.listdir(actual_dir)),
+                sorted(os.listdir(expected_dir) +
+                       [tacl.constants.SOURCE_MANIFEST_FILENAME]))
+            # Mark the output of an unchanged and a changed work, to
+            # show which are prepared again.
+            for filename in ('T0002b.xml', 'T0003.xml'):
+                with open(os.path.join(actual_dir, filename), 'w') as fh:
+                    fh.write('marked')
+            with open(os.path.join(corpus_dir, 'T02', 'T02n0003.xml'),
+                      'a') as fh:
+                fh.write('\n')
+            os.remove(os.path.join(corpus_dir, 'T01', 'T01n0002a.xml'))
+            corpus.tidy(incremental=True)
+            self.assertEqual(
+                sorted(os.listdir(actual_dir)),
+                sorted([filename for filename in os.listdir(expected_dir)
+                        if not filename.startswith('T0002a')] +
+                       [tacl.constants.SOURCE_MANIFEST_FILENAME]))
+            with open(os.path.join(actual_dir, 'T0002b.xml')) as fh:
+                self.assertEqual(fh.read(), 'marked')
+            self._compare_non_results_files(
+                os.path.join(actual_dir, 'T0003.xml'),
+                os.path.join(expected_dir, 'T0003.xml'))
+
+    def test_tidy_incremental_resume(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            corpus_dir = os.path.join(temp_dir, 'input')
+            actual_dir = os.path.join(temp_dir, 'output')
+            shutil.copytree(os.path.join(self._cbeta_xml_dir, 'basic'),
+                            corpus_dir)
+            corpus = tacl.TEICorpusCBETAGitHub(corpus_dir, actual_dir)
+            # A first incremental run overwrites any existing output.
+            corpus.tidy()
+            corpus.tidy(incremental=True)
+            # Simulate a run that wrote the output of every work but
+            # was interrupted after recording only T0002a, and while
+            # recording T0002b.
+            manifest_path = os.path.join(
+                actual_dir, tacl.constants.SOURCE_MANIFEST_FILENAME)
+            with open(manifest_path, encoding='utf-8') as fh:
+                entries = json.load(fh)
+            os.remove(manifest_path)
+            journal_path = os.path.join(
+                actual_dir, tacl.constants.SOURCE_MANIFEST_JOURNAL_FILENAME)
+            with open(journal_path, 'w', encoding='utf-8') as fh:
+                fh.write(json.dumps(['T0002a.xml', entries['T0002a.xml']]))
+                fh.write('\n["T0002b.xml", {"fing')
+            expected_dir = os.path.join(self._expected_output_dir, 'basic')
+            for filename in os.listdir(expected_dir):
+                with open(os.path.join(actual_dir, filename), 'w') as fh:
+                    fh.write('marked')
+            corpus.tidy(jobs=2, incremental=True)
+            self.assertEqual(
+                sorted(os.listdir(actual_dir)),
+                sorted(os.listdir(expected_dir) +
+                       [tacl.constants.SOURCE_MANIFEST_FILENAME]))
+            for filename in os.listdir(expected_dir):
+                actual_path = os.path.join(actual_dir, filename)
+                if filename.startswith('T0002a'):
+                    with open(actual_path) as fh:
+                        self.assertEqual(fh.read(), 'marked')
+                else:
+                    self._compare_non_results_files(
+                        actual_path, os.path.join(expected_dir, filename))
+
     def test_tidy_T0001(self):
         self._test_tidy('T0001-corpus')
 
@@ -69,8 +158,16 @@ class TEICorpusCBETAGitHubIntegrationTestCase (TEICorpusIntegrationTestCase):
     def test_tidy_T0220(self):
         self._test_tidy('T0220-corpus')
 
+    def test_tidy_T0220_streaming(self):
+        self._test_tidy('T0220-corpus', streaming=True)
+
     def test_tidy_T0310(self):
         self._test_tidy('T0310-corpus')
 
+    def test_tidy_T0310_streaming(self):
+        """Tests that a work post-processed as a whole is tidied in
+        memory when streaming."""
+        self._test_tidy('T0310-corpus', streaming=True)
+
     def test_tidy_T2102(self):
         self._test_tidy('T2102-corpus')
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+import unittest
+
+import numpy as np
+
+import tacl
+from .tacl_test_case import TaclTestCase
+
+
+class JitCReportTestCase (TaclTestCase):
+
+    def setUp(self):
+        self._tokenizer = tacl.Tokenizer(
+            tacl.constants.TOKENIZER_PATTERN_CBETA,
+            tacl.constants.TOKENIZER_JOINER_CBETA)
+
+    def test_get_witness_coverage(self):
+        witness = tacl.Text('abcd', self._tokenizer)
+        ngrams = ['a', 'b', 'c', 'd', 'ab', 'bc', 'cd']
+        # Bit 0 is the first "maybe" work, bit 1 the second.
+        ngram_works = np.array([[3], [1], [2], [0], [1], [0], [0]],
+                               dtype=np.uint8)
+        no_ngrams = np.array([False, True, False, False, False, False,
+                              False])
+        common, shared = tacl.JitCReport._get_witness_coverage(
+            witness, ngrams, ngram_works, no_ngrams)
+        self.assertEqual(common[:2].tolist(), [50.0, 50.0])
+        # "ab" is filler, since "b" is in a "no" work but "a" is not.
+        self.assertEqual(shared[:2].tolist(), [25.0, 50.0])
+
+    def test_get_witness_coverage_empty(self):
+        witness = tacl.Text('', self._tokenizer)
+        common, shared = tacl.JitCReport._get_witness_coverage(
+            witness, [], np.zeros((0, 1), dtype=np.uint8),
+            np.zeros(0, dtype=bool))
+        self.assertEqual(common[:2].tolist(), [0.0, 0.0])
+        self.assertEqual(shared[:2].tolist(), [0.0, 0.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
 
 import io
+import os.path
 import unittest
+import unittest.mock
 
 import pandas as pd
 
 import tacl
+from tacl.exceptions import MalformedResultsError
 from .tacl_test_case import TaclTestCase
 
 
@@ -277,6 +280,37 @@ class ResultsTestCase (TaclTestCase):
         ]
         self.assertEqual(actual_results, expected_results)
 
+    def test_explain(self):
+        fh = self._create_csv([])
+        results = tacl.Results(fh, self._tokenizer, lazy=True)
+        results.reduce()
+        results.excise('AB')
+        results.zero_fill(tacl.Corpus('corpus', self._tokenizer))
+        results.prune_by_ngram(['ABC'])
+        results.prune_by_ngram_count(2)
+        results.prune_by_ngram_size(2, None)
+        results.remove_label('A')
+        results.sort()
+        expected_plan = [
+            'reduce()',
+            "filter: excise('AB') & prune_by_ngram(['ABC']) & "
+            "prune_by_ngram_size(2, None)",
+            "zero_fill(Corpus('{}'))".format(os.path.abspath('corpus')),
+            'prune_by_ngram_count(2)',
+            "remove_label('A')",
+            'sort()',
+        ]
+        actual_plan = results.explain(io.StringIO()).getvalue().splitlines()
+        self.assertEqual(actual_plan, [
+            '{}. {}'.format(index, step) for index, step in
+            enumerate(expected_plan, start=1)])
+
+    def test_explain_eager(self):
+        fh = self._create_csv([])
+        results = tacl.Results(fh, self._tokenizer)
+        results.excise('AB')
+        self.assertEqual(results.explain(io.StringIO()).getvalue(), '')
+
     def test_group_by_ngram(self):
         input_results = (
             ['AB', '2', 'T1', 'wit1', '4', 'A'],
@@ -415,6 +449,41 @@ class ResultsTestCase (TaclTestCase):
         results = tacl.Results(fh, self._tokenizer)
         self.assertFalse(results._is_intersect_results(results._matches))
 
+    def test_lazy(self):
+        input_data = (
+            ['AB', '2', 'a', 'base', '4', 'A'],
+            ['AB', '2', 'a', 'wit1', '5', 'A'],
+            ['ABC', '3', 'b', 'base', '3', 'A'],
+            ['ABC', '3', 'b', 'wit1', '3', 'A'],
+            ['ABC', '3', 'c', 'base', '2', 'B'],
+            ['BC', '2', 'a', 'base', '2', 'A'],
+            ['BCD', '3', 'c', 'base', '1', 'B'],
+        )
+        outputs = []
+        for lazy in (False, True):
+            fh = self._create_csv(input_data)
+            results = tacl.Results(fh, self._tokenizer, lazy=lazy)
+            results.reduce()
+            results.excise('D')
+            results.prune_by_ngram_count(3)
+            results.prune_by_ngram_size(3)
+            results.remove_label('B')
+            results.sort()
+            outputs.append(self._get_rows_from_results(results))
+        expected_rows = [
+            tacl.constants.QUERY_FIELDNAMES,
+            ('ABC', '3', 'b', 'base', '3', 'A'),
+            ('ABC', '3', 'b', 'wit1', '3', 'A'),
+        ]
+        self.assertEqual(outputs[0], expected_rows)
+        self.assertEqual(outputs[1], expected_rows)
+
+    def test_lazy_malformed_results(self):
+        fh = self._create_csv([], fieldnames=['dummy'])
+        results = tacl.Results(fh, self._tokenizer, lazy=True)
+        results.remove_label('A')
+        self.assertRaises(MalformedResultsError, results.csv, io.StringIO())
+
     def test_prune_by_ngram(self):
         input_data = (
             ['AB', '2', 'a', 'base', '4', 'A'],
@@ -1221,6 +1290,34 @@ class ResultsTestCase (TaclTestCase):
         ]
         self._test_required_columns(fieldnames, 'sort')
 
+    def test_zero_fill(self):
+        input_data = (
+            ['AB', '2', 'a', 'base', '4', 'A'],
+            ['AB', '2', 'b', 'wit1', '3', 'A'],
+            ['ABC', '3', 'a', 'wit2', '1', 'A'],
+            ['AB', '2', 'c', 'base', '2', 'B'])
+        fh = self._create_csv(input_data)
+        results = tacl.Results(fh, self._tokenizer)
+        sigla = {'a': ['base', 'wit1', 'wit2'], 'b': ['base', 'wit1'],
+                 'c': ['base']}
+        corpus = unittest.mock.create_autospec(tacl.Corpus, instance=True)
+        corpus.get_sigla.side_effect = lambda work: sigla[work]
+        results.zero_fill(corpus)
+        expected_rows = set([
+            tacl.constants.QUERY_FIELDNAMES,
+            ('AB', '2', 'a', 'base', '4', 'A'),
+            ('AB', '2', 'a', 'wit1', '0', 'A'),
+            ('AB', '2', 'a', 'wit2', '0', 'A'),
+            ('AB', '2', 'b', 'base', '0', 'A'),
+            ('AB', '2', 'b', 'wit1', '3', 'A'),
+            ('ABC', '3', 'a', 'base', '0', 'A'),
+            ('ABC', '3', 'a', 'wit1', '0', 'A'),
+            ('ABC', '3', 'a', 'wit2', '1', 'A'),
+            ('AB', '2', 'c', 'base', '2', 'B')])
+        actual_rows = self._get_rows_from_results(results)
+        self.assertEqual(len(actual_rows), len(expected_rows))
+        self.assertEqual(set(actual_rows), expected_rows)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 
+import unittest.mock
+
 import tacl
 from .tacl_test_case import TaclTestCase
 
@@ -17,3 +19,91 @@ class SequenceReportTestCase (TaclTestCase):
         actual_text = sequence_report._get_text(text)
         expected_text = 'abc{}d'.format(chr(61440))
         self.assertEqual(actual_text, expected_text)
+
+    def test_align_flanks(self):
+        tokenizer = tacl.Tokenizer(*tacl.constants.TOKENIZERS['cbeta'])
+        fh = self._create_csv([])
+        sequence_report = tacl.SequenceReport(None, tokenizer, fh)
+        t1 = 'xyABCDqr'
+        t2 = 'yABCDqsr'
+        actual_alignment = sequence_report._align_flanks(
+            t1, (2, 6), (0, 8), t2, (1, 5), (0, 8))
+        expected_alignment = ('xyABCDq-r', '-yABCDqsr')
+        self.assertEqual(actual_alignment, expected_alignment)
+        actual_alignment = sequence_report._align_flanks(
+            t1, (2, 6), (2, 8), t2, (1, 5), (0, 8))
+        expected_alignment = ('-ABCDq-r', 'yABCDqsr')
+        self.assertEqual(actual_alignment, expected_alignment)
+
+    def test_generate_sequence_maximum_context(self):
+        tokenizer = tacl.Tokenizer(*tacl.constants.TOKENIZERS['cbeta'])
+        fh = self._create_csv([])
+        sequence_report = tacl.SequenceReport(None, tokenizer, fh, 3)
+        sequence_report._reverse_substitutes = {}
+        text = 'abcdefghijklmnopqrstuvwxyz'
+        covered_spans = (tacl.sequence.CoveredSpans(),
+                         tacl.sequence.CoveredSpans())
+        sequence_report._generate_sequence(text, (12, 14), text, (12, 14), 2,
+                                           covered_spans)
+        self.assertEqual([spans.spans for spans in covered_spans],
+                         [[(9, 17)], [(9, 17)]])
+
+    def test_generate_sequence_unlimited_context(self):
+        tokenizer = tacl.Tokenizer(*tacl.constants.TOKENIZERS['cbeta'])
+        fh = self._create_csv([])
+        sequence_report = tacl.SequenceReport(None, tokenizer, fh)
+        sequence_report._reverse_substitutes = {}
+        text = 'abcdefghijklmnopqrstuvwxyz'
+        covered_spans = (tacl.sequence.CoveredSpans(),
+                         tacl.sequence.CoveredSpans())
+        sequence_report._generate_sequence(text, (12, 14), text, (12, 14), 2,
+                                           covered_spans)
+        self.assertEqual([spans.spans for spans in covered_spans],
+                         [[(0, 26)], [(0, 26)]])
+
+    def test_generate_sequences_for_ngram_pairs(self):
+        tokenizer = tacl.Tokenizer(*tacl.constants.TOKENIZERS['cbeta'])
+        fh = self._create_csv([])
+        sequence_report = tacl.SequenceReport(None, tokenizer, fh)
+        sequence_report._reverse_substitutes = {}
+        t1 = 'AB' + 'xyz' * 20 + 'AB' * 20
+        t2 = 'AB' * 20 + 'xyz' * 20 + 'AB'
+        covered_spans = (tacl.sequence.CoveredSpans(),
+                         tacl.sequence.CoveredSpans())
+        with unittest.mock.patch.object(
+                sequence_report, '_is_inside',
+                wraps=sequence_report._is_inside) as is_inside:
+            sequences = sequence_report._generate_sequences_for_ngram(
+                t1, t2, 'AB', covered_spans)
+        # Only the first span in t1 is checked against each span in
+        # t2, rather than every pair of spans.
+        self.assertEqual(is_inside.call_count, 21)
+        self.assertEqual([sequence.start_index for sequence in sequences],
+                         [0] * 11 + list(range(62, 99, 4)))
+
+
+class CoveredSpansTestCase (TaclTestCase):
+
+    def test_add(self):
+        covered_spans = tacl.sequence.CoveredSpans()
+        covered_spans.add((10, 20))
+        covered_spans.add((30, 40))
+        covered_spans.add((12, 18))
+        self.assertEqual(covered_spans.spans, [(10, 20), (30, 40)])
+        covered_spans.add((15, 35))
+        self.assertEqual(covered_spans.spans, [(10, 20), (15, 35), (30, 40)])
+        covered_spans.add((5, 38))
+        self.assertEqual(covered_spans.spans, [(5, 38), (30, 40)])
+        covered_spans.add((0, 40))
+        self.assertEqual(covered_spans.spans, [(0, 40)])
+
+    def test_contains(self):
+        covered_spans = tacl.sequence.CoveredSpans()
+        self.assertFalse(covered_spans.contains((0, 1)))
+        covered_spans.add((10, 20))
+        covered_spans.add((15, 30))
+        self.assertTrue(covered_spans.contains((10, 20)))
+        self.assertTrue(covered_spans.contains((18, 25)))
+        self.assertFalse(covered_spans.contains((5, 15)))
+        self.assertFalse(covered_spans.contains((12, 25)))
+        self.assertFalse(covered_spans.contains((25, 35)))
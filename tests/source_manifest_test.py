@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+import os
+import tempfile
+import unittest
+
+import tacl
+from .tacl_test_case import TaclTestCase
+
+
+class SourceManifestTestCase (TaclTestCase):
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._dir = self._temp_dir.name
+        self.addCleanup(self._temp_dir.cleanup)
+
+    def _write(self, path, content):
+        with open(os.path.join(self._dir, path), 'w', encoding='utf-8') as fh:
+            fh.write(content)
+
+    def test_get_fingerprint(self):
+        self._write('a.xml', 'A')
+        self._write('b.xml', 'B')
+        paths = [os.path.join(self._dir, 'a.xml'),
+                 os.path.join(self._dir, 'b.xml')]
+        fingerprint = tacl.SourceManifest.get_fingerprint(self._dir, paths)
+        self.assertEqual(sorted(fingerprint), ['a.xml', 'b.xml'])
+        self.assertNotEqual(fingerprint['a.xml'], fingerprint['b.xml'])
+        self._write('b.xml', 'A')
+        self.assertEqual(
+            tacl.SourceManifest.get_fingerprint(self._dir, paths)['b.xml'],
+            fingerprint['a.xml'])
+
+    def test_add_conflicting_outputs(self):
+        manifest = tacl.SourceManifest(self._dir)
+        manifest.add('T1', {'T1.xml': 'x'}, ['T1.xml', 'shared.xml'])
+        self.assertRaises(tacl.exceptions.TACLError, manifest.add, 'T2',
+                          {'T2.xml': 'x'}, ['T2.xml', 'shared.xml'])
+        self.assertFalse(manifest.is_current('T1', {'T1.xml': 'x'}))
+        self.assertFalse(manifest.is_current('T2', {'T2.xml': 'x'}))
+
+    def test_is_current(self):
+        manifest = tacl.SourceManifest(self._dir)
+        self.assertFalse(manifest.is_current('T1', {'T1.xml': 'x'}))
+        manifest.add('T1', {'T1.xml': 'x'}, ['T1.xml'])
+        self.assertTrue(manifest.is_current('T1', {'T1.xml': 'x'}))
+        self.assertFalse(manifest.is_current('T1', {'T1.xml': 'y'}))
+        self.assertFalse(manifest.is_current(
+            'T1', {'T1.xml': 'x', 'T1b.xml': 'z'}))
+
+    def test_remove_stale(self):
+        for filename in ('T1.xml', 'T2.xml', 'T3.xml'):
+            self._write(filename, '')
+        os.mkdir(os.path.join(self._dir, 'T2'))
+        self._write(os.path.join('T2', 'base.txt'), '')
+        manifest = tacl.SourceManifest(self._dir)
+        manifest.add('T1', {'T1.xml': 'x'}, ['T1.xml'])
+        manifest.add('T2', {'T2.xml': 'x'}, ['T2.xml', 'T2', 'T2-missing'])
+        manifest.add('T3', {'T3.xml': 'x'}, ['T3.xml'])
+        manifest.remove_stale({'T1': {'T1.xml': 'x'}, 'T2': {'T2.xml': 'y'}})
+        self.assertEqual(
+            sorted(os.listdir(self._dir)),
+            [tacl.constants.SOURCE_MANIFEST_JOURNAL_FILENAME, 'T1.xml'])
+        self.assertTrue(manifest.is_current('T1', {'T1.xml': 'x'}))
+        self.assertFalse(manifest.is_current('T2', {'T2.xml': 'x'}))
+        self.assertFalse(manifest.is_current('T3', {'T3.xml': 'x'}))
+
+    def test_journal(self):
+        manifest = tacl.SourceManifest(self._dir)
+        manifest.add('T1', {'T1.xml': 'x'}, ['T1.xml'])
+        manifest.add('T2', {'T2.xml': 'x'}, ['T2.xml'])
+        manifest.save()
+        manifest.add('T3', {'T3.xml': 'x'}, ['T3.xml'])
+        manifest.remove_stale({'T1': {'T1.xml': 'x'},
+                               'T3': {'T3.xml': 'x'}})
+        # Simulate an interruption while a change is being written.
+        with open(os.path.join(
+                self._dir, tacl.constants.SOURCE_MANIFEST_JOURNAL_FILENAME),
+                'a', encoding='utf-8') as fh:
+            fh.write('["T4", {"fing')
+        manifest = tacl.SourceManifest(self._dir)
+        self.assertTrue(manifest.is_current('T1', {'T1.xml': 'x'}))
+        self.assertFalse(manifest.is_current('T2', {'T2.xml': 'x'}))
+        self.assertTrue(manifest.is_current('T3', {'T3.xml': 'x'}))
+        self.assertFalse(manifest.is_current('T4', {'T4.xml': 'x'}))
+
+    def test_save(self):
+        manifest = tacl.SourceManifest(self._dir)
+        manifest.add('T1', {'T1.xml': 'x'}, ['T1.xml'])
+        manifest.save()
+        self.assertEqual(os.listdir(self._dir),
+                         [tacl.constants.SOURCE_MANIFEST_FILENAME])
+        manifest = tacl.SourceManifest(self._dir)
+        self.assertTrue(manifest.is_current('T1', {'T1.xml': 'x'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
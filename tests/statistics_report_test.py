@@ -8,13 +8,21 @@ from .tacl_test_case import TaclTestCase
 
 class ReportTestCase (TaclTestCase):
 
-    def test_merge_slices(self):
-        input_slices = [
-            [4, 7], [6, 12], [4, 6], [13, 14], [1, 2], [12, 13], [15, 18]
-        ]
-        expected_slices = [[1, 2], [4, 14], [15, 18]]
-        actual_slices = tacl.StatisticsReport._merge_slices(input_slices)
-        self.assertEqual(actual_slices, expected_slices)
+    def test_process_witness(self):
+        tokenizer = tacl.Tokenizer(tacl.constants.TOKENIZER_PATTERN_CBETA,
+                                   tacl.constants.TOKENIZER_JOINER_CBETA)
+        witness = tacl.WitnessText('T1', 'base', 'hehehe xabcd。zbc',
+                                   tokenizer)
+        matches = self._create_csv([
+            ['heh', '3', 'T1', 'base', '2', 'A'],
+            ['hex', '3', 'T1', 'base', '1', 'A'],
+            ['abc', '3', 'T1', 'base', '1', 'A'],
+            ['bc', '2', 'T1', 'base', '2', 'A'],
+            ['yz', '2', 'T1', 'base', '0', 'A'],
+        ])
+        report = tacl.StatisticsReport(None, tokenizer, matches)
+        actual_counts = report._process_witness(witness, report._matches)
+        self.assertEqual(actual_counts, (14, 12))
 
 
 if __name__ == '__main__':
@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
 
+import os
+import tempfile
 import unittest
 
 from lxml import etree
@@ -215,6 +217,55 @@ class StripTestCase (unittest.TestCase):
         self._transform_equality(input_xml, expected_output,
                                  witness_id="'wit4'")
 
+    def test_strip_file(self):
+        """Tests that the text of each witness, including of nested
+        variants, is extracted in a single pass."""
+        input_xml = '''<TEI xmlns="http://www.tei-c.org/ns/1.0">
+<teiHeader><fileDesc><sourceDesc><listWit>
+<witness xml:id="wit1">CBETA</witness>
+<witness xml:id="wit2">宋</witness>
+<witness xml:id="wit3">明</witness>
+<witness xml:id="wit4">元</witness>
+</listWit></sourceDesc></fileDesc></teiHeader>
+<text><body>
+<p>一<app><lem>二<app><lem>三</lem><rdg wit="#wit3">四</rdg></app></lem><rdg wit="#wit1 #wit2">五<app><lem>六</lem><rdg wit="#wit2">七</rdg></app></rdg></app>八</p>
+<p><app><lem>九</lem><rdg wit="#wit1">十</rdg><rdg wit="#wit4"></rdg></app></p>
+</body></text></TEI>'''
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'T0001.xml')
+            with open(path, 'w', encoding='utf-8') as fh:
+                fh.write(input_xml)
+            actual_work, actual_witnesses = self.stripper.strip_file(path)
+        expected_witnesses = {
+            'CBETA': '\n一五六八\n十',
+            '宋': '\n一五七八\n九',
+            '明': '\n一二四八\n九',
+            '元': '\n一二三八\n',
+        }
+        self.assertEqual(actual_work, 'T0001')
+        self.assertEqual(actual_witnesses, expected_witnesses)
+
+    def test_strip_file_streaming(self):
+        """Tests that each TEI part of a teiCorpus document is stripped
+        in turn, with the witnesses of the document."""
+        input_xml = '''<teiCorpus xmlns="http://www.tei-c.org/ns/1.0">
+<teiHeader><fileDesc><sourceDesc><listWit>
+<witness xml:id="wit1">CBETA</witness>
+<witness xml:id="wit2">宋</witness>
+</listWit></sourceDesc></fileDesc></teiHeader>
+<TEI><text><body><p>一<app><lem>二</lem><rdg wit="#wit2">三</rdg></app></p></body></text></TEI>
+<TEI><text><body><p>四<app><lem>五</lem><rdg wit="#wit1">六</rdg></app></p></body></text></TEI>
+</teiCorpus>'''
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'T0001.xml')
+            with open(path, 'w', encoding='utf-8') as fh:
+                fh.write(input_xml)
+            expected = self.stripper.strip_file(path)
+            actual = self.stripper.strip_file(path, streaming=True)
+        self.assertEqual(actual, ('T0001', {'CBETA': '\n一二\n四六',
+                                            '宋': '\n一三\n四五'}))
+        self.assertEqual(actual, expected)
+
     def _transform_equality(self, input_xml, expected_output, **kwargs):
         actual_output = str(self.stripper.transform(etree.XML(input_xml),
                                                     **kwargs))
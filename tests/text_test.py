@@ -3,6 +3,8 @@
 import collections
 import unittest
 
+import numpy as np
+
 import tacl
 from .tacl_test_case import TaclTestCase
 
@@ -28,6 +30,31 @@ class TextTestCase (TaclTestCase):
         expected_content = 'aFcFfgFe'
         self.assertEqual(actual_content, expected_content)
 
+    def test_get_coverage(self):
+        actual_coverage = list(tacl.Text.get_coverage(
+            6, np.array([1, 2, 5]), np.array([3, 4, 6])))
+        expected_coverage = [False, True, True, True, False, True]
+        self.assertEqual(actual_coverage, expected_coverage)
+
+    def test_get_ngram_coverage(self):
+        content = '阿闍世[(禾*尤)/上/日]首佛足。敬強阿闍世耶。又'
+        text = tacl.Text(content, self._tokenizer)
+        actual_coverage = list(text.get_ngram_coverage(
+            ['闍世', '世[(禾*尤)/上/日]', '敬強阿', '又又']))
+        expected_coverage = [False, True, True, True, False, False, False,
+                             True, True, True, True, True, False, False]
+        self.assertEqual(actual_coverage, expected_coverage)
+
+    def test_get_ngram_positions(self):
+        content = 'hehehe xabcd。zbc'
+        text = tacl.Text(content, self._tokenizer)
+        ngrams = ['heh', 'bc', 'hex', 'yz', 'bc', 'hehehexabcdzbcz']
+        indices, starts, ends = text.get_ngram_positions(ngrams)
+        actual_positions = sorted(zip(indices, starts, ends))
+        expected_positions = [(0, 0, 3), (0, 2, 5), (1, 8, 10), (1, 12, 14),
+                              (2, 4, 7)]
+        self.assertEqual(actual_positions, expected_positions)
+
     def test_get_ngrams(self):
         content = '阿闍世[(禾*尤)\n/上/日]首佛足。敬強阿闍世耶。又'
         text = tacl.WitnessText('test', 'base', content, self._tokenizer)
@@ -7,6 +7,13 @@ import tacl
 
 class TokenizerTestCase (unittest.TestCase):
 
+    def test_get_spans(self):
+        tokenizer = tacl.Tokenizer(tacl.constants.TOKENIZER_PATTERN_LATIN,
+                                   tacl.constants.TOKENIZER_JOINER_LATIN)
+        actual_spans = tokenizer.get_spans('the  ant, bee')
+        expected_spans = [(0, 3), (5, 8), (10, 13)]
+        self.assertEqual(actual_spans, expected_spans)
+
     def test_init(self):
         self.assertRaises(ValueError, tacl.Tokenizer, r'[broken', '')
 